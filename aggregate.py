@@ -0,0 +1,612 @@
+import argparse
+import csv
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+import numpy as np
+from sig_test import significance_from_stats
+
+# Rows per slice of a memory-mapped column; about 32 MB of float64 values.
+MEMMAP_CHUNK_SIZE = 1 << 22
+
+
+class ArmStats:
+    """Running count, mean, sum of squared deviations (M2) and successes for one variant.
+
+    Successes count the non-zero observations, which for 0/1 outcomes is the exact
+    number of conversions. Instances merge associatively, so shards aggregated on
+    different processes or machines combine exactly without a second pass.
+    """
+
+    __slots__ = ("n", "mean", "m2", "successes")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, successes=0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.successes = successes
+
+    def __repr__(self):
+        return (
+            f"ArmStats(n={self.n}, mean={self.mean!r}, m2={self.m2!r}, "
+            f"successes={self.successes})"
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, ArmStats):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _combine(self, n, mean, m2, successes=0):
+        """Fold in the moments of another batch with Chan's parallel update."""
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.n * n / total
+        self.n = total
+        self.successes += successes
+
+    def update(self, values):
+        """Add a batch of observations in one vectorized pass."""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch_mean = values.mean()
+        self._combine(
+            int(values.size),
+            float(batch_mean),
+            float(((values - batch_mean) ** 2).sum()),
+            int(np.count_nonzero(values)),
+        )
+
+    def merge(self, other):
+        """Return a new ArmStats combining both arms exactly."""
+        merged = ArmStats(self.n, self.mean, self.m2, self.successes)
+        merged._combine(other.n, other.mean, other.m2, other.successes)
+        return merged
+
+    def to_dict(self):
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "m2": self.m2,
+            "successes": self.successes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["n"], data["mean"], data["m2"], data.get("successes", 0))
+
+    @property
+    def total(self):
+        return self.mean * self.n
+
+    @property
+    def sum_of_squares(self):
+        return self.m2 + self.n * self.mean**2
+
+    @property
+    def proportion(self):
+        return self.successes / self.n if self.n else 0.0
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1)."""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+def merge_stats(*stats_dicts):
+    """Merge {variant: ArmStats} dictionaries from separate shards."""
+    merged = {}
+    for stats in stats_dicts:
+        for variant, arm in stats.items():
+            merged[variant] = merged[variant].merge(arm) if variant in merged else arm
+    return merged
+
+
+def stats_to_json(stats):
+    """Serialize a {variant: ArmStats} dictionary to a JSON string."""
+    return json.dumps({variant: arm.to_dict() for variant, arm in stats.items()})
+
+
+def stats_from_json(text):
+    return {
+        variant: ArmStats.from_dict(data) for variant, data in json.loads(text).items()
+    }
+
+
+def _detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot infer file format from {path!r}; pass file_format.")
+
+
+def _csv_chunks(handle, key_columns, value_columns, chunk_size):
+    header = next(csv.reader([handle.readline()]))
+    key_indices = tuple(header.index(column) for column in key_columns)
+    value_indices = tuple(header.index(column) for column in value_columns)
+    options = dict(delimiter=",", quotechar='"', comments=None)
+    while True:
+        lines = list(islice(handle, chunk_size))
+        if not lines:
+            return
+        # np.loadtxt parses in C, which is several times faster than csv.reader.
+        keys = np.loadtxt(lines, usecols=key_indices, dtype=str, ndmin=2, **options)
+        try:
+            values = np.loadtxt(lines, usecols=value_indices, ndmin=2, **options)
+        except ValueError:
+            values = np.loadtxt(
+                lines, usecols=value_indices, dtype=str, ndmin=2, **options
+            )
+        yield keys, values
+
+
+def _jsonl_chunks(handle, key_columns, value_columns, chunk_size):
+    while True:
+        lines = list(islice(handle, chunk_size))
+        if not lines:
+            return
+        records = list(map(json.loads, filter(str.strip, lines)))
+        if records:
+            values = np.empty((len(records), len(value_columns)), dtype=object)
+            for index, column in enumerate(value_columns):
+                values[:, index] = [record.get(column) for record in records]
+            keys = np.array(
+                [[str(record[column]) for column in key_columns] for record in records]
+            )
+            yield keys, values
+
+
+def read_keyed_chunks(handle, key_columns, value_columns, chunk_size, file_format):
+    """Yield (keys, values) chunks from an open text handle; see iter_keyed_chunks."""
+    if file_format == "csv":
+        read_chunks = _csv_chunks
+    elif file_format == "jsonl":
+        read_chunks = _jsonl_chunks
+    else:
+        raise ValueError(f"Unsupported file format {file_format!r}.")
+    for keys, values in read_chunks(
+        handle, tuple(key_columns), tuple(value_columns), chunk_size
+    ):
+        if values.dtype.kind != "f":
+            missing = np.array(
+                [value in ("", None) for value in values.ravel().tolist()]
+            ).reshape(values.shape)
+            keep = ~missing.any(axis=1)
+            values = values[keep].astype(float)
+            keys = keys[keep]
+        yield keys, values
+
+
+def iter_keyed_chunks(
+    path,
+    key_columns=("variant",),
+    value_columns=("value",),
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Yield (keys, values) chunks with one column per key_columns and value_columns entry.
+
+    Keys are read as strings. Rows with any missing value are dropped.
+    """
+    file_format = file_format or _detect_format(path)
+    with open(path, newline="") as handle:
+        yield from read_keyed_chunks(
+            handle, key_columns, value_columns, chunk_size, file_format
+        )
+
+
+def iter_column_chunks(
+    path,
+    variant_column="variant",
+    value_columns=("value",),
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Yield (variants, values) chunks where values has one column per value_columns entry.
+
+    Rows with any missing value are dropped.
+    """
+    for keys, values in iter_keyed_chunks(
+        path, (variant_column,), value_columns, chunk_size, file_format
+    ):
+        yield keys[:, 0], values
+
+
+def iter_chunks(
+    path,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Yield (variants, values) array pairs of at most chunk_size rows from a CSV/JSONL file.
+
+    Rows with a missing value are dropped.
+    """
+    for variants, values in iter_column_chunks(
+        path, variant_column, (value_column,), chunk_size, file_format
+    ):
+        yield variants, values[:, 0]
+
+
+def group_variants(variants):
+    """Group a chunk's rows by variant for bincount sums.
+
+    Returns (keys, inverse, counts, slots): inverse gives each row's bin, counts
+    the rows per bin, and keys[i] is the variant whose rows are in bin slots[i].
+    """
+    if (
+        variants.dtype.kind in "iu"
+        and variants.size
+        and variants.min() >= 0
+        and variants.max() < 4 * variants.size + 256
+    ):
+        # Small non-negative integer variant codes index the bincounts directly,
+        # skipping the sort inside np.unique. Negative or sparse large codes
+        # would break or oversize the bincount, so they take the np.unique path.
+        inverse = variants.astype(np.intp, copy=False)
+        counts = np.bincount(inverse)
+        slots = np.flatnonzero(counts)
+        return slots, inverse, counts, slots
+    keys, inverse = np.unique(variants, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse, minlength=len(keys))
+    return keys, inverse, counts, np.arange(len(keys))
+
+
+def aggregate_chunk(stats, variants, values):
+    """Update a {variant: ArmStats} dict with one chunk using grouped bincount sums."""
+    keys, inverse, counts, slots = group_variants(variants)
+    size = len(counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(inverse, weights=values, minlength=size) / counts
+    m2 = np.bincount(inverse, weights=(values - means[inverse]) ** 2, minlength=size)
+    successes = np.bincount(inverse, weights=values != 0, minlength=size)
+    for key, n, mean, arm_m2, arm_successes in zip(
+        keys.tolist(), counts[slots], means[slots], m2[slots], successes[slots]
+    ):
+        stats.setdefault(key, ArmStats())._combine(
+            int(n), float(mean), float(arm_m2), int(arm_successes)
+        )
+    return stats
+
+
+def aggregate_file(
+    path,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Stream a per-unit event file once and return {variant: ArmStats}."""
+    stats = {}
+    for variants, values in iter_chunks(
+        path, variant_column, value_column, chunk_size, file_format
+    ):
+        aggregate_chunk(stats, variants, values)
+    return stats
+
+
+def aggregate_files(
+    paths,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+    processes=None,
+):
+    """Aggregate many shards in a process pool and merge them into {variant: ArmStats}."""
+    paths = list(paths)
+    if processes == 1 or len(paths) <= 1:
+        return merge_stats(
+            *(
+                aggregate_file(
+                    path, variant_column, value_column, chunk_size, file_format
+                )
+                for path in paths
+            )
+        )
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        shards = pool.map(
+            aggregate_file,
+            paths,
+            repeat(variant_column),
+            repeat(value_column),
+            repeat(chunk_size),
+            repeat(file_format),
+        )
+        return merge_stats(*shards)
+
+
+def open_column(path, dtype="float64"):
+    """Memory-map a 1-d column without reading it.
+
+    .npy files carry their own dtype; any other file is read as raw binary
+    values of the given dtype.
+    """
+    if os.path.splitext(path)[1].lower() == ".npy":
+        column = np.load(path, mmap_mode="r")
+    else:
+        column = np.memmap(path, dtype=dtype, mode="r")
+    if column.ndim != 1:
+        raise ValueError(
+            f"Expected a 1-d column in {path!r}, got shape {column.shape}."
+        )
+    return column
+
+
+def iter_memmap_chunks(
+    values_path,
+    variants_path,
+    value_dtype="float64",
+    variant_dtype="uint8",
+    chunk_size=MEMMAP_CHUNK_SIZE,
+    start=0,
+    stop=None,
+):
+    """Yield (variants, values) slices of two memory-mapped columns.
+
+    Slices are views into the mapped files, so only chunk_size rows are paged in
+    at a time however large the columns are. NaN values are dropped.
+    """
+    values = open_column(values_path, value_dtype)
+    variants = open_column(variants_path, variant_dtype)
+    if len(values) != len(variants):
+        raise ValueError(
+            f"{values_path!r} has {len(values)} rows but {variants_path!r} has {len(variants)}."
+        )
+    stop = len(values) if stop is None else min(stop, len(values))
+    for offset in range(start, stop, chunk_size):
+        end = min(offset + chunk_size, stop)
+        chunk_values = values[offset:end]
+        chunk_variants = variants[offset:end]
+        if chunk_values.dtype.kind == "f":
+            missing = np.isnan(chunk_values)
+            if missing.any():
+                chunk_values = chunk_values[~missing]
+                chunk_variants = chunk_variants[~missing]
+        yield chunk_variants, chunk_values
+
+
+def map_row_ranges(function, arguments, rows, chunk_size, processes=1):
+    """Split rows into contiguous ranges, one per worker, and merge the per-range stats.
+
+    function is called with arguments + (start, stop) for each range; a process
+    count of None or 0 means one per CPU.
+    """
+    workers = processes or os.cpu_count() or 1
+    bounds = np.linspace(0, rows, min(workers, max(1, rows // chunk_size)) + 1)
+    bounds = bounds.astype(np.int64).tolist()
+    tasks = [(*arguments, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if len(tasks) <= 1:
+        return function(tasks[0])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_stats(*pool.map(function, tasks))
+
+
+def _aggregate_memmap_range(args):
+    stats = {}
+    for variants, values in iter_memmap_chunks(*args):
+        aggregate_chunk(stats, variants, values)
+    return stats
+
+
+def aggregate_memmap(
+    values_path,
+    variants_path,
+    value_dtype="float64",
+    variant_dtype="uint8",
+    chunk_size=MEMMAP_CHUNK_SIZE,
+    processes=1,
+):
+    """Aggregate a memory-mapped value column by a variant column into {variant: ArmStats}.
+
+    With several processes, each one maps the files itself and aggregates a
+    contiguous range of rows; the partial results are merged exactly.
+    """
+    rows = len(open_column(values_path, value_dtype))
+    return map_row_ranges(
+        _aggregate_memmap_range,
+        (values_path, variants_path, value_dtype, variant_dtype, chunk_size),
+        rows,
+        chunk_size,
+        processes,
+    )
+
+
+def print_results(test_stats, control_stats, test_type, tail_type, confidence):
+    """Run the z-test on two ArmStats and print the report."""
+    z_score, p_value = significance_from_stats(
+        test_stats, control_stats, tail_type, test_type
+    )
+    significance = p_value < (1 - confidence)
+
+    print("\nResults:")
+    print("----------------------------")
+    print(f"Test Type: {test_type.capitalize()} Test")
+    print(f"Tail Type: {'Two-tailed' if tail_type == 'two' else 'One-tailed'}")
+    if test_type == "proportion":
+        print(f"Test Group Value: {test_stats.proportion}")
+        print(f"Control Group Value: {control_stats.proportion}")
+    else:
+        print(f"Test Group Value: {test_stats.mean}")
+        print(f"Control Group Value: {control_stats.mean}")
+    if test_type == "mean":
+        print(f"Test Group Std Dev: {test_stats.std}")
+        print(f"Control Group Std Dev: {control_stats.std}")
+    print(f"Test Group Size: {test_stats.n}")
+    print(f"Control Group Size: {control_stats.n}")
+    print(f"Confidence Level: {confidence}")
+    print(f"Z-Score: {z_score}")
+    print(f"P-Value: {p_value:.4f}")
+    print(f"Significant: {'Yes' if significance else 'No'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool streams raw per-unit event files (CSV or JSONL) in fixed-size chunks, aggregates count, mean and variance per variant, and runs the significance test on the result without loading the file into memory.
+
+        Examples of usage:
+        1. Revenue per user from a CSV log:
+           Command:
+           python aggregate.py --input events.csv --test_type mean --tail two --test_variant treatment --control_variant control --value_column revenue
+
+        2. Conversion from a JSONL log where each row holds a 0/1 outcome:
+           Command:
+           python aggregate.py --input events.jsonl --test_type proportion --tail two --test_variant B --control_variant A --value_column converted
+
+        3. Revenue per user from memory-mapped columns (variant codes 0 = control, 1 = treatment):
+           Command:
+           python aggregate.py --input revenue.npy --variants assignment.npy --test_type mean --tail two --test_variant 1 --control_variant 0
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Path to one or more CSV or JSONL event files (shards are aggregated in parallel), or .npy/raw binary value columns when --variants is given.",
+    )
+    parser.add_argument(
+        "--variants",
+        type=str,
+        nargs="+",
+        required=False,
+        help="Variant-assignment column (.npy or raw binary) for each --input value column; switches to memory-mapped input.",
+    )
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float64",
+        help="Element type of raw binary value columns (default is 'float64').",
+    )
+    parser.add_argument(
+        "--variant_dtype",
+        type=str,
+        default="uint8",
+        help="Element type of raw binary variant columns, holding integer variant codes (default is 'uint8').",
+    )
+    parser.add_argument(
+        "--test_type",
+        type=str,
+        choices=["proportion", "mean"],
+        required=True,
+        help="Specify the type of data: 'proportion' for 0/1 outcomes, 'mean' for continuous outcomes.",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=True,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=True,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--value_column",
+        type=str,
+        default="value",
+        help="Column holding the per-unit metric value (default is 'value').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        required=False,
+        help="Number of rows aggregated per chunk (default is 100000; memory-mapped columns default to 4194304).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes used to aggregate multiple input files or row ranges of memory-mapped columns (default is one per CPU).",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the test (default is 0.95).",
+    )
+
+    args = parser.parse_args()
+
+    if args.variants:
+        if len(args.variants) != len(args.input):
+            parser.error("--variants needs one variant column per --input column.")
+        stats = merge_stats(
+            *(
+                aggregate_memmap(
+                    values_path,
+                    variants_path,
+                    args.dtype,
+                    args.variant_dtype,
+                    args.chunk_size or MEMMAP_CHUNK_SIZE,
+                    args.processes,
+                )
+                for values_path, variants_path in zip(args.input, args.variants)
+            )
+        )
+        # Integer variant codes are matched against the labels given on the command line.
+        stats = {str(variant): arm for variant, arm in stats.items()}
+    else:
+        stats = aggregate_files(
+            args.input,
+            args.variant_column,
+            args.value_column,
+            args.chunk_size or 100_000,
+            args.format,
+            args.processes,
+        )
+    for variant in (args.test_variant, args.control_variant):
+        if variant not in stats:
+            parser.error(f"Variant {variant!r} not found in {', '.join(args.input)}.")
+    test_stats = stats[args.test_variant]
+    control_stats = stats[args.control_variant]
+
+    print_results(test_stats, control_stats, args.test_type, args.tail, args.confidence)
+
+
+if __name__ == "__main__":
+    main()
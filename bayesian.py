@@ -0,0 +1,482 @@
+"""Bayesian A/B results: probability that an arm is better, and expected loss.
+
+Proportions get Beta-Binomial posteriors, Beta(prior_alpha + successes,
+prior_beta + failures). Means get Normal posteriors N(mean, std^2 / n), which is
+the flat-prior posterior of the mean.
+
+For two arms both quantities are closed-form. P(X > Y) for Beta variables is
+the finite sum of Evan Miller's formula, with one term per unit of an integer
+posterior parameter. The sum runs over whichever of the four parameters is
+smallest, so a 1% conversion rate needs about as many terms as conversions. All
+experiments are summed together as one ragged array, in chunks of at most
+SUM_CHUNK terms. When no parameter is a small integer, as with a Jeffreys
+Beta(0.5, 0.5) prior, P(X > Y) = E[F_Y(X)] is integrated over the quantiles of
+the narrower posterior by Gauss-Legendre quadrature, accurate to about 1e-6.
+Once every parameter exceeds EXACT_MAX_TERMS each posterior is close enough to
+normal that the Normal formulas are used instead. Expected loss reuses the same
+sums, since E[p_x 1{p_x > p_y}] = E[p_x] P(X' > Y) with X' ~ Beta(a_x + 1, b_x).
+
+With more than two arms, the probability of being best and the expected loss
+are estimated by Monte Carlo. Posterior draws are generated in blocks of at
+most MC_CHUNK values, so memory stays bounded for any number of metrics, arms
+or draws.
+"""
+
+import argparse
+import csv
+import math
+import sys
+from collections import namedtuple
+import numpy as np
+import normal
+import profiling
+
+# Largest number of terms in the exact sum for P(X > Y) of two Beta posteriors.
+EXACT_MAX_TERMS = 1_000
+# Terms of the exact sums, and posterior draws, evaluated per block.
+SUM_CHUNK = 1 << 20
+# Gauss-Legendre nodes of the quadrature for non-integer Beta parameters.
+QUADRATURE_NODES = 128
+MC_CHUNK = 1 << 22
+DEFAULT_DRAWS = 50_000
+
+BayesianResult = namedtuple(
+    "BayesianResult",
+    ["prob_test_better", "expected_loss_test", "expected_loss_control"],
+)
+
+
+def beta_posterior(successes, n, prior_alpha=1.0, prior_beta=1.0):
+    """Beta posterior (alpha, beta) of a conversion rate; works elementwise on arrays."""
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    return successes + prior_alpha, n - successes + prior_beta
+
+
+def normal_posterior(mean, std, n):
+    """Normal posterior (loc, scale) of a mean under a flat prior."""
+    return np.asarray(mean, dtype=float), np.asarray(std, dtype=float) / np.sqrt(
+        np.asarray(n, dtype=float)
+    )
+
+
+def normal_prob_greater(loc_x, scale_x, loc_y, scale_y):
+    """P(X > Y) for independent normal X and Y."""
+    loc, scale = _normal_difference(loc_x, scale_x, loc_y, scale_y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return normal.sf_array(-loc / scale)
+
+
+def normal_expected_loss(loc_x, scale_x, loc_y, scale_y):
+    """E[max(Y - X, 0)]: what is given up by choosing X over Y, for normal X and Y."""
+    loc, scale = _normal_difference(loc_y, scale_y, loc_x, scale_x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = loc / scale
+        density = np.exp(-0.5 * z**2) / math.sqrt(2 * math.pi)
+        return np.maximum(scale * density + loc * normal.sf_array(-z), 0.0)
+
+
+def _normal_difference(loc_x, scale_x, loc_y, scale_y):
+    loc_x, scale_x, loc_y, scale_y = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (loc_x, scale_x, loc_y, scale_y))
+    )
+    return loc_x - loc_y, np.sqrt(scale_x**2 + scale_y**2)
+
+
+def _beta_moments(alpha, beta):
+    total = alpha + beta
+    return alpha / total, np.sqrt(alpha * beta / (total**2 * (total + 1)))
+
+
+def _ragged_sum(a_x, b_x, a_y, b_y):
+    """Evan Miller's sum for P(X > Y), X ~ Beta(a_x, b_x), Y ~ Beta(a_y, b_y), integer a_x.
+
+    The first term is B(a_y, b_x + b_y) / B(a_y, b_y) and each term is the previous one
+    times (a_y + i)(b_x + i) / ((a_y + b_x + b_y + i)(1 + i)). Each row's terms are
+    laid end to end, and the log-terms are a running sum restarted at each row.
+    """
+    from scipy.special import betaln
+
+    counts = a_x.astype(np.int64)
+    ends = np.cumsum(counts)
+    out = np.empty(len(counts))
+    start = 0
+    while start < len(counts):
+        stop = int(
+            np.searchsorted(ends, ends[start] - counts[start] + SUM_CHUNK, "right")
+        )
+        stop = max(stop, start + 1)
+        block = counts[start:stop]
+        firsts = np.cumsum(block) - block
+        row = np.repeat(np.arange(stop - start), block)
+        i = np.arange(block.sum()) - firsts[row]
+        ay, bx, by = (value[start:stop][row] for value in (a_y, b_x, b_y))
+        step = np.log((ay + i) * (bx + i) / ((ay + bx + by + i) * (1 + i)))
+        # Exclusive running sum of the log-ratios within each row.
+        before = np.cumsum(step) - step
+        log_first = betaln(a_y[start:stop], b_x[start:stop] + b_y[start:stop]) - betaln(
+            a_y[start:stop], b_y[start:stop]
+        )
+        log_terms = log_first[row] + before - before[firsts][row]
+        out[start:stop] = np.bincount(
+            row, weights=np.exp(log_terms), minlength=stop - start
+        )
+        start = stop
+    return out
+
+
+def _quadrature_prob_greater(a_x, b_x, a_y, b_y):
+    """P(X > Y) for Beta X and Y as the integral over u of F_Y(F_X^-1(u)).
+
+    The integral runs over the quantiles of the narrower posterior, where the
+    integrand is smooth; when Y is narrower, P(X > Y) = 1 - P(Y > X).
+    """
+    from scipy.special import betainc, betaincinv
+
+    nodes, weights = np.polynomial.legendre.leggauss(QUADRATURE_NODES)
+    nodes, weights = (nodes + 1) / 2, weights / 2
+    swap = _beta_moments(a_x, b_x)[1] > _beta_moments(a_y, b_y)[1]
+    inner_a, inner_b = np.where(swap, a_y, a_x), np.where(swap, b_y, b_x)
+    outer_a, outer_b = np.where(swap, a_x, a_y), np.where(swap, b_x, b_y)
+    out = np.empty(len(a_x))
+    step = max(1, SUM_CHUNK // QUADRATURE_NODES)
+    for start in range(0, len(a_x), step):
+        rows = slice(start, start + step)
+        quantiles = betaincinv(inner_a[rows, None], inner_b[rows, None], nodes)
+        out[rows] = (
+            betainc(outer_a[rows, None], outer_b[rows, None], quantiles) @ weights
+        )
+    return np.where(swap, 1 - out, out)
+
+
+@profiling.instrument("bayesian.beta_prob_greater")
+def beta_prob_greater(alpha_x, beta_x, alpha_y, beta_y):
+    """P(X > Y) for independent X ~ Beta(alpha_x, beta_x) and Y ~ Beta(alpha_y, beta_y).
+
+    Exact when some parameter is an integer of at most EXACT_MAX_TERMS, and
+    computed by quadrature when some parameter is at most EXACT_MAX_TERMS but none
+    is an integer. Otherwise the posteriors are approximated by normals with the
+    same mean and variance.
+    """
+    a_x, b_x, a_y, b_y = (
+        np.array(value, dtype=float).ravel()
+        for value in np.broadcast_arrays(alpha_x, beta_x, alpha_y, beta_y)
+    )
+    shape = np.broadcast(alpha_x, beta_x, alpha_y, beta_y).shape
+    # P(X > Y) four ways: summed over a_x, 1 - summed over a_y, and the same for
+    # the failure parameters, since X > Y exactly when 1 - Y > 1 - X.
+    forms = [
+        (a_x, b_x, a_y, b_y, False),
+        (a_y, b_y, a_x, b_x, True),
+        (b_y, a_y, b_x, a_x, False),
+        (b_x, a_x, b_y, a_y, True),
+    ]
+    terms = np.stack([form[0] for form in forms])
+    terms = np.where((terms == np.round(terms)) & (terms >= 1), terms, np.inf)
+    choice = np.argmin(terms, axis=0)
+    exact = terms[choice, np.arange(len(choice))] <= EXACT_MAX_TERMS
+
+    out = np.full(len(a_x), np.nan)
+    for index, (sa_x, sb_x, sa_y, sb_y, complement) in enumerate(forms):
+        rows = np.flatnonzero(exact & (choice == index))
+        if len(rows):
+            total = _ragged_sum(sa_x[rows], sb_x[rows], sa_y[rows], sb_y[rows])
+            out[rows] = 1 - total if complement else total
+    finite = np.isfinite(a_x + b_x + a_y + b_y)
+    smallest = np.minimum(np.minimum(a_x, b_x), np.minimum(a_y, b_y))
+    quadrature = ~exact & finite & (smallest <= EXACT_MAX_TERMS)
+    if quadrature.any():
+        out[quadrature] = _quadrature_prob_greater(
+            a_x[quadrature], b_x[quadrature], a_y[quadrature], b_y[quadrature]
+        )
+    approx = ~exact & ~quadrature & finite
+    if approx.any():
+        mean_x, std_x = _beta_moments(a_x[approx], b_x[approx])
+        mean_y, std_y = _beta_moments(a_y[approx], b_y[approx])
+        out[approx] = normal_prob_greater(mean_x, std_x, mean_y, std_y)
+    return np.clip(out, 0.0, 1.0).reshape(shape)
+
+
+@profiling.instrument("bayesian.beta_expected_loss")
+def beta_expected_loss(alpha_x, beta_x, alpha_y, beta_y):
+    """E[max(Y - X, 0)] for independent Beta X and Y: the loss of choosing X over Y."""
+    a_x, b_x, a_y, b_y = np.broadcast_arrays(
+        *(
+            np.asarray(value, dtype=float)
+            for value in (alpha_x, beta_x, alpha_y, beta_y)
+        )
+    )
+    mean_x, std_x = _beta_moments(a_x, b_x)
+    mean_y, std_y = _beta_moments(a_y, b_y)
+    # E[Y 1{Y > X}] - E[X 1{Y > X}], each a size-biased probability.
+    loss = mean_y * beta_prob_greater(a_y + 1, b_y, a_x, b_x) - mean_x * (
+        beta_prob_greater(a_y, b_y, a_x + 1, b_x)
+    )
+    # Where the sums were too long, the normal approximation gives the loss directly
+    # rather than as a difference of two approximated probabilities.
+    large = np.minimum(np.minimum(a_x, b_x), np.minimum(a_y, b_y)) > EXACT_MAX_TERMS
+    if large.any():
+        loss = np.where(large, normal_expected_loss(mean_x, std_x, mean_y, std_y), loss)
+    return np.maximum(loss, 0.0)
+
+
+@profiling.instrument("bayesian.run_bayesian_tests")
+def run_bayesian_tests(
+    test_values,
+    control_values,
+    n_test,
+    n_control,
+    test_type="proportion",
+    std_test=None,
+    std_control=None,
+    prior_alpha=1.0,
+    prior_beta=1.0,
+):
+    """Score many two-arm comparisons at once, returning a BayesianResult of arrays.
+
+    The arguments mirror sig_test.run_significance_tests; success counts of
+    proportions are recovered as round(proportion * n).
+    """
+    if test_type == "proportion":
+        n_test = np.asarray(n_test, dtype=float)
+        n_control = np.asarray(n_control, dtype=float)
+        test = beta_posterior(
+            np.rint(np.asarray(test_values, dtype=float) * n_test),
+            n_test,
+            prior_alpha,
+            prior_beta,
+        )
+        control = beta_posterior(
+            np.rint(np.asarray(control_values, dtype=float) * n_control),
+            n_control,
+            prior_alpha,
+            prior_beta,
+        )
+        prob_greater, expected_loss = beta_prob_greater, beta_expected_loss
+    elif test_type == "mean":
+        if std_test is None or std_control is None:
+            raise ValueError(
+                "Standard deviations must be provided for mean type tests."
+            )
+        test = normal_posterior(test_values, std_test, n_test)
+        control = normal_posterior(control_values, std_control, n_control)
+        prob_greater, expected_loss = normal_prob_greater, normal_expected_loss
+    else:
+        raise ValueError(f"test_type must be 'proportion' or 'mean', got {test_type!r}")
+    return BayesianResult(
+        prob_greater(*test, *control),
+        expected_loss(*test, *control),
+        expected_loss(*control, *test),
+    )
+
+
+def better_group(prob_test_better, confidence=0.95):
+    """'Test' or 'Control' when either is better with at least this probability, else 'Inconclusive'."""
+    prob_test_better = np.asarray(prob_test_better, dtype=float)
+    return np.where(
+        prob_test_better >= confidence,
+        "Test",
+        np.where(1 - prob_test_better >= confidence, "Control", "Inconclusive"),
+    )[()]
+
+
+@profiling.instrument("bayesian.simulate_best_arm")
+def simulate_best_arm(
+    first, second, test_type="proportion", draws=DEFAULT_DRAWS, seed=None
+):
+    """Monte Carlo (prob_best, expected_loss) for every arm of every metric.
+
+    first and second are 2-d posterior parameters with one row per metric and
+    one column per arm: (alpha, beta) for proportions or (loc, scale) for means.
+    expected_loss is E[max over arms - arm], what is given up by choosing that
+    arm. Arms with NaN parameters are never best and get NaN results.
+    """
+    first, second = np.broadcast_arrays(
+        np.atleast_2d(np.asarray(first, dtype=float)),
+        np.atleast_2d(np.asarray(second, dtype=float)),
+    )
+    if test_type not in ("proportion", "mean"):
+        raise ValueError(f"test_type must be 'proportion' or 'mean', got {test_type!r}")
+    rng = np.random.default_rng(seed)
+    metrics, arms = first.shape
+    missing = np.isnan(first) | np.isnan(second)
+    first = np.where(missing, 1.0, first)
+    second = np.where(missing, 1.0, second)
+    batch = max(1, min(draws, MC_CHUNK // arms))
+    rows_per_block = max(1, MC_CHUNK // (arms * batch))
+
+    wins = np.zeros((metrics, arms))
+    losses = np.zeros((metrics, arms))
+    for start in range(0, metrics, rows_per_block):
+        rows = slice(start, start + rows_per_block)
+        a, b = first[rows, :, None], second[rows, :, None]
+        for done in range(0, draws, batch):
+            size = (a.shape[0], arms, min(batch, draws - done))
+            if test_type == "proportion":
+                samples = rng.beta(a, b, size)
+            else:
+                samples = a + b * rng.standard_normal(size)
+            samples[np.broadcast_to(missing[rows, :, None], size)] = -np.inf
+            best = samples.max(axis=1, keepdims=True)
+            wins[rows] += (samples == best).sum(axis=2)
+            samples[np.isneginf(samples)] = np.nan
+            losses[rows] += (best - samples).sum(axis=2)
+    prob_best = np.where(missing, np.nan, wins / draws)
+    return prob_best, np.where(missing, np.nan, losses / draws)
+
+
+def best_arm(
+    values,
+    n,
+    test_type="proportion",
+    std=None,
+    draws=DEFAULT_DRAWS,
+    seed=None,
+    prior_alpha=1.0,
+    prior_beta=1.0,
+):
+    """(prob_best, expected_loss) per metric and arm; closed-form when there are two arms."""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n = np.atleast_2d(np.asarray(n, dtype=float))
+    if test_type == "proportion":
+        first, second = beta_posterior(np.rint(values * n), n, prior_alpha, prior_beta)
+    elif test_type == "mean":
+        if std is None:
+            raise ValueError(
+                "Standard deviations must be provided for mean type tests."
+            )
+        first, second = normal_posterior(values, std, n)
+    else:
+        raise ValueError(f"test_type must be 'proportion' or 'mean', got {test_type!r}")
+    if values.shape[1] != 2:
+        return simulate_best_arm(first, second, test_type, draws, seed)
+    result = run_bayesian_tests(
+        values[:, 1],
+        values[:, 0],
+        n[:, 1],
+        n[:, 0],
+        test_type,
+        None if std is None else np.atleast_2d(std)[:, 1],
+        None if std is None else np.atleast_2d(std)[:, 0],
+        prior_alpha,
+        prior_beta,
+    )
+    prob_best = np.stack([1 - result.prob_test_better, result.prob_test_better], axis=1)
+    expected_loss = np.stack(
+        [result.expected_loss_control, result.expected_loss_test], axis=1
+    )
+    return prob_best, expected_loss
+
+
+def write_best_arm(metrics, arms, values, prob_best, expected_loss, out):
+    writer = csv.writer(out)
+    writer.writerow(["metric", "arm", "value", "prob_best", "expected_loss"])
+    for row, metric in enumerate(metrics):
+        for column, arm in enumerate(arms):
+            if not np.isnan(values[row, column]):
+                writer.writerow(
+                    [
+                        metric,
+                        arm,
+                        values[row, column],
+                        prob_best[row, column],
+                        expected_loss[row, column],
+                    ]
+                )
+
+
+def main():
+    # multiarm imports sig_test, which imports this module.
+    from multiarm import pivot_arms
+    from scorecard import load_table
+
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool reports Bayesian results for experiments with any number of arms. For each metric it gives each arm's probability of being the best arm and its expected loss: how much of the metric would be given up, on average, by shipping that arm. Two arms are computed in closed form; more arms use chunked Monte Carlo draws from the posteriors.
+
+        The input CSV has the columns metric, arm, n and value (a proportion or mean). Proportion files may give successes instead of value. Mean files also need std.
+
+        Examples of usage:
+        1. Which of four checkout pages converts best:
+           Command:
+           python bayesian.py --input arms.csv --test_type proportion
+
+        2. Average order value of three pricing arms, with a fixed seed:
+           Command:
+           python bayesian.py --input arms.csv --test_type mean --draws 200000 --seed 1
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input", type=str, required=True, help="Path to the per-arm CSV."
+    )
+    parser.add_argument(
+        "--test_type",
+        type=str,
+        choices=["proportion", "mean"],
+        required=True,
+        help="Specify the type of data: 'proportion' for rates or percentages, 'mean' for continuous outcomes.",
+    )
+    parser.add_argument(
+        "--prior_alpha",
+        type=float,
+        default=1.0,
+        help="Alpha of the Beta prior for proportions (default is 1, a uniform prior).",
+    )
+    parser.add_argument(
+        "--prior_beta",
+        type=float,
+        default=1.0,
+        help="Beta of the Beta prior for proportions (default is 1, a uniform prior).",
+    )
+    parser.add_argument(
+        "--draws",
+        type=int,
+        default=DEFAULT_DRAWS,
+        help=f"Monte Carlo draws per metric with more than two arms (default is {DEFAULT_DRAWS}).",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        required=False,
+        help="Random seed for the Monte Carlo draws.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="File to write the per-arm results to (defaults to standard output).",
+    )
+
+    args = parser.parse_args()
+
+    table = load_table(args.input, numeric_columns=("n", "value", "successes", "std"))
+    missing = [name for name in ("metric", "arm", "n") if name not in table]
+    if args.test_type == "mean" and "std" not in table:
+        missing.append("std")
+    if missing:
+        parser.error(f"Missing columns in {args.input}: {', '.join(missing)}")
+    try:
+        metrics, arms, values, n, std = pivot_arms(table, args.test_type)
+    except (KeyError, ValueError) as error:
+        parser.error(str(error))
+
+    prob_best, expected_loss = best_arm(
+        values,
+        n,
+        args.test_type,
+        std,
+        args.draws,
+        args.seed,
+        args.prior_alpha,
+        args.prior_beta,
+    )
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_best_arm(metrics, arms, values, prob_best, expected_loss, out)
+    else:
+        write_best_arm(metrics, arms, values, prob_best, expected_loss, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Speed benchmarks for the significance-test and sample-size hot paths.
+
+Four groups are measured: scalar call latency, batch throughput from 10^3 to
+10^7 rows, CLI cold-start time and streaming aggregation throughput. Results go
+to a JSON file tagged with the git commit, so runs on different commits can be
+compared with --compare.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+from sig_test import calculate_z_score, calculate_p_value, run_significance_tests
+from samplesize import (
+    calculate_sample_size_for_proportions,
+    calculate_sample_size_for_means,
+    sample_size_grid_for_proportions,
+    sample_size_grid_for_means,
+)
+from aggregate import aggregate_file
+
+GROUPS = ("scalar", "batch", "cli", "aggregation")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CLI_COMMANDS = {
+    "sig_test": [
+        "sig_test.py",
+        "--test_type",
+        "proportion",
+        "--tail",
+        "two",
+        "--test_value",
+        "0.507",
+        "--control_value",
+        "0.4728",
+        "--n_test",
+        "25000",
+        "--n_control",
+        "25000",
+    ],
+    "samplesize": [
+        "samplesize.py",
+        "--type",
+        "proportion",
+        "--tail",
+        "two",
+        "--baseline",
+        "0.10",
+        "--effect_size",
+        "0.15",
+        "--alpha",
+        "0.05",
+        "--power",
+        "0.8",
+        "--split_ratio",
+        "0.5",
+    ],
+}
+
+
+def _result(group, name, value, unit, **params):
+    return {"group": group, "name": name, "value": value, "unit": unit, **params}
+
+
+def _seconds_per_call(func, number, repeat):
+    """Best-of-repeat time per call; the minimum is the least noisy estimate."""
+    return min(timeit.Timer(func).repeat(repeat=repeat, number=number)) / number
+
+
+def bench_scalar(number=20_000, repeat=5):
+    """Latency of one call to each scalar function, in microseconds."""
+    calls = {
+        "calculate_z_score": lambda: calculate_z_score(0.507, 0.4728, 25000, 25000),
+        "calculate_p_value": lambda: calculate_p_value(1.96, "two"),
+        "calculate_sample_size_for_proportions": lambda: (
+            calculate_sample_size_for_proportions(0.1, 0.15, 0.05, 0.8, 0.5, "two")
+        ),
+        "calculate_sample_size_for_means": lambda: calculate_sample_size_for_means(
+            5, 20, 0.05, 0.8, 0.5, "two"
+        ),
+    }
+    return [
+        _result("scalar", name, _seconds_per_call(call, number, repeat) * 1e6, "us")
+        for name, call in calls.items()
+    ]
+
+
+def bench_batch(max_rows=10**7, repeat=3, seed=0):
+    """Rows per second for the vectorized functions at sizes 10^3 up to max_rows."""
+    rng = np.random.default_rng(seed)
+    results = []
+    rows = 1_000
+    while rows <= max_rows:
+        test = rng.uniform(0.4, 0.6, rows)
+        control = rng.uniform(0.4, 0.6, rows)
+        n = rng.integers(1_000, 100_000, rows).astype(float)
+        baseline = rng.uniform(0.01, 0.5, rows)
+        delta = rng.uniform(1, 10, rows)
+        calls = {
+            "run_significance_tests": lambda: run_significance_tests(
+                test, control, n, n, "two"
+            ),
+            "sample_size_grid_for_proportions": lambda: (
+                sample_size_grid_for_proportions(
+                    baseline, baseline * 1.1, 0.05, 0.8, 0.5, "two"
+                )
+            ),
+            "sample_size_grid_for_means": lambda: sample_size_grid_for_means(
+                delta, 20.0, 0.05, 0.8, 0.5, "two"
+            ),
+        }
+        for name, call in calls.items():
+            seconds = _seconds_per_call(call, 1, repeat)
+            results.append(_result("batch", name, rows / seconds, "rows/s", rows=rows))
+        rows *= 10
+    return results
+
+
+def bench_cli(runs=5):
+    """Wall-clock time from process start to exit for each command-line script."""
+    results = []
+    for name, command in CLI_COMMANDS.items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable] + command,
+                cwd=HERE,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            timings.append(time.perf_counter() - start)
+        results.append(
+            _result("cli", name, statistics.median(timings) * 1e3, "ms", runs=runs)
+        )
+    return results
+
+
+def _write_events(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    variants = np.where(rng.random(rows) < 0.5, "control", "treatment")
+    values = rng.normal(50, 10, rows)
+    with open(path, "w") as handle:
+        handle.write("variant,value\n")
+        for start in range(0, rows, 100_000):
+            stop = start + 100_000
+            handle.writelines(
+                f"{variant},{value:.6f}\n"
+                for variant, value in zip(
+                    variants[start:stop].tolist(), values[start:stop].tolist()
+                )
+            )
+
+
+def bench_aggregation(rows=1_000_000, chunk_size=100_000, repeat=3):
+    """Throughput of aggregate_file over a generated CSV, in MB/s."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.csv")
+        _write_events(path, rows)
+        megabytes = os.path.getsize(path) / 1e6
+        seconds = _seconds_per_call(
+            lambda: aggregate_file(path, chunk_size=chunk_size), 1, repeat
+        )
+    return [
+        _result(
+            "aggregation",
+            "aggregate_file",
+            megabytes / seconds,
+            "MB/s",
+            rows=rows,
+            megabytes=round(megabytes, 2),
+        )
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(groups=GROUPS, quick=False):
+    """Run the selected benchmark groups and return a JSON-serializable report."""
+    runners = {
+        "scalar": lambda: bench_scalar(number=2_000 if quick else 20_000),
+        "batch": lambda: bench_batch(max_rows=10**5 if quick else 10**7),
+        "cli": lambda: bench_cli(runs=1 if quick else 5),
+        "aggregation": lambda: bench_aggregation(rows=50_000 if quick else 1_000_000),
+    }
+    results = []
+    for group in groups:
+        results.extend(runners[group]())
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def _key(result):
+    return (result["group"], result["name"], result.get("rows"))
+
+
+def compare_reports(current, baseline, threshold=0.10):
+    """Pair up matching results and flag those that got slower by more than threshold.
+
+    Latencies (us, ms) regress when they grow; throughputs (rows/s, MB/s) when
+    they shrink. Returns (key, baseline value, current value, change, regressed)
+    tuples, where change is the relative slowdown.
+    """
+    previous = {_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = previous.get(_key(result))
+        if old is None or old["unit"] != result["unit"]:
+            continue
+        if result["unit"] in ("us", "ms"):
+            change = result["value"] / old["value"] - 1
+        else:
+            change = old["value"] / result["value"] - 1
+        rows.append(
+            (_key(result), old["value"], result["value"], change, change > threshold)
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool measures the speed of the significance-test and sample-size code: scalar call latency, batch throughput from 1,000 to 10 million rows, command-line start-up time and streaming aggregation throughput. Results are printed and, with --output, written to a JSON file tagged with the current git commit. Pass an earlier results file with --compare to flag regressions.
+
+        Examples of usage:
+        1. Full run:
+           Command:
+           python benchmark.py --output bench.json
+
+        2. Quick check against a previous commit:
+           Command:
+           python benchmark.py --quick --output new.json --compare bench.json
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="JSON file to write results to (by default results are only printed).",
+    )
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        choices=list(GROUPS),
+        default=list(GROUPS),
+        help="Benchmark groups to run (default is all).",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Smaller sizes and fewer repeats, for a fast smoke run.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        required=False,
+        help="Earlier results file to compare against.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown reported as a regression (default is 0.10).",
+    )
+
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.groups, args.quick)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    print("\nBenchmark Results")
+    print("----------------------------")
+    for result in report["results"]:
+        rows = f" [{result['rows']} rows]" if "rows" in result else ""
+        print(
+            f"{result['group']:<12} {result['name']}{rows}: "
+            f"{result['value']:,.3f} {result['unit']}"
+        )
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        comparison = compare_reports(report, baseline, args.threshold)
+        print(f"\nComparison with {baseline.get('commit') or args.compare}")
+        print("----------------------------")
+        for key, old, new, change, regressed in comparison:
+            group, name, rows = key
+            rows = f" [{rows} rows]" if rows is not None else ""
+            flag = "  REGRESSION" if regressed else ""
+            print(
+                f"{group:<12} {name}{rows}: {old:,.3f} -> {new:,.3f} "
+                f"({change:+.1%} slowdown){flag}"
+            )
+        if any(row[-1] for row in comparison):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
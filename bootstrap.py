@@ -0,0 +1,553 @@
+import argparse
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from aggregate import iter_chunks
+
+BootstrapResult = namedtuple(
+    "BootstrapResult", ["difference", "ci_lower", "ci_upper", "p_value", "replicates"]
+)
+
+# Replicates are generated in fixed-size blocks, each with its own child seed, so
+# results depend only on the seed and not on how many processes share the work.
+BLOCK_REPLICATES = 500
+
+# Upper bound on the Poisson weight matrix materialized at once (replicates x rows).
+MAX_WEIGHT_CELLS = 1 << 23
+
+
+class PoissonBootstrap:
+    """Per-replicate weighted sums for a Poisson bootstrap of the mean.
+
+    Every observation gets an independent Poisson(1) weight in every replicate, so
+    chunks can be added one at a time and shards with different seeds merge by
+    addition. State is O(n_replicates) however many rows are seen.
+    """
+
+    def __init__(self, n_replicates, seed=None):
+        self.n_replicates = n_replicates
+        self.sums = np.zeros(n_replicates)
+        self.weights = np.zeros(n_replicates)
+        self._seed = _seed_sequence(seed)
+        self._rng = np.random.default_rng(self._seed)
+
+    def update(self, values, counts=None):
+        """Add a chunk of observations; counts gives the multiplicity of each value."""
+        values = np.asarray(values, dtype=float)
+        counts = np.ones(values.size) if counts is None else np.asarray(counts)
+        step = max(1, MAX_WEIGHT_CELLS // self.n_replicates)
+        for start in range(0, values.size, step):
+            chunk_values = values[start : start + step]
+            # A value seen c times gets a Poisson(c) weight: the sum of c Poisson(1) draws.
+            weights = self._rng.poisson(
+                counts[start : start + step],
+                size=(self.n_replicates, chunk_values.size),
+            ).astype(float)
+            self.sums += weights @ chunk_values
+            self.weights += weights.sum(axis=1)
+
+    def merge(self, other):
+        """Return a new accumulator holding both inputs.
+
+        Its weights for later updates come from a child of this accumulator's
+        seed, so a merged accumulator that keeps growing stays reproducible.
+        """
+        merged = PoissonBootstrap(self.n_replicates, self._seed.spawn(1)[0])
+        merged.sums = self.sums + other.sums
+        merged.weights = self.weights + other.weights
+        return merged
+
+    def means(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.weights
+
+
+class BinnedValues:
+    """Streaming per-bucket counts and sums of values in log-spaced buckets.
+
+    A value x falls in the bucket ceil(log(|x|) / log(gamma)) of its sign, and
+    zeros in a bucket of their own, so the values in one bucket differ by less
+    than a factor gamma = (1 + relative_accuracy) / (1 - relative_accuracy).
+    Each bucket is resampled as a single value, its exact mean, so the observed
+    means are exact. The number of buckets depends on the range of magnitudes,
+    not on the number of rows, and shards merge by adding buckets.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0)
+        self.sums = np.zeros(0)
+
+    def _add(self, keys, counts, sums):
+        keys, inverse = np.unique(
+            np.concatenate([self.keys, keys]), return_inverse=True
+        )
+        inverse = inverse.ravel()
+        self.keys = keys
+        self.counts = np.bincount(
+            inverse, weights=np.concatenate([self.counts, counts]), minlength=len(keys)
+        )
+        self.sums = np.bincount(
+            inverse, weights=np.concatenate([self.sums, sums]), minlength=len(keys)
+        )
+
+    def update(self, values):
+        """Add a chunk of finite values; infinite or NaN values raise ValueError."""
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        if not np.isfinite(values).all():
+            raise ValueError("Values must be finite to be bucketed.")
+        with np.errstate(divide="ignore"):
+            index = np.ceil(np.log(np.abs(values)) / self._log_gamma)
+        # Sign in the lowest digits: 0 for negative, 1 for zero, 2 for positive.
+        index = np.where(values == 0, 0, index).astype(np.int64)
+        self._add(
+            3 * index + np.sign(values).astype(np.int64) + 1,
+            np.ones(values.size),
+            values,
+        )
+
+    def merge(self, other):
+        """Return a new histogram holding both inputs."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Cannot merge histograms with different relative accuracy."
+            )
+        merged = BinnedValues(self.relative_accuracy)
+        merged._add(self.keys, self.counts, self.sums)
+        merged._add(other.keys, other.counts, other.sums)
+        return merged
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        return self.sums.sum() / self.counts.sum()
+
+    def values(self):
+        """(bucket means, counts) to resample."""
+        return self.sums / self.counts, self.counts.astype(np.int64)
+
+
+def _seed_sequence(seed):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def _compress(values, bins=None):
+    """Collapse values to (distinct value, count) pairs, optionally into at most bins groups.
+
+    Binning merges runs of sorted values into equal-count groups represented by
+    their mean. The mean is preserved exactly but within-group spread is dropped,
+    so binned intervals are slightly narrow; use enough bins (thousands) that
+    this is negligible.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    unique_values, counts = np.unique(values, return_counts=True)
+    if bins is None or unique_values.size <= bins:
+        return unique_values, counts
+    cumulative = np.cumsum(counts)
+    group = np.minimum((cumulative - 1) * bins // cumulative[-1], bins - 1)
+    group_counts = np.bincount(group, weights=counts, minlength=bins)
+    group_sums = np.bincount(group, weights=unique_values * counts, minlength=bins)
+    keep = group_counts > 0
+    return group_sums[keep] / group_counts[keep], group_counts[keep]
+
+
+def _multinomial_means(values, counts, n_replicates, rng):
+    total = counts.sum()
+    resampled = rng.multinomial(total, counts / total, size=n_replicates)
+    return resampled @ values / total
+
+
+def _replicate_block(args):
+    """Bootstrap means of one arm for one block of replicates."""
+    values, counts, n_replicates, seed, method = args
+    if method == "poisson":
+        accumulator = PoissonBootstrap(n_replicates, seed)
+        accumulator.update(values, counts)
+        return accumulator.means()
+    return _multinomial_means(values, counts, n_replicates, np.random.default_rng(seed))
+
+
+def bootstrap_means(
+    values,
+    n_replicates=10_000,
+    seed=None,
+    method="poisson",
+    processes=None,
+    bins=None,
+):
+    """Return n_replicates bootstrap means of values, spreading blocks over a process pool.
+
+    Work per replicate is proportional to the number of distinct values (or bins),
+    not the number of rows.
+    """
+    unique_values, counts = _compress(values, bins)
+    return _bootstrap_counts(
+        unique_values, counts, n_replicates, seed, method, processes
+    )
+
+
+def _bootstrap_counts(unique_values, counts, n_replicates, seed, method, processes):
+    """Bootstrap means of values given with their multiplicities."""
+    if method not in ("poisson", "multinomial"):
+        raise ValueError(f"method must be 'poisson' or 'multinomial', got {method!r}")
+    block_sizes = [BLOCK_REPLICATES] * (n_replicates // BLOCK_REPLICATES)
+    if n_replicates % BLOCK_REPLICATES:
+        block_sizes.append(n_replicates % BLOCK_REPLICATES)
+    seeds = _seed_sequence(seed).spawn(len(block_sizes))
+    tasks = [
+        (unique_values, counts, size, block_seed, method)
+        for size, block_seed in zip(block_sizes, seeds)
+    ]
+    if processes == 1 or len(tasks) <= 1:
+        blocks = list(map(_replicate_block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            blocks = list(pool.map(_replicate_block, tasks))
+    return np.concatenate(blocks)
+
+
+def _summarize(difference, replicates, confidence, tail_type):
+    replicates = replicates[np.isfinite(replicates)]
+    alpha = 1 - confidence
+    ci_lower, ci_upper = np.quantile(replicates, [alpha / 2, 1 - alpha / 2])
+    # Share of replicates on the far side of zero, matching the percentile interval.
+    below = np.mean(replicates <= 0)
+    above = np.mean(replicates >= 0)
+    tail_p = min(below, above)
+    if tail_type == "two":
+        p_value = min(1.0, 2 * tail_p)
+    elif tail_type == "one":
+        p_value = tail_p
+    else:
+        raise ValueError(f"tail_type must be 'one' or 'two', got {tail_type!r}")
+    return BootstrapResult(
+        float(difference), float(ci_lower), float(ci_upper), float(p_value), replicates
+    )
+
+
+def bootstrap_difference(
+    test_values,
+    control_values,
+    n_replicates=10_000,
+    confidence=0.95,
+    tail_type="two",
+    seed=None,
+    method="poisson",
+    processes=None,
+    bins=None,
+):
+    """Bootstrap CI and p-value for the difference in means (test - control) of raw per-unit arrays."""
+    test_seed, control_seed = _seed_sequence(seed).spawn(2)
+    test_means = bootstrap_means(
+        test_values, n_replicates, test_seed, method, processes, bins
+    )
+    control_means = bootstrap_means(
+        control_values, n_replicates, control_seed, method, processes, bins
+    )
+    difference = np.mean(test_values) - np.mean(control_values)
+    return _summarize(difference, test_means - control_means, confidence, tail_type)
+
+
+def bootstrap_binned_difference(
+    test,
+    control,
+    n_replicates=10_000,
+    confidence=0.95,
+    tail_type="two",
+    seed=None,
+    method="poisson",
+    processes=None,
+):
+    """Bootstrap CI and p-value for the difference in means of two BinnedValues.
+
+    Work per replicate is proportional to the number of buckets, so this is the
+    fast way to bootstrap millions of rows; see BinnedValues for the accuracy.
+    """
+    test_seed, control_seed = _seed_sequence(seed).spawn(2)
+    test_means = _bootstrap_counts(
+        *test.values(), n_replicates, test_seed, method, processes
+    )
+    control_means = _bootstrap_counts(
+        *control.values(), n_replicates, control_seed, method, processes
+    )
+    difference = test.mean() - control.mean()
+    return _summarize(difference, test_means - control_means, confidence, tail_type)
+
+
+def bootstrap_proportion_difference(
+    successes_test,
+    n_test,
+    successes_control,
+    n_control,
+    n_replicates=10_000,
+    confidence=0.95,
+    tail_type="two",
+    seed=None,
+):
+    """Bootstrap CI and p-value for a difference in proportions from success counts.
+
+    Resampling n units of 0/1 data is a binomial draw of the success count, so
+    each replicate costs O(1) whatever the sample size.
+    """
+    rng = np.random.default_rng(seed)
+    test_props = rng.binomial(n_test, successes_test / n_test, n_replicates) / n_test
+    control_props = (
+        rng.binomial(n_control, successes_control / n_control, n_replicates) / n_control
+    )
+    difference = successes_test / n_test - successes_control / n_control
+    return _summarize(difference, test_props - control_props, confidence, tail_type)
+
+
+def bin_arm_values(
+    path,
+    variant_column,
+    value_column,
+    variants,
+    file_format=None,
+    relative_accuracy=0.005,
+):
+    """Stream an event file into {variant: BinnedValues}; memory does not grow with the rows."""
+    arms = {variant: BinnedValues(relative_accuracy) for variant in variants}
+    for chunk_variants, chunk_values in iter_chunks(
+        path, variant_column, value_column, file_format=file_format
+    ):
+        for variant in variants:
+            arms[variant].update(chunk_values[chunk_variants == variant])
+    return arms
+
+
+def _load_arm_values(path, variant_column, value_column, variants, file_format):
+    arms = {variant: [] for variant in variants}
+    for chunk_variants, chunk_values in iter_chunks(
+        path, variant_column, value_column, file_format=file_format
+    ):
+        for variant in variants:
+            arms[variant].append(chunk_values[chunk_variants == variant])
+    return {
+        variant: np.concatenate(chunks) if chunks else np.array([])
+        for variant, chunks in arms.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool computes bootstrap confidence intervals and p-values for the difference in means between a test and a control group from raw per-unit data, without assuming normality. It suits skewed metrics such as revenue.
+
+        The file is streamed into log-spaced buckets per group (see --relative_accuracy), so memory does not grow with the number of rows and each replicate costs time proportional to the number of buckets. Use --exact to resample every value instead.
+
+        Replicates are spread over a process pool. Each block of replicates has its own seed derived from --seed, so results are reproducible whatever the number of processes.
+
+        Examples of usage:
+        1. Revenue per user from a CSV log:
+           Command:
+           python bootstrap.py --input events.csv --test_variant treatment --control_variant control --value_column revenue --replicates 10000 --seed 42
+
+        2. Conversion counts (no raw file needed):
+           Command:
+           python bootstrap.py --successes_test 1300 --n_test 25000 --successes_control 1200 --n_control 25000 --seed 42
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input", type=str, required=False, help="Path to a CSV or JSONL event file."
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=False,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=False,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--value_column",
+        type=str,
+        default="value",
+        help="Column holding the per-unit metric value (default is 'value').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--successes_test",
+        type=int,
+        required=False,
+        help="Number of successes in the test group (proportion mode).",
+    )
+    parser.add_argument(
+        "--n_test", type=int, required=False, help="Sample size for the test group."
+    )
+    parser.add_argument(
+        "--successes_control",
+        type=int,
+        required=False,
+        help="Number of successes in the control group (proportion mode).",
+    )
+    parser.add_argument(
+        "--n_control",
+        type=int,
+        required=False,
+        help="Sample size for the control group.",
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=["poisson", "multinomial"],
+        default="poisson",
+        help="Resampling scheme for raw data (default is 'poisson').",
+    )
+    parser.add_argument(
+        "--relative_accuracy",
+        type=float,
+        default=0.005,
+        help="Width of the log-spaced buckets the file is streamed into (default is 0.005). Each bucket is resampled as its exact mean, so the observed difference is exact and the interval is approximate to well under 1%%.",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Load both groups into memory and resample every distinct value. Exact, but the work is distinct values x replicates, which is slow for continuous metrics.",
+    )
+    parser.add_argument(
+        "--bins",
+        type=int,
+        required=False,
+        help="With --exact, collapse each group's values into at most this many equal-count bins.",
+    )
+    parser.add_argument(
+        "--replicates",
+        type=int,
+        default=10_000,
+        help="Number of bootstrap replicates (default is 10000).",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        default="two",
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the interval (default is 0.95).",
+    )
+    parser.add_argument(
+        "--seed", type=int, required=False, help="Random seed for reproducible results."
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes used for replicates (default is one per CPU).",
+    )
+
+    args = parser.parse_args()
+
+    if args.input:
+        if not all([args.test_variant, args.control_variant]):
+            parser.error("Test and control variants must be provided with --input.")
+        if args.bins is not None and not args.exact:
+            parser.error("--bins requires --exact.")
+        variants = [args.test_variant, args.control_variant]
+        if args.exact:
+            arms = _load_arm_values(
+                args.input,
+                args.variant_column,
+                args.value_column,
+                variants,
+                args.format,
+            )
+            sizes = [values.size for values in arms.values()]
+        else:
+            try:
+                arms = bin_arm_values(
+                    args.input,
+                    args.variant_column,
+                    args.value_column,
+                    variants,
+                    args.format,
+                    args.relative_accuracy,
+                )
+            except ValueError as error:
+                parser.error(str(error))
+            sizes = [arm.n for arm in arms.values()]
+        for variant, size in zip(arms, sizes):
+            if size == 0:
+                parser.error(f"Variant {variant!r} not found in {args.input}.")
+        options = (
+            args.replicates,
+            args.confidence,
+            args.tail,
+            args.seed,
+            args.method,
+            args.processes,
+        )
+        if args.exact:
+            result = bootstrap_difference(
+                arms[args.test_variant],
+                arms[args.control_variant],
+                *options,
+                args.bins,
+            )
+        else:
+            result = bootstrap_binned_difference(
+                arms[args.test_variant], arms[args.control_variant], *options
+            )
+        mode = "Difference in Means"
+    else:
+        counts = [
+            args.successes_test,
+            args.n_test,
+            args.successes_control,
+            args.n_control,
+        ]
+        if any(value is None for value in counts):
+            parser.error(
+                "Provide --input, or successes and sample sizes for both groups."
+            )
+        result = bootstrap_proportion_difference(
+            *counts, args.replicates, args.confidence, args.tail, args.seed
+        )
+        mode = "Difference in Proportions"
+
+    print("\nBootstrap Results:")
+    print("----------------------------")
+    print(f"Estimate: {mode}")
+    print(f"Tail Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Replicates: {args.replicates}")
+    print(f"Observed Difference: {result.difference}")
+    print(
+        f"{args.confidence:.0%} Confidence Interval: "
+        f"[{result.ci_lower}, {result.ci_upper}]"
+    )
+    print(f"P-Value: {result.p_value:.4f}")
+    print(f"Significant: {'Yes' if result.p_value < (1 - args.confidence) else 'No'}")
+
+
+if __name__ == "__main__":
+    main()
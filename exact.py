@@ -0,0 +1,260 @@
+"""Exact tests for many 2x2 tables of successes and trials.
+
+fisher_exact conditions on both margins and sums hypergeometric tails. It works
+on all tables at once: their supports are laid end to end in one flat array and
+summed per table with bincount. barnard_exact and boschloo_exact are
+unconditional. They take the supremum over the nuisance success rate of the
+probability of a table at least as extreme as the one observed. The ordering of
+outcomes and the running supremum depend only on the two group sizes, so they
+are computed once per (n_test, n_control) and cached; after that each table is
+a binary search. Log-factorials come from a table that grows on demand.
+"""
+
+import math
+from functools import lru_cache
+import numpy as np
+
+ALTERNATIVES = ("two-sided", "greater", "less")
+
+# Grid of nuisance success rates over which the unconditional p-value is
+# maximized. The probability of the rejection region is smooth in the rate,
+# so the grid maximum is within about 1e-4 of the true supremum.
+NUISANCE_POINTS = 1001
+# Tables of the same size are compared with this relative tolerance, so
+# outcomes tied with the observed one up to rounding count as at least as extreme.
+TIE_TOLERANCE = 1e-7
+# Largest number of outcomes, (n_test + 1) * (n_control + 1), of an unconditional
+# test; about 360 per group. The design grows with this count times
+# NUISANCE_POINTS, and Fisher's or the z-test suits larger tables anyway.
+MAX_UNCONDITIONAL_OUTCOMES = 1 << 17
+
+
+class LogFactorials:
+    """Cache of log(n!) for n = 0, 1, 2, ... that doubles whenever a larger n is needed."""
+
+    BLOCK = 4096
+
+    def __init__(self, size=1024):
+        self.table = np.zeros(1)
+        self._grow(size)
+
+    def _grow(self, size):
+        start = len(self.table)
+        if size <= start:
+            return
+        # Cumulative sums restart at every block from math.lgamma, so rounding
+        # error does not build up across millions of terms.
+        pieces = []
+        for block_start in range(start, size, self.BLOCK):
+            block = np.arange(block_start, min(block_start + self.BLOCK, size))
+            pieces.append(math.lgamma(block_start) + np.cumsum(np.log(block)))
+        self.table = np.concatenate([self.table] + pieces)
+
+    def __call__(self, n):
+        n = np.asarray(n, dtype=np.intp)
+        largest = int(n.max()) if n.size else 0
+        if largest >= len(self.table):
+            self._grow(max(largest + 1, 2 * len(self.table)))
+        return self.table[n]
+
+
+log_factorial = LogFactorials()
+
+
+def log_binomial(n, k):
+    return log_factorial(n) - log_factorial(k) - log_factorial(np.subtract(n, k))
+
+
+def _counts(successes_test, n_test, successes_control, n_control):
+    arrays = np.broadcast_arrays(
+        *(
+            np.asarray(values, dtype=np.int64)
+            for values in (successes_test, n_test, successes_control, n_control)
+        )
+    )
+    a, n1, c, n2 = (array.ravel() for array in arrays)
+    if (a < 0).any() or (c < 0).any() or (a > n1).any() or (c > n2).any():
+        raise ValueError("Successes must be between 0 and the group size.")
+    return arrays[0].shape, a, n1, c, n2
+
+
+def _check_alternative(alternative):
+    if alternative not in ALTERNATIVES:
+        raise ValueError(
+            f"alternative must be one of {', '.join(ALTERNATIVES)}, got {alternative!r}"
+        )
+
+
+def _log_hypergeometric(x, n1, k, n2):
+    """log P(X = x) for X successes in the test group given k successes overall."""
+    return (
+        log_binomial(k, x)
+        + log_binomial(n1 + n2 - k, n1 - x)
+        - log_binomial(n1 + n2, n1)
+    )
+
+
+def fisher_exact(
+    successes_test, n_test, successes_control, n_control, alternative="two-sided"
+):
+    """Fisher's exact test p-values for arrays of 2x2 tables.
+
+    'greater' tests a higher success rate in the test group; 'two-sided' sums
+    every outcome no more likely than the observed one.
+    """
+    _check_alternative(alternative)
+    shape, a, n1, c, n2 = _counts(successes_test, n_test, successes_control, n_control)
+    k = a + c
+    lower = np.maximum(0, k - n2)
+    lengths = np.minimum(k, n1) - lower + 1
+    # Every table's support, laid end to end.
+    table = np.repeat(np.arange(len(a)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    x = lower[table] + np.arange(int(lengths.sum())) - starts[table]
+    log_pmf = _log_hypergeometric(x, n1[table], k[table], n2[table])
+    if alternative == "greater":
+        extreme = x >= a[table]
+    elif alternative == "less":
+        extreme = x <= a[table]
+    else:
+        log_observed = _log_hypergeometric(a, n1, k, n2)
+        extreme = log_pmf <= log_observed[table] + math.log1p(TIE_TOLERANCE)
+    p_values = np.bincount(
+        table, weights=np.where(extreme, np.exp(log_pmf), 0.0), minlength=len(a)
+    )
+    return np.minimum(p_values, 1.0).reshape(shape)
+
+
+def _pooled_z(a, n1, c, n2):
+    """Pooled two-proportion z statistic, 0 where both groups are all successes or all failures."""
+    pooled = (a + c) / (n1 + n2)
+    variance = pooled * (1 - pooled) * (1 / n1 + 1 / n2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (a / n1 - c / n2) / np.sqrt(variance)
+    return np.where(variance > 0, z, 0.0)
+
+
+def _extremeness(method, a, n1, c, n2, alternative):
+    """Larger values are more extreme under the alternative."""
+    if method == "boschloo":
+        return -fisher_exact(a, n1, c, n2, alternative)
+    z = _pooled_z(a, n1, c, n2)
+    if alternative == "greater":
+        return z
+    if alternative == "less":
+        return -z
+    return np.abs(z)
+
+
+@lru_cache(maxsize=16)
+def _unconditional_design(method, n1, n2, alternative):
+    """Outcome extremeness sorted most extreme first, and the supremum tail probability.
+
+    supremum[j] is the largest probability, over the nuisance grid, of the j + 1
+    most extreme outcomes.
+    """
+    x1 = np.repeat(np.arange(n1 + 1), n2 + 1)
+    x2 = np.tile(np.arange(n2 + 1), n1 + 1)
+    extremeness = _extremeness(method, x1, n1, x2, n2, alternative)
+    order = np.argsort(-extremeness, kind="stable")
+    rates = np.linspace(0, 1, NUISANCE_POINTS)[:, None]
+    with np.errstate(divide="ignore"):
+        log_rates = np.log(rates)
+        log_complements = np.log1p(-rates)
+    supremum = np.zeros(len(order))
+    # Limit each batch of nuisance values to about a million cells.
+    batch = max(1, (1 << 20) // len(order))
+    for start in range(0, len(rates), batch):
+        stop = start + batch
+        arms = []
+        for n, x in ((n1, x1[order]), (n2, x2[order])):
+            values = np.arange(n + 1)
+            # 0 * log(0) is taken as 0, so the rates 0 and 1 put all mass on one outcome.
+            with np.errstate(invalid="ignore"):
+                log_pmf = (
+                    log_binomial(n, values)
+                    + np.where(values > 0, values * log_rates[start:stop], 0.0)
+                    + np.where(
+                        values < n, (n - values) * log_complements[start:stop], 0.0
+                    )
+                )
+            arms.append(np.exp(log_pmf)[:, x])
+        cumulative = np.cumsum(arms[0] * arms[1], axis=1)
+        np.maximum(supremum, cumulative.max(axis=0), out=supremum)
+    return extremeness[order], np.minimum(supremum, 1.0)
+
+
+def _unconditional(
+    method, successes_test, n_test, successes_control, n_control, alternative
+):
+    _check_alternative(alternative)
+    shape, a, n1, c, n2 = _counts(successes_test, n_test, successes_control, n_control)
+    outcomes = (n1 + 1) * (n2 + 1)
+    if outcomes.size and outcomes.max() > MAX_UNCONDITIONAL_OUTCOMES:
+        raise ValueError(
+            f"{method.capitalize()}'s test supports at most "
+            f"{MAX_UNCONDITIONAL_OUTCOMES} outcomes, (n_test + 1) * (n_control + 1), "
+            f"got {int(outcomes.max())}; use Fisher's exact test or the z-test."
+        )
+    observed = _extremeness(method, a, n1, c, n2, alternative)
+    p_values = np.empty(len(a))
+    designs, index = np.unique(np.stack([n1, n2], axis=1), axis=0, return_inverse=True)
+    index = index.ravel()
+    for design, (size_test, size_control) in enumerate(designs.tolist()):
+        rows = np.flatnonzero(index == design)
+        sorted_extremeness, supremum = _unconditional_design(
+            method, size_test, size_control, alternative
+        )
+        threshold = observed[rows] - TIE_TOLERANCE * np.abs(observed[rows]) - 1e-12
+        # Number of outcomes at least as extreme as each observed table.
+        at_least = np.searchsorted(-sorted_extremeness, -threshold, side="right")
+        p_values[rows] = supremum[at_least - 1]
+    return p_values.reshape(shape)
+
+
+def barnard_exact(
+    successes_test, n_test, successes_control, n_control, alternative="two-sided"
+):
+    """Barnard's unconditional exact test, ordering outcomes by the pooled z statistic."""
+    return _unconditional(
+        "barnard", successes_test, n_test, successes_control, n_control, alternative
+    )
+
+
+def boschloo_exact(
+    successes_test, n_test, successes_control, n_control, alternative="two-sided"
+):
+    """Boschloo's unconditional exact test, ordering outcomes by Fisher's p-value.
+
+    Never less powerful than Fisher's exact test. The two-sided p-value is twice
+    the smaller one-sided p-value, as in scipy.stats.boschloo_exact.
+    """
+    if alternative != "two-sided":
+        return _unconditional(
+            "boschloo",
+            successes_test,
+            n_test,
+            successes_control,
+            n_control,
+            alternative,
+        )
+    one_sided = [
+        _unconditional(
+            "boschloo", successes_test, n_test, successes_control, n_control, side
+        )
+        for side in ("greater", "less")
+    ]
+    return np.minimum(1.0, 2 * np.minimum(*one_sided))
+
+
+def min_expected_count(successes_test, n_test, successes_control, n_control):
+    """Smallest expected cell count of each 2x2 table under no difference."""
+    successes_test, n_test, successes_control, n_control = (
+        np.asarray(values, dtype=float)
+        for values in (successes_test, n_test, successes_control, n_control)
+    )
+    total = n_test + n_control
+    successes = successes_test + successes_control
+    smaller_column = np.minimum(successes, total - successes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.minimum(n_test, n_control) * smaller_column / total
@@ -0,0 +1,461 @@
+import argparse
+import math
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import normal
+from samplesize import (
+    calculate_sample_size_for_proportions,
+    calculate_sample_size_for_means,
+)
+
+GroupSequentialDesign = namedtuple(
+    "GroupSequentialDesign",
+    [
+        "information_fractions",
+        "boundaries",
+        "nominal_alpha",
+        "cumulative_alpha",
+        "drift",
+        "inflation_factor",
+        "expected_fraction_h0",
+        "expected_fraction_h1",
+    ],
+)
+
+GroupSequentialPlan = namedtuple(
+    "GroupSequentialPlan",
+    [
+        "design",
+        "fixed_sample_size",
+        "max_sample_size",
+        "look_sample_sizes",
+        "expected_sample_size_h0",
+        "expected_sample_size_h1",
+    ],
+)
+
+SPENDING_FUNCTIONS = ("obrien_fleming", "pocock")
+
+# Odd so Simpson's rule applies. The density between looks is smooth, so this
+# grid already matches a 641-point grid to 1e-5 on the z scale.
+GRID_POINTS = 161
+# Boundaries are capped here: a z-statistic beyond it has probability < 1e-15.
+MAX_BOUNDARY = 8.0
+# One-sided designs never stop for futility; the open lower end of the
+# continuation region is truncated this many standard deviations below its mean.
+LOWER_TRUNCATION = 8.0
+
+
+def alpha_spent(t, alpha, spending, tail="two"):
+    """Cumulative type-I error spent by information fraction t (Lan-DeMets spending functions)."""
+    t = np.asarray(t, dtype=float)
+    if spending == "obrien_fleming":
+        # Spent separately on each side of a two-tailed test, as in gsDesign and East.
+        per_side = alpha / 2 if tail == "two" else alpha
+        with np.errstate(divide="ignore"):
+            spent = 2 * normal.sf_array(normal.ppf(1 - per_side / 2) / np.sqrt(t))
+        return 2 * spent if tail == "two" else spent
+    if spending == "pocock":
+        return alpha * np.log1p((math.e - 1) * t)
+    raise ValueError(
+        f"spending must be one of {', '.join(SPENDING_FUNCTIONS)}, got {spending!r}"
+    )
+
+
+def _simpson_weights(lower, upper, points=GRID_POINTS):
+    grid = np.linspace(lower, upper, points)
+    weights = np.ones(points)
+    weights[1:-1:2] = 4
+    weights[2:-1:2] = 2
+    return grid, weights * (grid[1] - grid[0]) / 3
+
+
+def _cdf(x):
+    return normal.sf_array(-np.asarray(x))
+
+
+class _Stages:
+    """Armitage-McPherson-Rowe recursion over the looks of one design and drift.
+
+    The score statistic S(t) = Z(t) * sqrt(t) is Brownian motion with the given
+    drift on the information scale, so the sub-density of Z at look k (on paths
+    that have not stopped) follows from the one at look k - 1 by a single
+    Gaussian convolution. Each density lives on a Simpson grid spanning that
+    look's continuation region; a look costs one GRID_POINTS^2 kernel.
+    """
+
+    def __init__(self, fractions, drift, tail):
+        self.fractions = fractions
+        self.drift = drift
+        self.tail = tail
+        self.grid = None
+        self.density = None
+        self.look = 0
+
+    def _shift(self):
+        """Mean and sd of S_k - S_{k-1}, and the previous S values on the grid."""
+        t = self.fractions[self.look]
+        previous = self.fractions[self.look - 1] if self.look else 0.0
+        step = t - previous
+        origin = self.grid * math.sqrt(previous) if self.look else np.zeros(1)
+        return t, origin + self.drift * step, math.sqrt(step)
+
+    def _lower(self, boundary, t):
+        if self.tail == "two":
+            return -boundary
+        return min(self.drift * math.sqrt(t) - LOWER_TRUNCATION, boundary - 1.0)
+
+    def crossing(self, boundary):
+        """Probability of stopping at the current look with the given boundary."""
+        t, centre, scale = self._shift()
+        mass = self.density if self.look else np.ones(1)
+        upper = normal.sf_array((boundary * math.sqrt(t) - centre) / scale)
+        probability = float(mass @ upper)
+        if self.tail == "two":
+            lower = _cdf((-boundary * math.sqrt(t) - centre) / scale)
+            probability += float(mass @ lower)
+        return probability
+
+    def advance(self, boundary):
+        """Move the sub-density past the current look, keeping only paths that continue."""
+        t, centre, scale = self._shift()
+        grid, weights = _simpson_weights(self._lower(boundary, t), boundary)
+        mass = self.density if self.look else np.ones(1)
+        standardized = (grid[:, None] * math.sqrt(t) - centre[None, :]) / scale
+        kernel = np.exp(-0.5 * standardized**2) * (
+            math.sqrt(t) / (scale * math.sqrt(2 * math.pi))
+        )
+        self.grid = grid
+        self.density = (kernel @ mass) * weights
+        self.look += 1
+
+
+def _solve_boundaries(fractions, alpha, spending, tail):
+    from scipy.optimize import brentq
+
+    cumulative = alpha_spent(np.array(fractions), alpha, spending, tail)
+    stages = _Stages(fractions, 0.0, tail)
+    boundaries = []
+    spent = 0.0
+    for look, target in enumerate(cumulative):
+        increment = target - spent
+        if stages.crossing(MAX_BOUNDARY) >= increment:
+            boundary = MAX_BOUNDARY
+        else:
+            boundary = brentq(
+                lambda c: stages.crossing(c) - increment, 0.0, MAX_BOUNDARY, xtol=1e-8
+            )
+        spent += stages.crossing(boundary)
+        boundaries.append(boundary)
+        if look < len(fractions) - 1:
+            stages.advance(boundary)
+    return boundaries
+
+
+def _stopping_probabilities(fractions, boundaries, drift, tail):
+    stages = _Stages(fractions, drift, tail)
+    probabilities = []
+    for look, boundary in enumerate(boundaries):
+        probabilities.append(stages.crossing(boundary))
+        if look < len(boundaries) - 1:
+            stages.advance(boundary)
+    return np.array(probabilities)
+
+
+def _expected_fraction(fractions, crossing):
+    """Expected information used, as a fraction of the maximum."""
+    stop = crossing.copy()
+    stop[-1] = 1.0 - crossing[:-1].sum()
+    return float(np.dot(fractions, stop))
+
+
+def _fractions(looks, information_fractions):
+    if information_fractions is None:
+        return tuple((np.arange(1, looks + 1) / looks).tolist())
+    fractions = tuple(float(t) for t in information_fractions)
+    if len(fractions) != looks:
+        raise ValueError(
+            f"Expected {looks} information fractions, got {len(fractions)}."
+        )
+    if any(b <= a for a, b in zip((0.0,) + fractions, fractions)) or not math.isclose(
+        fractions[-1], 1.0
+    ):
+        raise ValueError(
+            "Information fractions must be increasing, positive and end at 1."
+        )
+    return fractions[:-1] + (1.0,)
+
+
+@lru_cache(maxsize=None)
+def _design(fractions, alpha, power, spending, tail):
+    from scipy.optimize import brentq
+
+    boundaries = _solve_boundaries(fractions, alpha, spending, tail)
+    z_alpha = normal.ppf(1 - alpha / 2) if tail == "two" else normal.ppf(1 - alpha)
+    z_beta = normal.ppf(power)
+    fixed_drift = z_alpha + z_beta
+    # A group-sequential design never needs less information than the fixed
+    # design, and boundaries at most MAX_BOUNDARY bound how much more it needs.
+    drift = brentq(
+        lambda eta: _stopping_probabilities(fractions, boundaries, eta, tail).sum()
+        - power,
+        fixed_drift * 0.9,
+        fixed_drift + MAX_BOUNDARY,
+        xtol=1e-8,
+    )
+    crossing_h0 = _stopping_probabilities(fractions, boundaries, 0.0, tail)
+    crossing_h1 = _stopping_probabilities(fractions, boundaries, drift, tail)
+    tail_area = normal.sf_array(np.array(boundaries))
+    return GroupSequentialDesign(
+        fractions,
+        tuple(boundaries),
+        tuple((2 * tail_area if tail == "two" else tail_area).tolist()),
+        tuple(np.cumsum(crossing_h0).tolist()),
+        drift,
+        (drift / fixed_drift) ** 2,
+        _expected_fraction(np.array(fractions), crossing_h0),
+        _expected_fraction(np.array(fractions), crossing_h1),
+    )
+
+
+def group_sequential_design(
+    looks,
+    alpha,
+    power,
+    tail="two",
+    spending="obrien_fleming",
+    information_fractions=None,
+):
+    """Stopping boundaries and information inflation for a design with K looks.
+
+    Boundaries are on the z scale (reject when |Z| >= boundary, or Z >= boundary
+    for one-tailed tests) and depend only on the looks, alpha, tail and spending
+    function, so they are computed once and cached; planning many effect sizes or
+    baselines for the same design reuses them. Looks are equally spaced in
+    information unless information_fractions gives the cumulative fraction at
+    each look.
+    """
+    if spending not in SPENDING_FUNCTIONS:
+        raise ValueError(
+            f"spending must be one of {', '.join(SPENDING_FUNCTIONS)}, got {spending!r}"
+        )
+    if tail not in ("one", "two"):
+        raise ValueError(f"tail must be 'one' or 'two', got {tail!r}")
+    fractions = _fractions(looks, information_fractions)
+    return _design(fractions, float(alpha), float(power), spending, tail)
+
+
+def _plan(design, fixed_sample_size):
+    max_sample_size = math.ceil(fixed_sample_size * design.inflation_factor)
+    return GroupSequentialPlan(
+        design,
+        fixed_sample_size,
+        max_sample_size,
+        tuple(math.ceil(t * max_sample_size) for t in design.information_fractions),
+        design.expected_fraction_h0 * max_sample_size,
+        design.expected_fraction_h1 * max_sample_size,
+    )
+
+
+def plan_for_proportions(
+    baseline,
+    effect_size,
+    alpha,
+    power,
+    split_ratio,
+    tail,
+    looks,
+    spending="obrien_fleming",
+    information_fractions=None,
+):
+    """Group-sequential version of calculate_sample_size_for_proportions.
+
+    The maximum sample size is the fixed-horizon size scaled by the design's
+    inflation factor; expected sample sizes average over where the test stops
+    under no effect (h0) and under the planned effect (h1).
+    """
+    design = group_sequential_design(
+        looks, alpha, power, tail, spending, information_fractions
+    )
+    fixed = calculate_sample_size_for_proportions(
+        baseline, effect_size, alpha, power, split_ratio, tail
+    )
+    return _plan(design, fixed)
+
+
+def plan_for_means(
+    delta,
+    sigma,
+    alpha,
+    power,
+    split_ratio,
+    tail,
+    looks,
+    spending="obrien_fleming",
+    information_fractions=None,
+    correlation=0.0,
+):
+    """Group-sequential version of calculate_sample_size_for_means."""
+    design = group_sequential_design(
+        looks, alpha, power, tail, spending, information_fractions
+    )
+    fixed = calculate_sample_size_for_means(
+        delta, sigma, alpha, power, split_ratio, tail, correlation
+    )
+    return _plan(design, fixed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool plans a group-sequential experiment: one that is analysed at K interim looks and may stop early once the result is clear. The overall false-positive rate is spread over the looks with an O'Brien-Fleming or Pocock alpha-spending function. It reports the z-score boundary and nominal p-value threshold at each look, the maximum sample size and the expected sample size with and without a real effect.
+
+        Boundaries are computed by recursive numerical integration (Armitage-McPherson-Rowe), not by simulation, and are cached per design.
+
+        Examples of usage:
+        1. Five looks at a conversion-rate experiment:
+           Command:
+           python group_sequential.py --type proportion --tail two --baseline 0.1 --effect_size 0.12 --alpha 0.05 --power 0.8 --split_ratio 0.5 --looks 5 --spending obrien_fleming
+
+        2. Unequally spaced looks for a mean difference:
+           Command:
+           python group_sequential.py --type mean --tail one --delta 5 --sigma 20 --alpha 0.05 --power 0.8 --split_ratio 0.5 --looks 3 --spending pocock --information_fractions 0.25 0.5 1
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--type",
+        choices=["proportion", "mean"],
+        help="Specify the type of data: 'proportion' for rates or percentages, 'mean' for continuous outcomes.",
+        required=True,
+    )
+    parser.add_argument(
+        "--tail",
+        choices=["one", "two"],
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+        required=True,
+    )
+    parser.add_argument(
+        "--delta",
+        type=float,
+        help="The desired difference in means for 'mean' type.",
+        required=False,
+    )
+    parser.add_argument(
+        "--sigma",
+        type=float,
+        help="Standard deviation of the measurements for 'mean' type.",
+        required=False,
+    )
+    parser.add_argument(
+        "--baseline",
+        type=float,
+        help="Baseline value (control group rate) for proportion type experiments.",
+        required=False,
+    )
+    parser.add_argument(
+        "--effect_size",
+        type=float,
+        help="Expected outcome rate in the experimental group for proportion type experiments.",
+        required=False,
+    )
+    parser.add_argument(
+        "--alpha", type=float, help="Significance level (alpha).", required=True
+    )
+    parser.add_argument(
+        "--power", type=float, help="Target statistical power.", required=True
+    )
+    parser.add_argument(
+        "--split_ratio",
+        type=float,
+        help="The ratio of the sample size allocated to the control group.",
+        required=True,
+    )
+    parser.add_argument(
+        "--looks",
+        type=int,
+        help="Number of analyses, including the final one.",
+        required=True,
+    )
+    parser.add_argument(
+        "--spending",
+        choices=list(SPENDING_FUNCTIONS),
+        default="obrien_fleming",
+        help="Alpha-spending function (default is 'obrien_fleming').",
+    )
+    parser.add_argument(
+        "--information_fractions",
+        type=float,
+        nargs="+",
+        required=False,
+        help="Cumulative share of the maximum sample size at each look (default is equally spaced).",
+    )
+
+    args = parser.parse_args()
+
+    if args.looks < 1:
+        parser.error("--looks must be at least 1.")
+    try:
+        if args.type == "proportion":
+            if not all([args.baseline, args.effect_size]):
+                parser.error(
+                    "Baseline and effect size must be provided for proportion type."
+                )
+            plan = plan_for_proportions(
+                args.baseline,
+                args.effect_size,
+                args.alpha,
+                args.power,
+                args.split_ratio,
+                args.tail,
+                args.looks,
+                args.spending,
+                args.information_fractions,
+            )
+        else:
+            if not all([args.delta, args.sigma]):
+                parser.error("Delta and sigma must be provided for mean type.")
+            plan = plan_for_means(
+                args.delta,
+                args.sigma,
+                args.alpha,
+                args.power,
+                args.split_ratio,
+                args.tail,
+                args.looks,
+                args.spending,
+                args.information_fractions,
+            )
+    except ValueError as error:
+        parser.error(str(error))
+
+    design = plan.design
+    print("\nGroup-Sequential Design")
+    print("----------------------------")
+    print(f"Experiment Type: {args.type.capitalize()} Difference")
+    print(f"Test Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Spending Function: {args.spending}")
+    print(f"Fixed-Horizon Sample Size: {plan.fixed_sample_size}")
+    print(f"Maximum Sample Size: {plan.max_sample_size}")
+    print(f"Inflation Factor: {design.inflation_factor:.4f}")
+    print(f"Expected Sample Size (no effect): {plan.expected_sample_size_h0:.0f}")
+    print(f"Expected Sample Size (planned effect): {plan.expected_sample_size_h1:.0f}")
+    print("\nLook  Sample Size  Z Boundary  Nominal P  Cumulative Alpha")
+    for look, (size, boundary, nominal, spent) in enumerate(
+        zip(
+            plan.look_sample_sizes,
+            design.boundaries,
+            design.nominal_alpha,
+            design.cumulative_alpha,
+        ),
+        start=1,
+    ):
+        print(
+            f"{look:>4}  {size:>11}  {boundary:>10.4f}  {nominal:>9.6f}  {spent:>16.6f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
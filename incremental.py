@@ -0,0 +1,299 @@
+"""Incremental re-evaluation of append-only event logs.
+
+A small JSON checkpoint store keeps, for each log file, the byte offset read so
+far and the per-variant ArmStats aggregated up to that offset. A refresh seeks
+to the offset, reads only the bytes appended since, folds them into the stored
+aggregates with Chan's update and saves the new offset. Its cost therefore
+depends on the new data, not on the history. A trailing line without a newline
+is still being written, so it is left for the next refresh.
+
+A checkpoint also records a hash of the file's first bytes and, for CSV files,
+the header line. If the file is shorter than the offset or starts differently,
+it has been truncated or replaced, and it is read again from the beginning.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from itertools import islice
+from aggregate import (
+    ArmStats,
+    _detect_format,
+    aggregate_chunk,
+    merge_stats,
+    print_results,
+    read_keyed_chunks,
+)
+
+DEFAULT_CHECKPOINT = ".aggregate_checkpoint.json"
+# Bytes at the start of a file hashed to recognize it on the next refresh.
+FINGERPRINT_BYTES = 4096
+
+
+def checkpoint_key(path, variant_column="variant", value_column="value"):
+    """Store key of one file and column choice; other columns get their own checkpoint."""
+    return json.dumps([os.path.abspath(path), variant_column, value_column])
+
+
+def load_store(path):
+    """Read a checkpoint store, or return an empty one if it does not exist."""
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+def save_store(path, store):
+    """Write a checkpoint store atomically, so an interrupted save keeps the old one."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump(store, handle)
+    os.replace(temporary, path)
+
+
+def _fingerprint(handle, offset):
+    handle.seek(0)
+    return hashlib.sha1(handle.read(min(offset, FINGERPRINT_BYTES))).hexdigest()
+
+
+def _is_same_file(handle, checkpoint):
+    size = os.fstat(handle.fileno()).st_size
+    if size < checkpoint["offset"]:
+        return False
+    return _fingerprint(handle, checkpoint["offset"]) == checkpoint["fingerprint"]
+
+
+def refresh_file(
+    path,
+    checkpoint=None,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Fold the lines appended since checkpoint into its aggregates.
+
+    Returns (stats, checkpoint, rows): the {variant: ArmStats} over all complete
+    lines, the checkpoint to store for the next refresh, and the number of new
+    lines read. Pass checkpoint=None to start from the beginning.
+    """
+    file_format = file_format or _detect_format(path)
+    stats = {}
+    offset, header = 0, None
+    with open(path, "rb") as handle:
+        if checkpoint is not None and _is_same_file(handle, checkpoint):
+            stats = {
+                variant: ArmStats.from_dict(data)
+                for variant, data in checkpoint["stats"].items()
+            }
+            offset, header = checkpoint["offset"], checkpoint["header"]
+        handle.seek(offset)
+        if file_format == "csv" and header is None:
+            line = handle.readline()
+            if line.endswith(b"\n"):
+                header = line.decode("utf-8")
+                offset += len(line)
+            else:
+                handle.seek(offset)
+
+        rows = 0
+        while header is not None or file_format != "csv":
+            lines = list(islice(handle, chunk_size))
+            complete = lines if not lines or lines[-1].endswith(b"\n") else lines[:-1]
+            if not complete:
+                break
+            text = b"".join(complete).decode("utf-8")
+            for keys, values in read_keyed_chunks(
+                io.StringIO((header or "") + text),
+                (variant_column,),
+                (value_column,),
+                chunk_size,
+                file_format,
+            ):
+                aggregate_chunk(stats, keys[:, 0], values[:, 0])
+            offset += sum(map(len, complete))
+            rows += len(complete)
+            if len(complete) < len(lines):
+                break
+        fingerprint = _fingerprint(handle, offset)
+
+    checkpoint = {
+        "offset": offset,
+        "fingerprint": fingerprint,
+        "header": header,
+        "stats": {variant: arm.to_dict() for variant, arm in stats.items()},
+    }
+    return stats, checkpoint, rows
+
+
+def refresh_files(
+    paths,
+    store_path=DEFAULT_CHECKPOINT,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Refresh every log against the checkpoint store, save it and merge the arms.
+
+    Returns ({variant: ArmStats} over all files, number of new lines read).
+    """
+    store = load_store(store_path)
+    merged, new_rows = {}, 0
+    for path in paths:
+        key = checkpoint_key(path, variant_column, value_column)
+        stats, store[key], rows = refresh_file(
+            path, store.get(key), variant_column, value_column, chunk_size, file_format
+        )
+        merged = merge_stats(merged, stats)
+        new_rows += rows
+    save_store(store_path, store)
+    return merged, new_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool re-runs the significance test on append-only event logs (CSV or JSONL) as they grow. Byte offsets and per-variant aggregates are kept in a small checkpoint file, so each run reads only the lines appended since the previous one. With --watch it keeps refreshing at a fixed interval.
+
+        Examples of usage:
+        1. Refresh the conversion test from a growing JSONL log:
+           Command:
+           python incremental.py --input events.jsonl --test_type proportion --tail two --test_variant B --control_variant A --value_column converted
+
+        2. Re-evaluate revenue every 60 seconds with a dedicated checkpoint file:
+           Command:
+           python incremental.py --input events.jsonl --test_type mean --tail two --test_variant treatment --control_variant control --value_column revenue --checkpoint revenue.ckpt.json --watch 60
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Path to one or more append-only CSV or JSONL event files.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=DEFAULT_CHECKPOINT,
+        help=f"Checkpoint store holding offsets and aggregates (default is {DEFAULT_CHECKPOINT!r}).",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Discard the stored checkpoints and read the files from the beginning.",
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        required=False,
+        help="Keep refreshing every this many seconds until interrupted.",
+    )
+    parser.add_argument(
+        "--test_type",
+        type=str,
+        choices=["proportion", "mean"],
+        required=True,
+        help="Specify the type of data: 'proportion' for 0/1 outcomes, 'mean' for continuous outcomes.",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=True,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=True,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--value_column",
+        type=str,
+        default="value",
+        help="Column holding the per-unit metric value (default is 'value').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100_000,
+        help="Number of lines aggregated per chunk (default is 100000).",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the test (default is 0.95).",
+    )
+
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    try:
+        while True:
+            stats, new_rows = refresh_files(
+                args.input,
+                args.checkpoint,
+                args.variant_column,
+                args.value_column,
+                args.chunk_size,
+                args.format,
+            )
+            print(f"\nNew Rows: {new_rows}")
+            missing = [
+                variant
+                for variant in (args.test_variant, args.control_variant)
+                if variant not in stats
+            ]
+            if missing:
+                message = (
+                    f"Variant {missing[0]!r} not found in {', '.join(args.input)}."
+                )
+                if args.watch is None:
+                    parser.error(message)
+                print(message)
+            else:
+                print_results(
+                    stats[args.test_variant],
+                    stats[args.control_variant],
+                    args.test_type,
+                    args.tail,
+                    args.confidence,
+                )
+            if args.watch is None:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,188 @@
+import io
 import streamlit as st
 from sig_test import calculate_z_score, calculate_p_value
+from bayesian import run_bayesian_tests, better_group
 from samplesize import (
     calculate_sample_size_for_proportions,
     calculate_sample_size_for_means,
+    sample_size_grid_for_proportions,
+    sample_size_grid_for_means,
+    minimum_detectable_effect_for_proportions,
+    minimum_detectable_effect_for_means,
+    achieved_power_for_proportions,
+    achieved_power_for_means,
 )
+from scorecard import score_table
+import profiling
 import numpy as np
+import pandas as pd
 import math
 
+PAGE_SIZES = [25, 100, 500]
+SOLVE_OPTIONS = ["Sample Size", "Minimum Detectable Effect", "Achieved Power"]
+
+
+@st.cache_data(show_spinner="Reading file...")
+@profiling.instrument("main.load_upload")
+def load_upload(data, name):
+    """Parse an uploaded CSV or Parquet file; cached on the file contents."""
+    if name.lower().endswith(".parquet"):
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_csv(io.BytesIO(data))
+
+
+@st.cache_data(show_spinner="Running significance tests...")
+@profiling.instrument("main.bulk_significance")
+def bulk_significance(frame, tail_type, alpha):
+    """Score every row of an uploaded experiments table in one vectorized call."""
+    table = {name: frame[name].to_numpy() for name in frame.columns}
+    if "test_type" in table:
+        table["test_type"] = table["test_type"].astype(str)
+    return pd.DataFrame(score_table(table, tail_type, alpha))
+
+
+@st.cache_data(show_spinner="Calculating sample sizes...")
+@profiling.instrument("main.bulk_sample_sizes")
+def bulk_sample_sizes(frame, tail_type, alpha, power, split_ratio):
+    """Sample sizes for every design point; per-row columns override the defaults chosen in the tab."""
+    rows = len(frame)
+    test_types = (
+        frame["test_type"].to_numpy().astype(str)
+        if "test_type" in frame
+        else np.full(rows, "mean" if "delta" in frame else "proportion")
+    )
+
+    def column(name, default=None):
+        if name in frame:
+            return frame[name].to_numpy()
+        if default is None:
+            raise KeyError(f"missing column {name!r}")
+        return np.full(rows, default)
+
+    alpha = column("alpha", alpha).astype(float)
+    power = column("power", power).astype(float)
+    split_ratio = column("split_ratio", split_ratio).astype(float)
+    tail = column("tail", tail_type).astype(str)
+    sample_size = np.full(rows, np.nan)
+    proportion = test_types == "proportion"
+    if proportion.any():
+        sample_size[proportion] = sample_size_grid_for_proportions(
+            column("baseline")[proportion].astype(float),
+            column("effect_size")[proportion].astype(float),
+            alpha[proportion],
+            power[proportion],
+            split_ratio[proportion],
+            tail[proportion],
+        )
+    mean = test_types == "mean"
+    if mean.any():
+        sample_size[mean] = sample_size_grid_for_means(
+            column("delta")[mean].astype(float),
+            column("sigma")[mean].astype(float),
+            alpha[mean],
+            power[mean],
+            split_ratio[mean],
+            tail[mean],
+            column("correlation", 0.0)[mean].astype(float),
+        )
+    unknown = ~(proportion | mean)
+    if unknown.any():
+        raise ValueError(
+            f"test_type must be 'proportion' or 'mean', got {test_types[unknown][0]!r}"
+        )
+    result = frame.copy()
+    result["sample_size"] = sample_size
+    result["control_sample_size"] = np.ceil(sample_size * split_ratio)
+    result["test_sample_size"] = np.ceil(sample_size * (1 - split_ratio))
+    return result
+
+
+def parse_sample_sizes(text):
+    """Comma-separated total sample sizes typed into the calculator, as a float array."""
+    return np.array([float(value) for value in text.split(",") if value.strip()])
+
+
+def show_solution(sample_sizes, values, column):
+    """Show the solved MDE or power per traffic level, as one line or a table."""
+    st.subheader("Sample Size Calculation Results")
+    if len(sample_sizes) == 1:
+        value = values[0]
+        st.write(f"{column}: {'not detectable' if np.isnan(value) else f'{value:.4f}'}")
+        return
+    st.dataframe(
+        pd.DataFrame({"Total Sample Size": sample_sizes, column: values}),
+        hide_index=True,
+    )
+
+
+def show_paginated(frame, key):
+    """Sort the whole table by one column, then show one page of it."""
+    sort_column = st.selectbox("Sort By", list(frame.columns), key=f"{key}_sort")
+    ascending = st.checkbox("Ascending", value=True, key=f"{key}_ascending")
+    page_size = st.selectbox("Rows Per Page", PAGE_SIZES, key=f"{key}_page_size")
+    pages = max(1, math.ceil(len(frame) / page_size))
+    page = st.number_input(
+        f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page"
+    )
+    ordered = frame.sort_values(sort_column, ascending=ascending, kind="stable")
+    start = (page - 1) * page_size
+    st.dataframe(ordered.iloc[start : start + page_size], use_container_width=True)
+    st.download_button(
+        "Download Results",
+        ordered.to_csv(index=False),
+        file_name=f"{key}_results.csv",
+        mime="text/csv",
+        key=f"{key}_download",
+    )
+
+
+def show_bayesian(
+    test_type,
+    test_value,
+    control_value,
+    n_test,
+    n_control,
+    std_test,
+    std_control,
+    confidence,
+    prior_alpha=1.0,
+    prior_beta=1.0,
+):
+    """Probability that the test group is better and the expected loss of each choice."""
+    result = run_bayesian_tests(
+        test_value,
+        control_value,
+        n_test,
+        n_control,
+        test_type,
+        std_test,
+        std_control,
+        prior_alpha,
+        prior_beta,
+    )
+    prob_test_better = float(result.prob_test_better)
+    decision = better_group(prob_test_better, confidence)
+
+    st.subheader("Bayesian Results")
+    st.write(f"**Test Type:** {test_type.capitalize()} Test")
+    st.write(f"**Test Group Value:** {test_value}")
+    st.write(f"**Control Group Value:** {control_value}")
+    st.write(f"**Test Group Size:** {n_test}")
+    st.write(f"**Control Group Size:** {n_control}")
+    st.write(f"**Probability Test Beats Control:** {prob_test_better:.4f}")
+    st.write(f"**Expected Loss Choosing Test:** {float(result.expected_loss_test):.6g}")
+    st.write(
+        f"**Expected Loss Choosing Control:** {float(result.expected_loss_control):.6g}"
+    )
+    st.write(f"**Better Group at {confidence} Probability:** {decision}")
+
 
 def main():
     st.title("Test and Learn Tools")
 
-    tab1, tab2 = st.tabs(["Statistical Significance Test", "Sample Size Calculator"])
+    tab1, tab2, tab3 = st.tabs(
+        ["Statistical Significance Test", "Sample Size Calculator", "Bulk Upload"]
+    )
 
     with tab1:
         st.header("Statistical Significance Test Tool")
@@ -20,6 +191,9 @@ def main():
             "Select Test Type", ["proportion", "mean"], key="test_type"
         )
         tail_type = st.selectbox("Select Tail Type", ["one", "two"], key="tail_type")
+        analysis = st.radio(
+            "Analysis", ["Frequentist", "Bayesian"], key="analysis", horizontal=True
+        )
         test_value = st.number_input("Test Group Value", value=0.0, key="test_value")
         control_value = st.number_input(
             "Control Group Value", value=0.0, key="control_value"
@@ -34,10 +208,29 @@ def main():
             std_control = st.number_input(
                 "Control Group Std Dev", value=0.0, key="std_control"
             )
+        prior_alpha = prior_beta = 1.0
+        if analysis == "Bayesian" and test_type == "proportion":
+            prior_alpha = st.number_input(
+                "Beta Prior Alpha", value=1.0, key="prior_alpha"
+            )
+            prior_beta = st.number_input("Beta Prior Beta", value=1.0, key="prior_beta")
 
         if st.button("Calculate", key="calculate_significance"):
             if test_type == "mean" and (std_test is None or std_control is None):
                 st.error("Standard deviations must be provided for mean type tests.")
+            elif analysis == "Bayesian":
+                show_bayesian(
+                    test_type,
+                    test_value,
+                    control_value,
+                    n_test,
+                    n_control,
+                    std_test,
+                    std_control,
+                    confidence,
+                    prior_alpha,
+                    prior_beta,
+                )
             else:
                 if test_type == "proportion":
                     z_score = calculate_z_score(
@@ -78,8 +271,18 @@ def main():
         tail_type = st.selectbox(
             "Select Tail Type", ["one", "two"], key="sample_tail_type"
         )
+        solve_for = st.selectbox("Solve For", SOLVE_OPTIONS, key="solve_for")
         alpha = st.number_input("Significance Level (alpha)", value=0.05, key="alpha")
-        power = st.number_input("Statistical Power", value=0.8, key="power")
+        if solve_for != "Achieved Power":
+            power = st.number_input("Statistical Power", value=0.8, key="power")
+        if solve_for != "Sample Size":
+            sample_sizes = parse_sample_sizes(
+                st.text_input(
+                    "Total Sample Sizes (comma-separated)",
+                    value="10000, 50000, 100000",
+                    key="traffic_levels",
+                )
+            )
         split_ratio = st.number_input(
             "Control Group Ratio",
             value=0.5,
@@ -90,10 +293,44 @@ def main():
 
         if sample_type == "proportion":
             baseline = st.number_input("Baseline Proportion", value=0.0, key="baseline")
-            effect_size = st.number_input(
-                "Expected Proportion in Test Group", value=0.0, key="effect_size"
-            )
-            if st.button(
+            if solve_for == "Minimum Detectable Effect":
+                direction = st.selectbox(
+                    "Direction", ["increase", "decrease"], key="mde_direction"
+                )
+            else:
+                effect_size = st.number_input(
+                    "Expected Proportion in Test Group", value=0.0, key="effect_size"
+                )
+            if solve_for == "Minimum Detectable Effect":
+                if st.button("Calculate", key="calculate_mde_proportion"):
+                    show_solution(
+                        sample_sizes,
+                        minimum_detectable_effect_for_proportions(
+                            baseline,
+                            sample_sizes,
+                            alpha,
+                            power,
+                            split_ratio,
+                            tail_type,
+                            direction,
+                        ),
+                        "Minimum Detectable Proportion",
+                    )
+            elif solve_for == "Achieved Power":
+                if st.button("Calculate", key="calculate_power_proportion"):
+                    show_solution(
+                        sample_sizes,
+                        achieved_power_for_proportions(
+                            baseline,
+                            effect_size,
+                            sample_sizes,
+                            alpha,
+                            split_ratio,
+                            tail_type,
+                        ),
+                        "Achieved Power",
+                    )
+            elif st.button(
                 "Calculate Sample Size", key="calculate_sample_size_proportion"
             ):
                 sample_size = calculate_sample_size_for_proportions(
@@ -109,15 +346,53 @@ def main():
                 )
 
         elif sample_type == "mean":
-            delta = st.number_input(
-                "Desired Difference in Means (delta)", value=0.0, key="delta"
-            )
+            if solve_for != "Minimum Detectable Effect":
+                delta = st.number_input(
+                    "Desired Difference in Means (delta)", value=0.0, key="delta"
+                )
             sigma = st.number_input(
                 "Standard Deviation (sigma)", value=0.0, key="sigma"
             )
-            if st.button("Calculate Sample Size", key="calculate_sample_size_mean"):
+            correlation = st.number_input(
+                "Pre-period Covariate Correlation (CUPED)",
+                value=0.0,
+                min_value=0.0,
+                max_value=0.99,
+                key="correlation",
+            )
+            if solve_for == "Minimum Detectable Effect":
+                if st.button("Calculate", key="calculate_mde_mean"):
+                    show_solution(
+                        sample_sizes,
+                        minimum_detectable_effect_for_means(
+                            sample_sizes,
+                            sigma,
+                            alpha,
+                            power,
+                            split_ratio,
+                            tail_type,
+                            correlation,
+                        ),
+                        "Minimum Detectable Mean Difference",
+                    )
+            elif solve_for == "Achieved Power":
+                if st.button("Calculate", key="calculate_power_mean"):
+                    show_solution(
+                        sample_sizes,
+                        achieved_power_for_means(
+                            delta,
+                            sigma,
+                            sample_sizes,
+                            alpha,
+                            split_ratio,
+                            tail_type,
+                            correlation,
+                        ),
+                        "Achieved Power",
+                    )
+            elif st.button("Calculate Sample Size", key="calculate_sample_size_mean"):
                 sample_size = calculate_sample_size_for_means(
-                    delta, sigma, alpha, power, split_ratio, tail_type
+                    delta, sigma, alpha, power, split_ratio, tail_type, correlation
                 )
                 st.subheader("Sample Size Calculation Results")
                 st.write(f"Total Sample Size Required: {sample_size}")
@@ -128,6 +403,58 @@ def main():
                     f"Test Group Sample Size: {math.ceil(sample_size * (1 - split_ratio))}"
                 )
 
+    with tab3:
+        st.header("Bulk Upload")
+        st.write(
+            "Upload a CSV or Parquet file with one experiment or design point per row. "
+            "Significance tests need test_value, control_value, n_test, n_control and, "
+            "for mean rows, std_test and std_control. Sample sizes need baseline and "
+            "effect_size (proportion rows) or delta and sigma (mean rows); alpha, power, "
+            "split_ratio, tail and correlation columns override the values below."
+        )
+        mode = st.radio(
+            "Calculation", ["Significance Tests", "Sample Sizes"], key="bulk_mode"
+        )
+        uploaded = st.file_uploader(
+            "Experiments File", type=["csv", "parquet"], key="bulk_file"
+        )
+        bulk_tail = st.selectbox("Select Tail Type", ["one", "two"], key="bulk_tail")
+        bulk_alpha = st.number_input(
+            "Significance Level (alpha)", value=0.05, key="bulk_alpha"
+        )
+        if mode == "Sample Sizes":
+            bulk_power = st.number_input(
+                "Statistical Power", value=0.8, key="bulk_power"
+            )
+            bulk_split = st.number_input(
+                "Control Group Ratio",
+                value=0.5,
+                min_value=0.0,
+                max_value=1.0,
+                key="bulk_split_ratio",
+            )
+
+        if uploaded is not None:
+            try:
+                frame = load_upload(uploaded.getvalue(), uploaded.name)
+                if mode == "Significance Tests":
+                    results = bulk_significance(frame, bulk_tail, bulk_alpha)
+                else:
+                    results = bulk_sample_sizes(
+                        frame, bulk_tail, bulk_alpha, bulk_power, bulk_split
+                    )
+            except (KeyError, ValueError) as error:
+                st.error(f"Could not process {uploaded.name}: {error}")
+            else:
+                st.subheader(f"Results ({len(results)} rows)")
+                show_paginated(results, "bulk")
+
+    if profiling.enabled():
+        with st.expander("Profile"):
+            st.dataframe(pd.DataFrame(profiling.summary()), use_container_width=True)
+            if st.button("Reset Profile", key="reset_profile"):
+                profiling.reset()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+"""Standard normal cdf, sf and ppf without importing SciPy on the hot path.
+
+Scalars and small arrays are evaluated with the standard library
+(math.erfc and statistics.NormalDist). SciPy's ufuncs are only imported for
+arrays larger than SCIPY_THRESHOLD, where they pay for their import time.
+"""
+
+import math
+from statistics import NormalDist
+import numpy as np
+import profiling
+
+SCIPY_THRESHOLD = 256
+
+_STANDARD_NORMAL = NormalDist()
+_SQRT2 = math.sqrt(2.0)
+
+
+def cdf(x):
+    return 0.5 * math.erfc(-x / _SQRT2)
+
+
+def sf(x):
+    """Upper tail probability, accurate for large x where 1 - cdf(x) underflows."""
+    return 0.5 * math.erfc(x / _SQRT2)
+
+
+def ppf(q):
+    """Inverse cdf, returning -inf/inf at 0/1 and nan outside [0, 1] like SciPy."""
+    if 0.0 < q < 1.0:
+        return _STANDARD_NORMAL.inv_cdf(q)
+    if q == 0.0:
+        return -math.inf
+    if q == 1.0:
+        return math.inf
+    return math.nan
+
+
+def _apply(scalar_func, values):
+    flat = [scalar_func(value) for value in values.ravel().tolist()]
+    return np.array(flat, dtype=float).reshape(values.shape)
+
+
+@profiling.instrument("normal.sf_array")
+def sf_array(x):
+    x = np.asarray(x, dtype=float)
+    if x.size <= SCIPY_THRESHOLD:
+        return _apply(sf, x)
+    from scipy.special import ndtr
+
+    return ndtr(-x)
+
+
+@profiling.instrument("normal.ppf_array")
+def ppf_array(q):
+    q = np.asarray(q, dtype=float)
+    if q.size <= SCIPY_THRESHOLD:
+        return _apply(ppf, q)
+    from scipy.special import ndtri
+
+    return ndtri(q)
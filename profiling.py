@@ -0,0 +1,157 @@
+"""Opt-in timings, call counts and row counts for the calculation code.
+
+Functions wrapped with instrument() and blocks wrapped with stage() record into
+one process-wide table while profiling is enabled. The command-line tools
+enable it with --profile; any entry point (including the Streamlit app) can
+enable it by setting the EXPERIMENTS_PROFILE environment variable to "text" or
+"json". The summary goes to standard error when the process exits. While
+disabled, an instrumented call costs a single attribute check.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+import numpy as np
+
+ENV_VAR = "EXPERIMENTS_PROFILE"
+FORMATS = ("text", "json")
+
+
+class _State:
+    __slots__ = ("enabled", "report_format")
+
+    def __init__(self):
+        self.enabled = False
+        self.report_format = None
+
+
+_state = _State()
+# name -> [calls, seconds, rows]
+_records = {}
+
+
+def _record(name, seconds, rows):
+    record = _records.get(name)
+    if record is None:
+        record = _records[name] = [0, 0.0, 0]
+    record[0] += 1
+    record[1] += seconds
+    record[2] += rows
+
+
+def _rows(result):
+    """Rows produced by a call: the size of its first returned array or column."""
+    if isinstance(result, tuple):
+        result = result[0] if result else None
+    elif isinstance(result, dict):
+        result = next(iter(result.values()), None)
+    elif hasattr(result, "columns"):
+        return len(result)
+    return int(np.size(result)) if result is not None else 0
+
+
+def instrument(name):
+    """Decorator recording time, calls and output rows of a function under name."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            _record(name, time.perf_counter() - start, _rows(result))
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+class stage:
+    """Context manager timing one stage of a run; set .rows inside the block to count rows."""
+
+    __slots__ = ("name", "rows", "_start")
+
+    def __init__(self, name, rows=0):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter() if _state.enabled else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._start is not None:
+            _record(self.name, time.perf_counter() - self._start, self.rows)
+        return False
+
+
+def enabled():
+    return _state.enabled
+
+
+def enable(report_format=None):
+    """Start recording; with a report_format, print the summary to stderr at exit."""
+    if report_format is not None and report_format not in FORMATS:
+        raise ValueError(
+            f"report_format must be one of {', '.join(FORMATS)}, got {report_format!r}"
+        )
+    _state.enabled = True
+    if report_format is not None:
+        if _state.report_format is None:
+            atexit.register(_report_at_exit)
+        _state.report_format = report_format
+
+
+def disable():
+    _state.enabled = False
+
+
+def reset():
+    _records.clear()
+
+
+def summary():
+    """Recorded entries as dicts, slowest first."""
+    entries = [
+        {
+            "name": name,
+            "calls": calls,
+            "seconds": seconds,
+            "rows": rows,
+            "rows_per_second": rows / seconds if seconds > 0 else None,
+        }
+        for name, (calls, seconds, rows) in _records.items()
+    ]
+    return sorted(entries, key=lambda entry: entry["seconds"], reverse=True)
+
+
+def report(report_format="text", out=None):
+    """Write the summary as a JSON document or an aligned text table."""
+    out = sys.stderr if out is None else out
+    entries = summary()
+    if report_format == "json":
+        json.dump({"profile": entries}, out, indent=2)
+        out.write("\n")
+        return
+    width = max([len(entry["name"]) for entry in entries] + [5])
+    out.write("\nProfile\n----------------------------\n")
+    out.write(f"{'Stage':<{width}}  {'Calls':>8}  {'Seconds':>10}  {'Rows':>12}\n")
+    for entry in entries:
+        out.write(
+            f"{entry['name']:<{width}}  {entry['calls']:>8}  "
+            f"{entry['seconds']:>10.6f}  {entry['rows']:>12}\n"
+        )
+
+
+def _report_at_exit():
+    if _state.report_format is not None:
+        report(_state.report_format)
+
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR] if os.environ[ENV_VAR] in FORMATS else FORMATS[0])
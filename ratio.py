@@ -0,0 +1,363 @@
+"""Tests for ratio metrics such as revenue per session or clicks per pageview.
+
+The unit of randomization is the user, but the metric divides two per-user
+sums. So the sessions of one user are not independent observations, and a mean
+test over sessions understates the variance. The delta method gives the variance
+of the ratio from each arm's per-user numerator and denominator moments:
+
+    Var(Y / X) ~ (s_y^2 - 2 R s_xy + R^2 s_x^2) / (n * mean_x^2),  R = mean_y / mean_x.
+
+Those moments are the count, means, M2s and co-moment tracked by
+cuped.CovarianceStats. One streaming pass over per-user rows therefore gives
+everything the test needs, in memory that does not grow with the number of rows.
+"""
+
+import argparse
+import math
+from collections import namedtuple
+import numpy as np
+from aggregate import (
+    MEMMAP_CHUNK_SIZE,
+    iter_column_chunks,
+    map_row_ranges,
+    open_column,
+)
+from cuped import aggregate_cuped_chunk
+from sig_test import calculate_p_value
+
+RatioResult = namedtuple(
+    "RatioResult",
+    [
+        "z_score",
+        "p_value",
+        "test_ratio",
+        "control_ratio",
+        "test_std_error",
+        "control_std_error",
+    ],
+)
+
+
+def delta_method_variance(n, mean_y, mean_x, var_y, var_x, covariance):
+    """Variance of mean_y / mean_x over n units; works elementwise on arrays."""
+    n, mean_y, mean_x, var_y, var_x, covariance = (
+        np.asarray(value, dtype=float)
+        for value in (n, mean_y, mean_x, var_y, var_x, covariance)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = mean_y / mean_x
+        variance = (var_y - 2 * ratio * covariance + ratio**2 * var_x) / (n * mean_x**2)
+    return np.maximum(variance, 0.0)
+
+
+def ratio_estimate(stats):
+    """Return (ratio, standard error) of one arm's CovarianceStats of (numerator, denominator)."""
+    ratio = stats.mean_y / stats.mean_x if stats.mean_x else math.nan
+    if stats.n < 2:
+        return ratio, math.nan
+    variance = delta_method_variance(
+        stats.n,
+        stats.mean_y,
+        stats.mean_x,
+        stats.m2_y / (stats.n - 1),
+        stats.m2_x / (stats.n - 1),
+        stats.covariance,
+    )
+    return ratio, math.sqrt(float(variance))
+
+
+def ratio_test(test_stats, control_stats, tail_type):
+    """z-test for the difference of two arms' ratio metrics using delta-method variances."""
+    test_ratio, test_se = ratio_estimate(test_stats)
+    control_ratio, control_se = ratio_estimate(control_stats)
+    standard_error = math.sqrt(test_se**2 + control_se**2)
+    # Both arms without delta-method variance, e.g. constant per-unit ratios.
+    z_score = (
+        (test_ratio - control_ratio) / standard_error
+        if standard_error > 0
+        else math.nan
+    )
+    return RatioResult(
+        z_score,
+        calculate_p_value(z_score, tail_type) if standard_error > 0 else math.nan,
+        test_ratio,
+        control_ratio,
+        test_se,
+        control_se,
+    )
+
+
+def aggregate_ratio_file(
+    path,
+    variant_column="variant",
+    numerator_column="numerator",
+    denominator_column="denominator",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Stream a per-user CSV/JSONL file once and return {variant: CovarianceStats}.
+
+    The numerator is tracked as y and the denominator as x.
+    """
+    stats = {}
+    for variants, values in iter_column_chunks(
+        path,
+        variant_column,
+        (numerator_column, denominator_column),
+        chunk_size,
+        file_format,
+    ):
+        aggregate_cuped_chunk(stats, variants, values[:, 0], values[:, 1])
+    return stats
+
+
+def iter_ratio_memmap_chunks(
+    numerator_path,
+    denominator_path,
+    variants_path,
+    value_dtype="float64",
+    variant_dtype="uint8",
+    chunk_size=MEMMAP_CHUNK_SIZE,
+    start=0,
+    stop=None,
+):
+    """Yield (variants, numerators, denominators) slices of three memory-mapped columns.
+
+    Rows where either value is NaN are dropped.
+    """
+    numerators = open_column(numerator_path, value_dtype)
+    denominators = open_column(denominator_path, value_dtype)
+    variants = open_column(variants_path, variant_dtype)
+    if not len(numerators) == len(denominators) == len(variants):
+        raise ValueError(
+            f"Columns have different lengths: {len(numerators)}, "
+            f"{len(denominators)} and {len(variants)} rows."
+        )
+    stop = len(numerators) if stop is None else min(stop, len(numerators))
+    for offset in range(start, stop, chunk_size):
+        end = min(offset + chunk_size, stop)
+        chunk = [
+            numerators[offset:end],
+            denominators[offset:end],
+            variants[offset:end],
+        ]
+        if chunk[0].dtype.kind == "f":
+            missing = np.isnan(chunk[0]) | np.isnan(chunk[1])
+            if missing.any():
+                chunk = [column[~missing] for column in chunk]
+        yield chunk[2], chunk[0], chunk[1]
+
+
+def _aggregate_ratio_range(args):
+    stats = {}
+    for variants, numerators, denominators in iter_ratio_memmap_chunks(*args):
+        aggregate_cuped_chunk(
+            stats,
+            variants,
+            numerators.astype(float, copy=False),
+            denominators.astype(float, copy=False),
+        )
+    return stats
+
+
+def aggregate_ratio_memmap(
+    numerator_path,
+    denominator_path,
+    variants_path,
+    value_dtype="float64",
+    variant_dtype="uint8",
+    chunk_size=MEMMAP_CHUNK_SIZE,
+    processes=1,
+):
+    """Aggregate memory-mapped numerator and denominator columns by variant code.
+
+    With several processes, each one maps the files itself and aggregates a
+    contiguous range of rows; the partial co-moments are merged exactly.
+    """
+    rows = len(open_column(numerator_path, value_dtype))
+    return map_row_ranges(
+        _aggregate_ratio_range,
+        (
+            numerator_path,
+            denominator_path,
+            variants_path,
+            value_dtype,
+            variant_dtype,
+            chunk_size,
+        ),
+        rows,
+        chunk_size,
+        processes,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool tests ratio metrics such as revenue per session or clicks per pageview, where users are randomized but the metric divides two per-user totals. It streams one row per user with the numerator and denominator, and uses the delta method for the variance of the ratio. A mean test over sessions or pageviews would treat them as independent and understate the variance.
+
+        Examples of usage:
+        1. Revenue per session from a per-user CSV:
+           Command:
+           python ratio.py --input users.csv --tail two --test_variant treatment --control_variant control --numerator_column revenue --denominator_column sessions
+
+        2. Clicks per pageview from memory-mapped columns (variant codes 0 = control, 1 = treatment):
+           Command:
+           python ratio.py --numerator clicks.npy --denominator pageviews.npy --variants assignment.npy --tail two --test_variant 1 --control_variant 0
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        required=False,
+        help="Path to a CSV or JSONL file with one row per user.",
+    )
+    parser.add_argument(
+        "--numerator",
+        type=str,
+        required=False,
+        help="Numerator column (.npy or raw binary) for memory-mapped input.",
+    )
+    parser.add_argument(
+        "--denominator",
+        type=str,
+        required=False,
+        help="Denominator column (.npy or raw binary) for memory-mapped input.",
+    )
+    parser.add_argument(
+        "--variants",
+        type=str,
+        required=False,
+        help="Variant-assignment column (.npy or raw binary) for memory-mapped input.",
+    )
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float64",
+        help="Element type of raw binary numerator and denominator columns (default is 'float64').",
+    )
+    parser.add_argument(
+        "--variant_dtype",
+        type=str,
+        default="uint8",
+        help="Element type of a raw binary variant column, holding integer variant codes (default is 'uint8').",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=True,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=True,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--numerator_column",
+        type=str,
+        default="numerator",
+        help="Column holding the per-user numerator, e.g. revenue (default is 'numerator').",
+    )
+    parser.add_argument(
+        "--denominator_column",
+        type=str,
+        default="denominator",
+        help="Column holding the per-user denominator, e.g. sessions (default is 'denominator').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        required=False,
+        help="Number of rows aggregated per chunk (default is 100000; memory-mapped columns default to 4194304).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes for row ranges of memory-mapped columns (default is one per CPU).",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the test (default is 0.95).",
+    )
+
+    args = parser.parse_args()
+
+    memmap_columns = (args.numerator, args.denominator, args.variants)
+    if args.input is not None:
+        if any(memmap_columns):
+            parser.error("Give either --input or memory-mapped columns, not both.")
+        stats = aggregate_ratio_file(
+            args.input,
+            args.variant_column,
+            args.numerator_column,
+            args.denominator_column,
+            args.chunk_size or 100_000,
+            args.format,
+        )
+        source = args.input
+    elif all(memmap_columns):
+        stats = aggregate_ratio_memmap(
+            *memmap_columns,
+            args.dtype,
+            args.variant_dtype,
+            args.chunk_size or MEMMAP_CHUNK_SIZE,
+            args.processes,
+        )
+        # Integer variant codes are matched against the labels given on the command line.
+        stats = {str(variant): arm for variant, arm in stats.items()}
+        source = args.numerator
+    else:
+        parser.error(
+            "Give --input, or all of --numerator, --denominator and --variants."
+        )
+    for variant in (args.test_variant, args.control_variant):
+        if variant not in stats:
+            parser.error(f"Variant {variant!r} not found in {source}.")
+    test_stats = stats[args.test_variant]
+    control_stats = stats[args.control_variant]
+    result = ratio_test(test_stats, control_stats, args.tail)
+    significance = result.p_value < (1 - args.confidence)
+
+    print("\nRatio Metric Results:")
+    print("----------------------------")
+    print(f"Tail Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Test Group Ratio: {result.test_ratio}")
+    print(f"Control Group Ratio: {result.control_ratio}")
+    print(f"Test Group Std Error (Delta Method): {result.test_std_error}")
+    print(f"Control Group Std Error (Delta Method): {result.control_std_error}")
+    print(f"Test Group Users: {test_stats.n}")
+    print(f"Control Group Users: {control_stats.n}")
+    print(f"Confidence Level: {args.confidence}")
+    print(f"Z-Score: {result.z_score}")
+    print(f"P-Value: {result.p_value:.4f}")
+    print(f"Significant: {'Yes' if significance else 'No'}")
+
+
+if __name__ == "__main__":
+    main()
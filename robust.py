@@ -0,0 +1,482 @@
+"""Winsorized and trimmed mean tests for heavy-tailed metrics such as revenue.
+
+A few very large values can dominate the standard deviation of a revenue metric,
+and with it the z-test and the sample size. Capping them at a high quantile
+before testing keeps the test sensitive. The caps come from QuantileSketch, a
+DDSketch-style log-bucket histogram. Each value is counted in the bucket
+ceil(log(|x|) / log(gamma)), so every quantile is accurate to a relative error
+of relative_accuracy. Memory is bounded by max_bins, and sketches merge by
+adding bucket counts. Shards therefore produce exactly the same caps as one
+pass over the whole input.
+
+The data is streamed twice. The first pass sketches the pooled distribution of
+both arms, so both arms are capped at the same thresholds. The second pass caps
+each chunk and accumulates ArmStats. Winsorizing clips values to the caps.
+Trimming drops them and uses Yuen's standard error, built from the winsorized
+variance: se^2 = (n - 1) s_w^2 / (h (h - 1)) over the h values kept.
+"""
+
+import argparse
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from aggregate import (
+    ArmStats,
+    aggregate_chunk,
+    group_variants,
+    iter_chunks,
+    merge_stats,
+)
+from sig_test import significance_from_stats
+
+METHODS = ("winsorize", "trim")
+
+RobustResult = namedtuple(
+    "RobustResult",
+    ["z_score", "p_value", "lower_cap", "upper_cap", "test", "control"],
+)
+# n, mean and std of one arm after capping, as used by the z-test.
+CappedArm = namedtuple("CappedArm", ["n", "mean", "std"])
+
+
+def _merge_buckets(first, second, max_bins):
+    """Add two contiguous (offset, counts) bucket stores, folding the lowest buckets past max_bins.
+
+    Folding only ever moves counts up to the lowest kept bucket, so the result
+    does not depend on the order in which values or stores were added.
+    """
+    (offset_a, counts_a), (offset_b, counts_b) = first, second
+    if not len(counts_b):
+        return offset_a, counts_a
+    if not len(counts_a):
+        return _collapse(offset_b, counts_b.copy(), max_bins)
+    low = min(offset_a, offset_b)
+    high = max(offset_a + len(counts_a), offset_b + len(counts_b))
+    combined = np.zeros(high - low)
+    combined[offset_a - low : offset_a - low + len(counts_a)] += counts_a
+    combined[offset_b - low : offset_b - low + len(counts_b)] += counts_b
+    return _collapse(low, combined, max_bins)
+
+
+def _collapse(offset, counts, max_bins):
+    excess = len(counts) - max_bins
+    if excess > 0:
+        counts[excess] += counts[:excess].sum()
+        counts, offset = counts[excess:], offset + excess
+    return offset, counts
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with relative-error guarantees (DDSketch).
+
+    Positive and negative values are kept in separate log-bucket stores and zeros
+    in their own count. Quantiles are clamped to the exact minimum and maximum.
+    """
+
+    def __init__(self, relative_accuracy=0.005, max_bins=4096):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.zero_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._positive = (0, np.zeros(0))
+        self._negative = (0, np.zeros(0))
+
+    def _buckets(self, magnitudes):
+        """Bucket store of a batch of positive magnitudes."""
+        if magnitudes.size == 0:
+            return 0, np.zeros(0)
+        indices = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        low = int(indices.min())
+        return low, np.bincount(indices - low).astype(float)
+
+    def update(self, values):
+        """Add a batch of finite values in one vectorized pass."""
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > 0]
+        negative = values[values < 0]
+        self.zero_count += values.size - positive.size - negative.size
+        self._positive = _merge_buckets(
+            self._positive, self._buckets(positive), self.max_bins
+        )
+        self._negative = _merge_buckets(
+            self._negative, self._buckets(-negative), self.max_bins
+        )
+
+    def merge(self, other):
+        """Return a new sketch holding both inputs; the counts add exactly."""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy.")
+        merged = QuantileSketch(self.relative_accuracy, self.max_bins)
+        merged.count = self.count + other.count
+        merged.zero_count = self.zero_count + other.zero_count
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        for name in ("_positive", "_negative"):
+            setattr(
+                merged,
+                name,
+                _merge_buckets(
+                    getattr(self, name), getattr(other, name), self.max_bins
+                ),
+            )
+        return merged
+
+    def quantile(self, q):
+        """Value at quantile q (scalar or array), to within the relative accuracy.
+
+        q = 0 and q = 1 give the exact minimum and maximum.
+        """
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)[()]
+        bucket_value = 2 / (self.gamma + 1)
+        offset, counts = self._negative
+        negative = -bucket_value * self.gamma ** np.arange(offset, offset + len(counts))
+        offset, counts_positive = self._positive
+        positive = bucket_value * self.gamma ** np.arange(
+            offset, offset + len(counts_positive)
+        )
+        values = np.concatenate([negative[::-1], [0.0], positive])
+        weights = np.concatenate([counts[::-1], [self.zero_count], counts_positive])
+        ranks = q * (self.count - 1)
+        position = np.searchsorted(np.cumsum(weights), ranks, side="right")
+        estimate = np.clip(
+            values[np.minimum(position, len(values) - 1)], self.min, self.max
+        )
+        # The extremes are tracked exactly.
+        estimate = np.where(q <= 0, self.min, np.where(q >= 1, self.max, estimate))
+        return estimate[()]
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            "count": self.count,
+            "zero_count": self.zero_count,
+            "min": self.min,
+            "max": self.max,
+            "positive": [self._positive[0], self._positive[1].tolist()],
+            "negative": [self._negative[0], self._negative[1].tolist()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["max_bins"])
+        sketch.count = data["count"]
+        sketch.zero_count = data["zero_count"]
+        sketch.min, sketch.max = data["min"], data["max"]
+        for name in ("positive", "negative"):
+            offset, counts = data[name]
+            setattr(sketch, f"_{name}", (offset, np.asarray(counts, dtype=float)))
+        return sketch
+
+
+def sketch_file(
+    path,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+    relative_accuracy=0.005,
+    max_bins=4096,
+):
+    """First pass: stream a per-unit event file into {variant: QuantileSketch}."""
+    sketches = {}
+    for variants, values in iter_chunks(
+        path, variant_column, value_column, chunk_size, file_format
+    ):
+        labels, inverse, counts, slots = group_variants(variants)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        for label, slot in zip(labels.tolist(), slots.tolist()):
+            sketch = sketches.setdefault(
+                label, QuantileSketch(relative_accuracy, max_bins)
+            )
+            sketch.update(values[order[bounds[slot] : bounds[slot + 1]]])
+    return sketches
+
+
+def merge_sketches(*sketch_dicts):
+    """Merge {variant: QuantileSketch} dictionaries from separate shards."""
+    merged = {}
+    for sketches in sketch_dicts:
+        for variant, sketch in sketches.items():
+            merged[variant] = (
+                merged[variant].merge(sketch) if variant in merged else sketch
+            )
+    return merged
+
+
+def aggregate_capped_file(
+    path,
+    lower_cap,
+    upper_cap,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Second pass: ({variant: ArmStats} of winsorized values, {variant: ArmStats} of kept values)."""
+    winsorized, trimmed = {}, {}
+    for variants, values in iter_chunks(
+        path, variant_column, value_column, chunk_size, file_format
+    ):
+        aggregate_chunk(winsorized, variants, np.clip(values, lower_cap, upper_cap))
+        keep = (values >= lower_cap) & (values <= upper_cap)
+        aggregate_chunk(trimmed, variants[keep], values[keep])
+    return winsorized, trimmed
+
+
+def capped_arm(winsorized, trimmed=None, method="winsorize"):
+    """CappedArm of one variant: the winsorized arm, or Yuen's trimmed mean and its std."""
+    if method == "winsorize":
+        return CappedArm(winsorized.n, winsorized.mean, winsorized.std)
+    if method != "trim":
+        raise ValueError(f"method must be one of {', '.join(METHODS)}, got {method!r}")
+    kept = trimmed.n
+    if kept < 2:
+        return CappedArm(kept, trimmed.mean if kept else math.nan, math.nan)
+    # std chosen so that std^2 / kept is Yuen's squared standard error.
+    std = math.sqrt((winsorized.n - 1) * winsorized.variance / (kept - 1))
+    return CappedArm(kept, trimmed.mean, std)
+
+
+def _map_files(function, paths, processes, *args):
+    if processes == 1 or len(paths) <= 1:
+        return [function(path, *args) for path in paths]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(function, paths, *(repeat(arg) for arg in args)))
+
+
+def robust_test_files(
+    paths,
+    test_variant,
+    control_variant,
+    tail_type,
+    method="winsorize",
+    lower_quantile=0.0,
+    upper_quantile=0.99,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+    processes=None,
+    relative_accuracy=0.005,
+):
+    """Winsorized or trimmed mean z-test over event files in two streaming passes.
+
+    Caps are the lower_quantile and upper_quantile of both arms pooled; a
+    quantile of 0 or 1 leaves that side uncapped. Shards are processed in a
+    process pool and give the same result as a single file.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}, got {method!r}")
+    if not 0 <= lower_quantile < upper_quantile <= 1:
+        raise ValueError("Quantiles must satisfy 0 <= lower < upper <= 1.")
+    paths = list(paths)
+    sketches = merge_sketches(
+        *_map_files(
+            sketch_file,
+            paths,
+            processes,
+            variant_column,
+            value_column,
+            chunk_size,
+            file_format,
+            relative_accuracy,
+        )
+    )
+    for variant in (test_variant, control_variant):
+        if variant not in sketches:
+            raise KeyError(f"Variant {variant!r} not found in {', '.join(paths)}.")
+    pooled = sketches[test_variant].merge(sketches[control_variant])
+    lower_cap = pooled.quantile(lower_quantile) if lower_quantile > 0 else -math.inf
+    upper_cap = pooled.quantile(upper_quantile) if upper_quantile < 1 else math.inf
+
+    shards = _map_files(
+        aggregate_capped_file,
+        paths,
+        processes,
+        lower_cap,
+        upper_cap,
+        variant_column,
+        value_column,
+        chunk_size,
+        file_format,
+    )
+    winsorized = merge_stats(*(shard[0] for shard in shards))
+    trimmed = merge_stats(*(shard[1] for shard in shards))
+    test, control = (
+        capped_arm(winsorized[variant], trimmed.get(variant, ArmStats()), method)
+        for variant in (test_variant, control_variant)
+    )
+    z_score, p_value = significance_from_stats(test, control, tail_type)
+    return RobustResult(z_score, p_value, lower_cap, upper_cap, test, control)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool runs a winsorized or trimmed mean test on raw per-unit event files (CSV or JSONL), for heavy-tailed metrics such as revenue where a few very large values dominate the standard deviation. A first streaming pass builds a mergeable quantile sketch of both arms to find the caps; a second pass caps the values and aggregates them. The pooled winsorized standard deviation it reports can be passed to samplesize.py as --sigma.
+
+        Examples of usage:
+        1. Revenue per user, winsorized at the 99th percentile:
+           Command:
+           python robust.py --input events.csv --tail two --test_variant treatment --control_variant control --value_column revenue
+
+        2. Revenue trimmed at the 1st and 99.5th percentiles over sharded logs:
+           Command:
+           python robust.py --input part-1.jsonl part-2.jsonl --tail two --test_variant B --control_variant A --value_column revenue --method trim --lower_quantile 0.01 --upper_quantile 0.995
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Path to one or more CSV or JSONL event files (shards are processed in parallel).",
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=list(METHODS),
+        default="winsorize",
+        help="'winsorize' clips values to the caps (default); 'trim' drops them and uses Yuen's standard error.",
+    )
+    parser.add_argument(
+        "--lower_quantile",
+        type=float,
+        default=0.0,
+        help="Quantile of the lower cap (default is 0, no lower cap).",
+    )
+    parser.add_argument(
+        "--upper_quantile",
+        type=float,
+        default=0.99,
+        help="Quantile of the upper cap (default is 0.99).",
+    )
+    parser.add_argument(
+        "--relative_accuracy",
+        type=float,
+        default=0.005,
+        help="Relative error of the sketched caps (default is 0.005).",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=True,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=True,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--value_column",
+        type=str,
+        default="value",
+        help="Column holding the per-unit metric value (default is 'value').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100_000,
+        help="Number of rows aggregated per chunk (default is 100000).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes used to process multiple input files (default is one per CPU).",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level for the test (default is 0.95).",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        result = robust_test_files(
+            args.input,
+            args.test_variant,
+            args.control_variant,
+            args.tail,
+            args.method,
+            args.lower_quantile,
+            args.upper_quantile,
+            args.variant_column,
+            args.value_column,
+            args.chunk_size,
+            args.format,
+            args.processes,
+            args.relative_accuracy,
+        )
+    except (KeyError, ValueError) as error:
+        parser.error(str(error.args[0]))
+    significance = result.p_value < (1 - args.confidence)
+    test, control = result.test, result.control
+    pooled_std = math.sqrt(
+        ((test.n - 1) * test.std**2 + (control.n - 1) * control.std**2)
+        / (test.n + control.n - 2)
+    )
+
+    print("\nResults:")
+    print("----------------------------")
+    print(
+        f"Test Type: {'Winsorized' if args.method == 'winsorize' else 'Trimmed'} Mean Test"
+    )
+    print(f"Tail Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Lower Cap: {result.lower_cap}")
+    print(f"Upper Cap: {result.upper_cap}")
+    print(f"Test Group Value: {test.mean}")
+    print(f"Control Group Value: {control.mean}")
+    print(f"Test Group Std Dev: {test.std}")
+    print(f"Control Group Std Dev: {control.std}")
+    print(f"Pooled Std Dev (for samplesize.py --sigma): {pooled_std}")
+    print(f"Test Group Size: {test.n}")
+    print(f"Control Group Size: {control.n}")
+    print(f"Confidence Level: {args.confidence}")
+    print(f"Z-Score: {result.z_score}")
+    print(f"P-Value: {result.p_value:.4f}")
+    print(f"Significant: {'Yes' if significance else 'No'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 import argparse
-from scipy.stats import norm
+import csv
+import sys
+from collections import namedtuple
+import numpy as np
 import math
+import normal
+import profiling
 
 
+@profiling.instrument("samplesize.calculate_sample_size_for_proportions")
 def calculate_sample_size_for_proportions(
     baseline, effect_size, alpha, power, split_ratio, tail
 ):
     """Calculate the sample size needed for comparing two proportions with specified significance and power."""
     if tail == "two":
-        z_alpha = norm.ppf(1 - alpha / 2)
+        z_alpha = normal.ppf(1 - alpha / 2)
     else:
-        z_alpha = norm.ppf(1 - alpha)
-    z_beta = norm.ppf(power)
+        z_alpha = normal.ppf(1 - alpha)
+    z_beta = normal.ppf(power)
     p0 = baseline
     p1 = effect_size
     effect_size = abs(p1 - p0)
@@ -24,13 +30,21 @@ def calculate_sample_size_for_proportions(
     return math.ceil(adjusted_sample_size)
 
 
-def calculate_sample_size_for_means(delta, sigma, alpha, power, split_ratio, tail):
-    """Calculate the sample size needed for detecting a specified difference in means with given variance, significance, and power."""
+@profiling.instrument("samplesize.calculate_sample_size_for_means")
+def calculate_sample_size_for_means(
+    delta, sigma, alpha, power, split_ratio, tail, correlation=0.0
+):
+    """Calculate the sample size needed for detecting a specified difference in means with given variance, significance, and power.
+
+    A non-zero correlation with a pre-period covariate plans for a CUPED-adjusted
+    test, whose standard deviation shrinks to sigma * sqrt(1 - correlation**2).
+    """
+    sigma = sigma * math.sqrt(1 - correlation**2)
     if tail == "two":
-        z_alpha = norm.ppf(1 - alpha / 2)
+        z_alpha = normal.ppf(1 - alpha / 2)
     else:
-        z_alpha = norm.ppf(1 - alpha)
-    z_beta = norm.ppf(power)
+        z_alpha = normal.ppf(1 - alpha)
+    z_beta = normal.ppf(power)
     sample_size = (2 * (sigma**2) * (z_alpha + z_beta) ** 2) / (delta**2)
     control_share = split_ratio
     test_share = 1 - split_ratio
@@ -38,6 +52,261 @@ def calculate_sample_size_for_means(delta, sigma, alpha, power, split_ratio, tai
     return math.ceil(adjusted_sample_size)
 
 
+@profiling.instrument("samplesize._z_quantiles")
+def _z_quantiles(alpha, power, tail):
+    """Return broadcastable z_alpha and z_beta arrays, evaluating the ppf once per unique value."""
+    alpha = np.asarray(alpha, dtype=float)
+    tail_divisor = np.where(np.asarray(tail) == "two", 2.0, 1.0)
+    z_alpha = _unique_ppf(1 - alpha / tail_divisor)
+    z_beta = _unique_ppf(np.asarray(power, dtype=float))
+    return z_alpha, z_beta
+
+
+def _unique_ppf(q):
+    unique, index = np.unique(q, return_inverse=True)
+    return normal.ppf_array(unique)[index].reshape(q.shape)
+
+
+@profiling.instrument("samplesize.sample_size_grid_for_proportions")
+def sample_size_grid_for_proportions(
+    baseline, effect_size, alpha, power, split_ratio, tail
+):
+    """Vectorized calculate_sample_size_for_proportions; all parameters broadcast together.
+
+    Returns a float ndarray of total sample sizes (rounded up); designs with no
+    difference between baseline and effect size come back as inf.
+    """
+    z_alpha, z_beta = _z_quantiles(alpha, power, tail)
+    p0 = np.asarray(baseline, dtype=float)
+    p1 = np.asarray(effect_size, dtype=float)
+    split_ratio = np.asarray(split_ratio, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sample_size = ((z_alpha + z_beta) ** 2) * (
+            (p0 * (1 - p0) + p1 * (1 - p1)) / (p1 - p0) ** 2
+        )
+        return np.ceil(sample_size / (split_ratio * (1 - split_ratio)))
+
+
+@profiling.instrument("samplesize.sample_size_grid_for_means")
+def sample_size_grid_for_means(
+    delta, sigma, alpha, power, split_ratio, tail, correlation=0.0
+):
+    """Vectorized calculate_sample_size_for_means; all parameters broadcast together."""
+    z_alpha, z_beta = _z_quantiles(alpha, power, tail)
+    delta = np.asarray(delta, dtype=float)
+    correlation = np.asarray(correlation, dtype=float)
+    sigma = np.asarray(sigma, dtype=float) * np.sqrt(1 - correlation**2)
+    split_ratio = np.asarray(split_ratio, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sample_size = (2 * (sigma**2) * (z_alpha + z_beta) ** 2) / (delta**2)
+        return np.ceil(sample_size / (split_ratio * (1 - split_ratio)))
+
+
+MultiArmSampleSize = namedtuple(
+    "MultiArmSampleSize", ["total", "control", "treatment", "comparison_alpha"]
+)
+
+MULTIARM_ADJUSTMENTS = ("dunnett", "bonferroni")
+
+
+def _comparison_alpha(alpha, treatments, tail, adjustment, control_ratio):
+    """Per-comparison significance level that keeps the family-wise error rate at alpha."""
+    if adjustment not in MULTIARM_ADJUSTMENTS:
+        raise ValueError(
+            f"adjustment must be one of {', '.join(MULTIARM_ADJUSTMENTS)}, got {adjustment!r}"
+        )
+    if adjustment == "bonferroni" or treatments == 1:
+        return alpha / treatments
+    from multiarm import dunnett_critical_value
+
+    tail_area = normal.sf(
+        dunnett_critical_value(treatments, alpha, tail, control_ratio)
+    )
+    return 2 * tail_area if tail == "two" else tail_area
+
+
+def _multiarm_plan(pair_sample_size, treatments, control_ratio, comparison_alpha):
+    split_ratio = control_ratio / (1 + control_ratio)
+    control = math.ceil(pair_sample_size * split_ratio)
+    treatment = math.ceil(pair_sample_size * (1 - split_ratio))
+    return MultiArmSampleSize(
+        control + treatments * treatment, control, treatment, comparison_alpha
+    )
+
+
+@profiling.instrument("samplesize.calculate_multiarm_sample_size_for_proportions")
+def calculate_multiarm_sample_size_for_proportions(
+    baseline,
+    effect_size,
+    alpha,
+    power,
+    treatments,
+    tail,
+    adjustment="dunnett",
+    control_ratio=1.0,
+):
+    """Sample sizes for comparing treatments arms with one shared control.
+
+    Each treatment-vs-control comparison gets the requested power at a
+    significance level lowered so the family-wise error rate stays at alpha.
+    control_ratio is the control size divided by each treatment's size; about
+    sqrt(treatments) minimizes the total. Returns a MultiArmSampleSize; with one
+    treatment it matches calculate_sample_size_for_proportions, with each
+    arm rounded up.
+    """
+    comparison_alpha = _comparison_alpha(
+        alpha, treatments, tail, adjustment, control_ratio
+    )
+    pair_sample_size = calculate_sample_size_for_proportions(
+        baseline,
+        effect_size,
+        comparison_alpha,
+        power,
+        control_ratio / (1 + control_ratio),
+        tail,
+    )
+    return _multiarm_plan(pair_sample_size, treatments, control_ratio, comparison_alpha)
+
+
+@profiling.instrument("samplesize.calculate_multiarm_sample_size_for_means")
+def calculate_multiarm_sample_size_for_means(
+    delta,
+    sigma,
+    alpha,
+    power,
+    treatments,
+    tail,
+    adjustment="dunnett",
+    control_ratio=1.0,
+    correlation=0.0,
+):
+    """Sample sizes for comparing treatments arms with one shared control on a mean."""
+    comparison_alpha = _comparison_alpha(
+        alpha, treatments, tail, adjustment, control_ratio
+    )
+    pair_sample_size = calculate_sample_size_for_means(
+        delta,
+        sigma,
+        comparison_alpha,
+        power,
+        control_ratio / (1 + control_ratio),
+        tail,
+        correlation,
+    )
+    return _multiarm_plan(pair_sample_size, treatments, control_ratio, comparison_alpha)
+
+
+DIRECTIONS = ("increase", "decrease")
+SOLVE_FOR = ("sample_size", "mde", "power")
+
+
+def _effective_size(sample_size, split_ratio):
+    """Total sample size times control share times test share, as the formulas above use it."""
+    split_ratio = np.asarray(split_ratio, dtype=float)
+    return np.asarray(sample_size, dtype=float) * split_ratio * (1 - split_ratio)
+
+
+@profiling.instrument("samplesize.minimum_detectable_effect_for_proportions")
+def minimum_detectable_effect_for_proportions(
+    baseline, sample_size, alpha, power, split_ratio, tail, direction="increase"
+):
+    """Smallest (or, with direction='decrease', largest) test-group rate detectable with sample_size.
+
+    The inverse of sample_size_grid_for_proportions; all parameters broadcast
+    together. With d = p1 - p0 and c = z_alpha + z_beta, the sample-size formula
+    is a quadratic in d, so each design is solved in closed form. Designs where
+    no rate in [0, 1] is detectable come back as nan.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(
+            f"direction must be one of {', '.join(DIRECTIONS)}, got {direction!r}"
+        )
+    z_alpha, z_beta = _z_quantiles(alpha, power, tail)
+    p0 = np.asarray(baseline, dtype=float)
+    c2 = (z_alpha + z_beta) ** 2
+    k = _effective_size(sample_size, split_ratio)
+    # d^2 (k + c^2) - c^2 (1 - 2 p0) d - 2 c^2 p0 (1 - p0) = 0
+    a = k + c2
+    b = c2 * (1 - 2 * p0)
+    root = np.sqrt(b**2 + 8 * a * c2 * p0 * (1 - p0))
+    sign = 1.0 if direction == "increase" else -1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p1 = p0 + (b + sign * root) / (2 * a)
+    return np.where((p1 >= 0) & (p1 <= 1), p1, np.nan)
+
+
+@profiling.instrument("samplesize.minimum_detectable_effect_for_means")
+def minimum_detectable_effect_for_means(
+    sample_size, sigma, alpha, power, split_ratio, tail, correlation=0.0
+):
+    """Smallest difference in means detectable with sample_size; the inverse of sample_size_grid_for_means."""
+    z_alpha, z_beta = _z_quantiles(alpha, power, tail)
+    correlation = np.asarray(correlation, dtype=float)
+    sigma = np.asarray(sigma, dtype=float) * np.sqrt(1 - correlation**2)
+    k = _effective_size(sample_size, split_ratio)
+    with np.errstate(divide="ignore"):
+        return (z_alpha + z_beta) * sigma * np.sqrt(2 / k)
+
+
+def _power(z_alpha, signal):
+    """P(reject) when the test statistic is centred on signal, ignoring the far tail like the sample-size formulas."""
+    return normal.sf_array(z_alpha - signal)
+
+
+@profiling.instrument("samplesize.achieved_power_for_proportions")
+def achieved_power_for_proportions(
+    baseline, effect_size, sample_size, alpha, split_ratio, tail
+):
+    """Power of a design with sample_size to detect the change from baseline to effect_size."""
+    z_alpha, _ = _z_quantiles(alpha, 0.5, tail)
+    p0 = np.asarray(baseline, dtype=float)
+    p1 = np.asarray(effect_size, dtype=float)
+    k = _effective_size(sample_size, split_ratio)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        signal = np.abs(p1 - p0) * np.sqrt(k / (p0 * (1 - p0) + p1 * (1 - p1)))
+    return _power(z_alpha, np.where(p0 == p1, 0.0, signal))
+
+
+@profiling.instrument("samplesize.achieved_power_for_means")
+def achieved_power_for_means(
+    delta, sigma, sample_size, alpha, split_ratio, tail, correlation=0.0
+):
+    """Power of a design with sample_size to detect a difference in means of delta."""
+    z_alpha, _ = _z_quantiles(alpha, 0.5, tail)
+    correlation = np.asarray(correlation, dtype=float)
+    sigma = np.asarray(sigma, dtype=float) * np.sqrt(1 - correlation**2)
+    k = _effective_size(sample_size, split_ratio)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        signal = np.abs(np.asarray(delta, dtype=float)) * np.sqrt(k / 2) / sigma
+    return _power(z_alpha, signal)
+
+
+@profiling.instrument("samplesize.build_design_grid")
+def build_design_grid(**axes):
+    """Expand 1-d parameter axes into flat arrays covering their full cartesian product."""
+    names = list(axes)
+    mesh = np.meshgrid(*(np.atleast_1d(axes[name]) for name in names), indexing="ij")
+    return {name: values.ravel() for name, values in zip(names, mesh)}
+
+
+def write_grid_table(design, sample_sizes, out):
+    """Write a design grid and its required sample sizes as CSV."""
+    writer = csv.writer(out)
+    names = list(design)
+    writer.writerow(names + ["total", "control", "test"])
+    split_ratio = design["split_ratio"]
+    control = np.ceil(sample_sizes * split_ratio)
+    test = np.ceil(sample_sizes * (1 - split_ratio))
+    columns = [design[name] for name in names] + [sample_sizes, control, test]
+    for row in zip(*columns):
+        writer.writerow(
+            [
+                int(value) if i >= len(names) and np.isfinite(value) else value
+                for i, value in enumerate(row)
+            ]
+        )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="""
@@ -55,6 +324,21 @@ def main():
        - Your company plans to test a new pricing strategy that is expected to increase average customer spending by $5. Assuming the standard deviation of spending is $20, you want to detect this change with a 95% confidence level and 80% power, using a one-tailed test.
        Command:
        python samplesize.py --type mean --tail one --delta 5 --sigma 20 --alpha 0.05 --power 0.8 --split_ratio 0.5
+
+    3. Design Space Sweep:
+       - Compare required sample sizes across several baselines, lifts and power levels at once. With --grid every numeric parameter accepts multiple values and the full cartesian product is written as a CSV table.
+       Command:
+       python samplesize.py --grid --type proportion --tail two --baseline 0.05 0.10 --effect_size 0.06 0.12 0.15 --alpha 0.05 --power 0.8 0.9 --split_ratio 0.5 --output grid.csv
+
+    4. Minimum Detectable Effect:
+       - You get about 20,000 visitors a week and want to know which click-through rates, up from 10%, you could detect after one, two or four weeks. --solve mde turns the question around: it takes --sample_size and returns the smallest detectable effect; --solve power returns the power of a fixed design instead.
+       Command:
+       python samplesize.py --grid --solve mde --type proportion --tail two --baseline 0.10 --sample_size 20000 40000 80000 --alpha 0.05 --power 0.8 --split_ratio 0.5
+
+    5. A/B/n Test:
+       - Four new landing pages are compared with the current one. Each comparison should have 80% power while the chance of any false positive stays at 5% (Dunnett's adjustment). --split_ratio is ignored; --control_ratio sets the control size relative to each treatment.
+       Command:
+       python samplesize.py --type proportion --tail two --baseline 0.10 --effect_size 0.12 --alpha 0.05 --power 0.8 --split_ratio 0.5 --treatments 4 --control_ratio 2
     """,
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -73,47 +357,158 @@ def main():
     parser.add_argument(
         "--delta",
         type=float,
+        nargs="+",
         help="The desired difference in means for 'mean' type (e.g., a 5 point increase in customer satisfaction score).",
         required=False,
     )
     parser.add_argument(
         "--sigma",
         type=float,
+        nargs="+",
         help="Standard deviation of the measurements for 'mean' type (e.g., standard deviation of spending amounts in dollars).",
         required=False,
     )
+    parser.add_argument(
+        "--correlation",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        help="Expected correlation between the metric and a pre-period covariate for 'mean' type, used to plan a CUPED-adjusted test (default is 0).",
+        required=False,
+    )
     parser.add_argument(
         "--baseline",
         type=float,
+        nargs="+",
         help="Baseline value (control group rate) for proportion type experiments (e.g., a baseline click-through rate of 10 percent).",
         required=False,
     )
     parser.add_argument(
         "--effect_size",
         type=float,
+        nargs="+",
         help="Expected outcome rate in the experimental group for proportion type experiments (e.g., expected click-through rate of 15 percent).",
         required=False,
     )
     parser.add_argument(
         "--alpha",
         type=float,
+        nargs="+",
         help="Significance level (alpha) - the probability of a Type I error (false positive), commonly set at 0.05.",
         required=True,
     )
     parser.add_argument(
         "--power",
         type=float,
+        nargs="+",
         help="Statistical power - the probability of a Type II error (false negative), commonly set at 0.8.",
-        required=True,
+        required=False,
     )
     parser.add_argument(
         "--split_ratio",
         type=float,
+        nargs="+",
         help="The ratio of the sample size allocated to the control group versus the experimental group (e.g., 0.5 for a 50/50 split).",
         required=True,
     )
+    parser.add_argument(
+        "--solve",
+        choices=list(SOLVE_FOR),
+        default="sample_size",
+        help="Quantity to solve for: 'sample_size' (default), 'mde' (minimum detectable effect for --sample_size) or 'power' (achieved power of --sample_size).",
+    )
+    parser.add_argument(
+        "--sample_size",
+        type=float,
+        nargs="+",
+        help="Total sample size of the experiment, for --solve mde or power (e.g., the traffic you expect).",
+        required=False,
+    )
+    parser.add_argument(
+        "--direction",
+        choices=list(DIRECTIONS),
+        default="increase",
+        help="For --solve mde with proportions: look for an 'increase' (default) or a 'decrease' from the baseline.",
+    )
+
+    parser.add_argument(
+        "--treatments",
+        type=int,
+        default=1,
+        help="Number of treatment arms compared with one control (default is 1).",
+    )
+    parser.add_argument(
+        "--control_ratio",
+        type=float,
+        default=1.0,
+        help="With several treatments: control size divided by each treatment's size (default is 1).",
+    )
+    parser.add_argument(
+        "--adjustment",
+        choices=list(MULTIARM_ADJUSTMENTS),
+        default="dunnett",
+        help="With several treatments: how alpha is shared between comparisons (default is 'dunnett').",
+    )
+
+    parser.add_argument(
+        "--grid",
+        action="store_true",
+        help="Sweep every combination of the given parameter values and print a CSV table of sample sizes.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="File to write the --grid table to (defaults to standard output).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=list(profiling.FORMATS),
+        help="Print timings, call counts and rows per stage to standard error as 'text' (default) or 'json'.",
+    )
 
     args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+
+    grid_params = [
+        "delta",
+        "sigma",
+        "correlation",
+        "baseline",
+        "effect_size",
+        "alpha",
+        "power",
+        "split_ratio",
+        "sample_size",
+    ]
+    if args.solve != "power" and args.power is None:
+        parser.error("--power must be provided unless solving for power.")
+    if args.solve != "sample_size" and args.sample_size is None:
+        parser.error(f"--sample_size must be provided to solve for {args.solve}.")
+    if args.treatments > 1 and (args.grid or args.solve != "sample_size"):
+        parser.error(
+            "--treatments greater than 1 is only supported for a single sample size calculation."
+        )
+    if args.grid:
+        run_grid(args, parser)
+        return
+    for name in grid_params:
+        values = getattr(args, name)
+        if values is not None:
+            if len(values) > 1:
+                parser.error(f"--{name} accepts multiple values only with --grid.")
+            setattr(args, name, values[0])
+
+    if args.solve != "sample_size":
+        solve_single(args, parser)
+        return
+    if args.treatments > 1:
+        plan_multiarm(args, parser)
+        return
 
     if args.type == "proportion":
         if not all([args.baseline, args.effect_size]):
@@ -132,7 +527,13 @@ def main():
         if not all([args.delta, args.sigma]):
             parser.error("Delta and sigma must be provided for mean type.")
         sample_size = calculate_sample_size_for_means(
-            args.delta, args.sigma, args.alpha, args.power, args.split_ratio, args.tail
+            args.delta,
+            args.sigma,
+            args.alpha,
+            args.power,
+            args.split_ratio,
+            args.tail,
+            args.correlation,
         )
 
     # Generate a detailed report of the results
@@ -146,6 +547,8 @@ def main():
     else:
         print(f"Desired Mean Difference: {args.delta}")
         print(f"Standard Deviation: {args.sigma}")
+        if args.correlation:
+            print(f"Covariate Correlation (CUPED): {args.correlation}")
     print(f"Significance Level (Alpha): {args.alpha}")
     print(f"Statistical Power: {args.power}")
     print(f"Control Group Ratio: {args.split_ratio}")
@@ -157,5 +560,218 @@ def main():
     )
 
 
+def plan_multiarm(args, parser):
+    """Print the sample sizes for several treatments sharing one control."""
+    _check_inputs(args, parser)
+    if args.type == "proportion":
+        plan = calculate_multiarm_sample_size_for_proportions(
+            args.baseline,
+            args.effect_size,
+            args.alpha,
+            args.power,
+            args.treatments,
+            args.tail,
+            args.adjustment,
+            args.control_ratio,
+        )
+    else:
+        plan = calculate_multiarm_sample_size_for_means(
+            args.delta,
+            args.sigma,
+            args.alpha,
+            args.power,
+            args.treatments,
+            args.tail,
+            args.adjustment,
+            args.control_ratio,
+            args.correlation,
+        )
+
+    print("\nMulti-Arm Sample Size Calculation Report")
+    print("----------------------------")
+    print(f"Experiment Type: {args.type.capitalize()} Difference")
+    print(f"Test Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    if args.type == "proportion":
+        print(f"Baseline Proportion: {args.baseline}")
+        print(f"Desired Proportion: {args.effect_size}")
+    else:
+        print(f"Desired Mean Difference: {args.delta}")
+        print(f"Standard Deviation: {args.sigma}")
+        if args.correlation:
+            print(f"Covariate Correlation (CUPED): {args.correlation}")
+    print(f"Treatment Arms: {args.treatments}")
+    print(f"Adjustment: {args.adjustment}")
+    print(f"Family-wise Significance Level (Alpha): {args.alpha}")
+    print(f"Per-comparison Significance Level: {plan.comparison_alpha:.6f}")
+    print(f"Statistical Power per Comparison: {args.power}")
+    print(f"Control to Treatment Size Ratio: {args.control_ratio}")
+    print(f"Total Sample Size Required: {plan.total}")
+    print(f"Control Group Sample Size: {plan.control}")
+    print(f"Sample Size per Treatment Arm: {plan.treatment}\n")
+
+
+def _check_inputs(args, parser):
+    if args.type == "proportion":
+        needed = ["baseline"] if args.solve == "mde" else ["baseline", "effect_size"]
+        if not all(getattr(args, name) for name in needed):
+            parser.error(
+                "Baseline must be provided for proportion type."
+                if args.solve == "mde"
+                else "Baseline and effect size must be provided for proportion type."
+            )
+    else:
+        needed = ["sigma"] if args.solve == "mde" else ["delta", "sigma"]
+        if not all(getattr(args, name) for name in needed):
+            parser.error(
+                "Sigma must be provided for mean type."
+                if args.solve == "mde"
+                else "Delta and sigma must be provided for mean type."
+            )
+
+
+def _solve(args, **design):
+    """MDE or achieved power for the (possibly array-valued) design parameters."""
+    if args.type == "proportion":
+        if args.solve == "mde":
+            return minimum_detectable_effect_for_proportions(
+                tail=args.tail, direction=args.direction, **design
+            )
+        return achieved_power_for_proportions(tail=args.tail, **design)
+    if args.solve == "mde":
+        return minimum_detectable_effect_for_means(tail=args.tail, **design)
+    return achieved_power_for_means(tail=args.tail, **design)
+
+
+SOLVE_AXES = {
+    ("proportion", "mde"): ["baseline", "sample_size", "alpha", "power", "split_ratio"],
+    ("proportion", "power"): [
+        "baseline",
+        "effect_size",
+        "sample_size",
+        "alpha",
+        "split_ratio",
+    ],
+    ("mean", "mde"): [
+        "sample_size",
+        "sigma",
+        "correlation",
+        "alpha",
+        "power",
+        "split_ratio",
+    ],
+    ("mean", "power"): [
+        "delta",
+        "sigma",
+        "correlation",
+        "sample_size",
+        "alpha",
+        "split_ratio",
+    ],
+}
+
+
+def solve_single(args, parser):
+    """Print the minimum detectable effect or achieved power for one design."""
+    _check_inputs(args, parser)
+    result = float(
+        _solve(
+            args,
+            **{name: getattr(args, name) for name in SOLVE_AXES[args.type, args.solve]},
+        )
+    )
+
+    print(
+        "\nMinimum Detectable Effect Report"
+        if args.solve == "mde"
+        else "\nAchieved Power Report"
+    )
+    print("----------------------------")
+    print(f"Experiment Type: {args.type.capitalize()} Difference")
+    print(f"Test Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Total Sample Size: {args.sample_size:g}")
+    if args.type == "proportion":
+        print(f"Baseline Proportion: {args.baseline}")
+        if args.solve == "power":
+            print(f"Desired Proportion: {args.effect_size}")
+    else:
+        if args.solve == "power":
+            print(f"Desired Mean Difference: {args.delta}")
+        print(f"Standard Deviation: {args.sigma}")
+        if args.correlation:
+            print(f"Covariate Correlation (CUPED): {args.correlation}")
+    print(f"Significance Level (Alpha): {args.alpha}")
+    if args.solve == "mde":
+        print(f"Statistical Power: {args.power}")
+    print(f"Control Group Ratio: {args.split_ratio}")
+    if args.solve == "power":
+        print(f"Achieved Power: {result:.4f}\n")
+    elif math.isnan(result):
+        print("Minimum Detectable Effect: none within [0, 1] at this sample size\n")
+    elif args.type == "proportion":
+        difference = result - args.baseline
+        print(f"Minimum Detectable Proportion: {result:.6g}")
+        print(f"Absolute Difference: {difference:+.6g}")
+        print(f"Relative Lift: {difference / args.baseline:+.2%}\n")
+    else:
+        print(f"Minimum Detectable Mean Difference: {result:.6g}\n")
+
+
+def write_solution_table(design, name, values, out):
+    """Write a design grid and one solved column (mde or power) as CSV."""
+    writer = csv.writer(out)
+    names = list(design)
+    writer.writerow(names + [name])
+    writer.writerows(zip(*(design[key].tolist() for key in names), values.tolist()))
+
+
+def run_grid(args, parser):
+    """Evaluate the cartesian product of the CLI parameter lists and write the table."""
+    if args.solve != "sample_size":
+        _check_inputs(args, parser)
+        design = build_design_grid(
+            **{name: getattr(args, name) for name in SOLVE_AXES[args.type, args.solve]}
+        )
+        values = _solve(args, **design)
+        with profiling.stage("samplesize.write_solution_table", rows=values.size):
+            if args.output:
+                with open(args.output, "w", newline="") as out:
+                    write_solution_table(design, args.solve, values, out)
+            else:
+                write_solution_table(design, args.solve, values, sys.stdout)
+        return
+    if args.type == "proportion":
+        if not all([args.baseline, args.effect_size]):
+            parser.error(
+                "Baseline and effect size must be provided for proportion type."
+            )
+        design = build_design_grid(
+            baseline=args.baseline,
+            effect_size=args.effect_size,
+            alpha=args.alpha,
+            power=args.power,
+            split_ratio=args.split_ratio,
+        )
+        sample_sizes = sample_size_grid_for_proportions(tail=args.tail, **design)
+    else:
+        if not all([args.delta, args.sigma]):
+            parser.error("Delta and sigma must be provided for mean type.")
+        design = build_design_grid(
+            delta=args.delta,
+            sigma=args.sigma,
+            correlation=args.correlation,
+            alpha=args.alpha,
+            power=args.power,
+            split_ratio=args.split_ratio,
+        )
+        sample_sizes = sample_size_grid_for_means(tail=args.tail, **design)
+
+    with profiling.stage("samplesize.write_grid_table", rows=sample_sizes.size):
+        if args.output:
+            with open(args.output, "w", newline="") as out:
+                write_grid_table(design, sample_sizes, out)
+        else:
+            write_grid_table(design, sample_sizes, sys.stdout)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,179 @@
+import argparse
+import csv
+import sys
+import numpy as np
+import profiling
+from sig_test import calculate_z_scores, calculate_mean_z_scores, calculate_p_values
+from corrections import METHODS, adjust_p_values
+
+NUMERIC_COLUMNS = (
+    "test_value",
+    "control_value",
+    "n_test",
+    "n_control",
+    "std_test",
+    "std_control",
+)
+
+
+@profiling.instrument("scorecard.load_table")
+def load_table(path, numeric_columns=NUMERIC_COLUMNS):
+    """Read a CSV into a dict of column arrays, parsing numeric_columns as floats."""
+    with open(path, newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        columns = list(zip(*reader)) or [()] * len(header)
+    table = {}
+    for name, values in zip(header, columns):
+        if name in numeric_columns:
+            table[name] = np.array(
+                [float(value) if value != "" else np.nan for value in values]
+            )
+        else:
+            table[name] = np.array(values, dtype=str)
+    return table
+
+
+@profiling.instrument("scorecard.score_table")
+def score_table(
+    table, tail_type="two", alpha=0.05, methods=("bonferroni", "holm", "bh")
+):
+    """Compute z-scores, p-values and corrected decisions for every row of a metrics table.
+
+    table maps column names to equal-length arrays. Each row is one metric of one
+    experiment: "experiment", "metric", "test_type" ("proportion" or "mean"),
+    "test_value", "control_value", "n_test", "n_control" and, for mean rows,
+    "std_test" and "std_control". Corrections are applied within each experiment.
+    Returns a new dict with z_score, p_value, p_<method> and significant_<method>
+    columns added.
+    """
+    rows = len(table["test_value"])
+    test_types = table.get("test_type", np.full(rows, "proportion"))
+    z_scores = np.full(rows, np.nan)
+
+    proportion = test_types == "proportion"
+    if proportion.any():
+        z_scores[proportion] = calculate_z_scores(
+            table["test_value"][proportion],
+            table["control_value"][proportion],
+            table["n_test"][proportion],
+            table["n_control"][proportion],
+        )
+    mean = test_types == "mean"
+    if mean.any():
+        z_scores[mean] = calculate_mean_z_scores(
+            table["test_value"][mean],
+            table["control_value"][mean],
+            table["std_test"][mean],
+            table["std_control"][mean],
+            table["n_test"][mean],
+            table["n_control"][mean],
+        )
+    unknown = ~(proportion | mean)
+    if unknown.any():
+        raise ValueError(
+            f"test_type must be 'proportion' or 'mean', got {test_types[unknown][0]!r}"
+        )
+
+    p_values = calculate_p_values(z_scores, tail_type)
+    scored = dict(table)
+    scored["z_score"] = z_scores
+    scored["p_value"] = p_values
+    groups = table.get("experiment")
+    for method in methods:
+        adjusted = adjust_p_values(p_values, method, groups)
+        scored[f"p_{method}"] = adjusted
+        scored[f"significant_{method}"] = adjusted < alpha
+    return scored
+
+
+def write_table(table, out):
+    writer = csv.writer(out)
+    names = list(table)
+    writer.writerow(names)
+    writer.writerows(zip(*(table[name].tolist() for name in names)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool scores a whole table of experiment metrics at once. For every row it computes the z-score and p-value. Within each experiment it then applies Bonferroni, Holm and Benjamini-Hochberg corrections, so decisions account for the number of metrics tested.
+
+        The input CSV has one row per experiment and metric with the columns: experiment, metric, test_type (proportion or mean), test_value, control_value, n_test, n_control and, for mean rows, std_test and std_control.
+
+        Examples of usage:
+        1. Score a nightly metrics export with all corrections:
+           Command:
+           python scorecard.py --input metrics.csv --tail two --alpha 0.05 --output scorecard.csv
+
+        2. Only control the false discovery rate:
+           Command:
+           python scorecard.py --input metrics.csv --tail two --alpha 0.10 --methods bh
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input", type=str, required=True, help="Path to the metrics CSV."
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level applied to the corrected p-values (default is 0.05).",
+    )
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=list(METHODS),
+        default=list(METHODS),
+        help="Corrections to apply: 'bonferroni', 'holm' and/or 'bh' (default is all).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="File to write the scored table to (defaults to standard output).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=list(profiling.FORMATS),
+        help="Print timings, call counts and rows per stage to standard error as 'text' (default) or 'json'.",
+    )
+
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+
+    table = load_table(args.input)
+    missing = [
+        name
+        for name in ("test_value", "control_value", "n_test", "n_control")
+        if name not in table
+    ]
+    if missing:
+        parser.error(f"Missing columns in {args.input}: {', '.join(missing)}")
+    try:
+        scored = score_table(table, args.tail, args.alpha, args.methods)
+    except (KeyError, ValueError) as error:
+        parser.error(str(error))
+
+    with profiling.stage("scorecard.write_table", rows=len(scored["p_value"])):
+        if args.output:
+            with open(args.output, "w", newline="") as out:
+                write_table(scored, out)
+        else:
+            write_table(scored, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Significance tests for every segment of an experiment from one scan of the events.
+
+SegmentStats is a hash aggregation table with one cell for each combination of
+segment labels (for example country, platform and new-vs-returning) and variant.
+Labels are mapped to integer codes as they appear. Each chunk is grouped with
+bincount and merged into the cells with Chan's update, so the log is read once.
+Coarser slices (a single country, or all users) are rolled up from the cells
+without touching the data again. The tests for all slices then run as a single
+scorecard.score_table call.
+"""
+
+import argparse
+import itertools
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from aggregate import iter_keyed_chunks
+from corrections import METHODS
+from scorecard import score_table, write_table
+
+# Label of a dimension that a slice does not split on.
+ALL = "*"
+_MOMENTS = ("n", "mean", "m2", "successes")
+
+
+class SegmentStats:
+    """Count, mean, M2 and successes per (segment labels, variant) cell, in flat arrays."""
+
+    def __init__(self, dimensions):
+        self.dimensions = tuple(dimensions)
+        # One label -> code dictionary per dimension, then one for the variant.
+        self.labels = [{} for _ in range(len(self.dimensions) + 1)]
+        self._cells = {}
+        self.codes = np.zeros((0, len(self.dimensions) + 1), dtype=np.intp)
+        for name in _MOMENTS:
+            setattr(self, name, np.zeros(0))
+
+    def _encode(self, keys):
+        """Integer codes for a (rows, dimensions + 1) array of labels."""
+        codes = np.empty(keys.shape, dtype=np.intp)
+        for column, labels in enumerate(self.labels):
+            unique, inverse = np.unique(keys[:, column], return_inverse=True)
+            mapped = [
+                labels.setdefault(label, len(labels)) for label in unique.tolist()
+            ]
+            codes[:, column] = np.asarray(mapped, dtype=np.intp)[inverse.ravel()]
+        return codes
+
+    def _rows(self, cell_codes):
+        """Table rows of the given cells, appending any cell not seen before."""
+        rows = np.empty(len(cell_codes), dtype=np.intp)
+        new = []
+        for index, cell in enumerate(map(tuple, cell_codes.tolist())):
+            row = self._cells.get(cell)
+            if row is None:
+                row = self._cells[cell] = len(self._cells)
+                new.append(cell)
+            rows[index] = row
+        if new:
+            self.codes = np.concatenate([self.codes, np.array(new, dtype=np.intp)])
+            for name in _MOMENTS:
+                setattr(
+                    self,
+                    name,
+                    np.concatenate([getattr(self, name), np.zeros(len(new))]),
+                )
+        return rows
+
+    def _combine(self, rows, n, mean, m2, successes):
+        """Chan's update of the given (distinct) rows with another batch's moments."""
+        total = self.n[rows] + n
+        delta = mean - self.mean[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, n / total, 0.0)
+        self.m2[rows] += m2 + delta**2 * self.n[rows] * share
+        self.mean[rows] += delta * share
+        self.n[rows] = total
+        self.successes[rows] += successes
+
+    def update(self, keys, values):
+        """Add a chunk; keys has one column per dimension and the variant last."""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        codes = self._encode(np.asarray(keys))
+        sizes = [len(labels) for labels in self.labels]
+        cells, inverse = np.unique(
+            np.ravel_multi_index(codes.T, sizes), return_inverse=True
+        )
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse, minlength=len(cells))
+        mean = np.bincount(inverse, weights=values, minlength=len(cells)) / counts
+        m2 = np.bincount(
+            inverse, weights=(values - mean[inverse]) ** 2, minlength=len(cells)
+        )
+        successes = np.bincount(inverse, weights=values != 0, minlength=len(cells))
+        rows = self._rows(np.stack(np.unravel_index(cells, sizes), axis=1))
+        self._combine(rows, counts, mean, m2, successes)
+
+    def merge(self, other):
+        """Return a new SegmentStats with the cells of both, matched by label."""
+        if other.dimensions != self.dimensions:
+            raise ValueError("Cannot merge SegmentStats over different dimensions.")
+        merged = SegmentStats(self.dimensions)
+        for stats in (self, other):
+            if len(stats.n):
+                keys = np.stack(
+                    [
+                        np.array(list(labels), dtype=object)[stats.codes[:, column]]
+                        for column, labels in enumerate(stats.labels)
+                    ],
+                    axis=1,
+                )
+                rows = merged._rows(merged._encode(keys))
+                merged._combine(rows, *(getattr(stats, name) for name in _MOMENTS))
+        return merged
+
+    def rollup(self, dimensions, variant):
+        """Per-slice statistics of one variant over a subset of the dimensions.
+
+        Returns (slices, arm): slices is a list of label tuples with ALL for the
+        dimensions not split on, and arm maps n, mean, std and successes to arrays
+        aligned with slices. Slices where the variant has no rows get n = 0.
+        """
+        columns = [self.dimensions.index(name) for name in dimensions]
+        group = np.zeros(len(self.n), dtype=np.int64)
+        for column in columns:
+            group = group * len(self.labels[column]) + self.codes[:, column]
+        groups, first, inverse = np.unique(
+            group, return_index=True, return_inverse=True
+        )
+        inverse = inverse.ravel()
+        names = [list(labels) for labels in self.labels]
+        slices = [
+            tuple(
+                names[column][self.codes[row, column]] if column in columns else ALL
+                for column in range(len(self.dimensions))
+            )
+            for row in first.tolist()
+        ]
+
+        code = self.labels[-1].get(variant, -1)
+        weight = (self.codes[:, -1] == code).astype(float)
+        n = np.bincount(inverse, weights=self.n * weight, minlength=len(groups))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (
+                np.bincount(
+                    inverse, weights=self.n * self.mean * weight, minlength=len(groups)
+                )
+                / n
+            )
+            # Law of total variance: within-cell M2 plus the spread of cell means.
+            spread = np.where(weight > 0, self.n * (self.mean - mean[inverse]) ** 2, 0)
+            m2 = np.bincount(
+                inverse, weights=(self.m2 * weight + spread), minlength=len(groups)
+            )
+            std = np.sqrt(np.where(n > 1, m2 / (n - 1), np.nan))
+        successes = np.bincount(
+            inverse, weights=self.successes * weight, minlength=len(groups)
+        )
+        return slices, {"n": n, "mean": mean, "std": std, "successes": successes}
+
+
+def slice_sets(dimensions, depth=1):
+    """Every subset of the dimensions with at most depth members, starting with the overall slice."""
+    return [
+        combination
+        for size in range(min(depth, len(dimensions)) + 1)
+        for combination in itertools.combinations(dimensions, size)
+    ]
+
+
+def segment_table(
+    stats, test_variant, control_variant, test_type="proportion", depth=1
+):
+    """Lay out the arms of every testable slice in the scorecard.score_table format.
+
+    Slices where either arm has fewer than two units are left out.
+    """
+    parts = []
+    for dimensions in slice_sets(stats.dimensions, depth):
+        slices, test = stats.rollup(dimensions, test_variant)
+        _, control = stats.rollup(dimensions, control_variant)
+        keep = (test["n"] > 1) & (control["n"] > 1)
+        part = {
+            name: np.array([labels[i] for labels in slices], dtype=str)[keep]
+            for i, name in enumerate(stats.dimensions)
+        }
+        if test_type == "proportion":
+            part["test_value"] = test["successes"][keep] / test["n"][keep]
+            part["control_value"] = control["successes"][keep] / control["n"][keep]
+        else:
+            part["test_value"] = test["mean"][keep]
+            part["control_value"] = control["mean"][keep]
+        part["n_test"] = test["n"][keep]
+        part["n_control"] = control["n"][keep]
+        part["std_test"] = test["std"][keep]
+        part["std_control"] = control["std"][keep]
+        parts.append(part)
+    table = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    table["test_type"] = np.full(len(table["n_test"]), test_type)
+    return table
+
+
+def analyze_segments(
+    stats,
+    test_variant,
+    control_variant,
+    test_type="proportion",
+    tail_type="two",
+    alpha=0.05,
+    depth=1,
+    methods=("bh",),
+):
+    """Test every slice up to depth dimensions at once, correcting across all slices."""
+    table = segment_table(stats, test_variant, control_variant, test_type, depth)
+    return score_table(table, tail_type, alpha, methods)
+
+
+def aggregate_segments_file(
+    path,
+    dimensions,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+):
+    """Stream a per-unit event file once into a SegmentStats over the given dimensions."""
+    stats = SegmentStats(dimensions)
+    for keys, values in iter_keyed_chunks(
+        path,
+        tuple(dimensions) + (variant_column,),
+        (value_column,),
+        chunk_size,
+        file_format,
+    ):
+        stats.update(keys, values[:, 0])
+    return stats
+
+
+def aggregate_segments_files(
+    paths,
+    dimensions,
+    variant_column="variant",
+    value_column="value",
+    chunk_size=100_000,
+    file_format=None,
+    processes=None,
+):
+    """Aggregate many shards in a process pool and merge them into one SegmentStats."""
+    paths = list(paths)
+    if processes == 1 or len(paths) <= 1:
+        shards = [
+            aggregate_segments_file(
+                path, dimensions, variant_column, value_column, chunk_size, file_format
+            )
+            for path in paths
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            shards = list(
+                pool.map(
+                    aggregate_segments_file,
+                    paths,
+                    repeat(tuple(dimensions)),
+                    repeat(variant_column),
+                    repeat(value_column),
+                    repeat(chunk_size),
+                    repeat(file_format),
+                )
+            )
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged = merged.merge(shard)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool breaks an experiment down by segments such as country, platform or new-vs-returning users. It reads the raw per-unit event log once and aggregates every (segment, variant) combination. Then it tests every slice in one vectorized call: the overall result, each segment value and, with --depth 2 or more, combinations of segments. p-values are corrected across all slices.
+
+        Examples of usage:
+        1. Conversion by country and by platform:
+           Command:
+           python segments.py --input events.csv --segments country platform --test_type proportion --tail two --test_variant treatment --control_variant control --value_column converted
+
+        2. Revenue for every country x platform x new-user combination:
+           Command:
+           python segments.py --input events.csv --segments country platform new_user --depth 3 --test_type mean --tail two --test_variant B --control_variant A --value_column revenue --output slices.csv
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Path to one or more CSV or JSONL event files (shards are aggregated in parallel).",
+    )
+    parser.add_argument(
+        "--segments",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Columns to slice by, e.g. country platform.",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=1,
+        help="Largest number of segment columns combined in one slice (default is 1).",
+    )
+    parser.add_argument(
+        "--test_type",
+        type=str,
+        choices=["proportion", "mean"],
+        required=True,
+        help="Specify the type of data: 'proportion' for 0/1 outcomes, 'mean' for continuous outcomes.",
+    )
+    parser.add_argument(
+        "--tail",
+        type=str,
+        choices=["one", "two"],
+        required=True,
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+    )
+    parser.add_argument(
+        "--test_variant",
+        type=str,
+        required=True,
+        help="Variant label of the test group.",
+    )
+    parser.add_argument(
+        "--control_variant",
+        type=str,
+        required=True,
+        help="Variant label of the control group.",
+    )
+    parser.add_argument(
+        "--variant_column",
+        type=str,
+        default="variant",
+        help="Column holding the variant label (default is 'variant').",
+    )
+    parser.add_argument(
+        "--value_column",
+        type=str,
+        default="value",
+        help="Column holding the per-unit metric value (default is 'value').",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=["csv", "jsonl"],
+        required=False,
+        help="Input file format (inferred from the file extension by default).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100_000,
+        help="Number of rows aggregated per chunk (default is 100000).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes used to aggregate multiple input files (default is one per CPU).",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level applied to the corrected p-values (default is 0.05).",
+    )
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=list(METHODS),
+        default=["bh"],
+        help="Corrections applied across all slices: 'bonferroni', 'holm' and/or 'bh' (default is 'bh').",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="File to write the slice table to (defaults to standard output).",
+    )
+
+    args = parser.parse_args()
+
+    stats = aggregate_segments_files(
+        args.input,
+        args.segments,
+        args.variant_column,
+        args.value_column,
+        args.chunk_size,
+        args.format,
+        args.processes,
+    )
+    for variant in (args.test_variant, args.control_variant):
+        if variant not in stats.labels[-1]:
+            parser.error(f"Variant {variant!r} not found in {', '.join(args.input)}.")
+    scored = analyze_segments(
+        stats,
+        args.test_variant,
+        args.control_variant,
+        args.test_type,
+        args.tail,
+        args.alpha,
+        args.depth,
+        args.methods,
+    )
+    scored.pop("test_type")
+
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            write_table(scored, out)
+    else:
+        write_table(scored, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
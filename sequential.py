@@ -0,0 +1,300 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+import numpy as np
+from sig_test import calculate_z_scores, calculate_mean_z_scores
+from scorecard import load_table
+
+SequentialResult = namedtuple(
+    "SequentialResult",
+    ["experiments", "z_score", "p_value", "ci_lower", "ci_upper", "significant"],
+)
+
+_STATE_ARRAYS = (
+    "n_test",
+    "mean_test",
+    "m2_test",
+    "n_control",
+    "mean_control",
+    "m2_control",
+    "p_value",
+)
+
+
+class SequentialMonitor:
+    """Always-valid mSPRT p-values and confidence sequences for many live experiments.
+
+    Each experiment keeps O(1) state: per-arm count, mean and M2, plus the running
+    minimum of its always-valid p-value. New per-arm counts are folded in with
+    Chan's update, so every look costs O(experiments updated) regardless of how
+    much data came before. Peeking after every update keeps the type-I error
+    at alpha.
+
+    tau is the standard deviation of the normal mixing distribution over the true
+    difference (test - control); set it near the size of effect you expect.
+    """
+
+    def __init__(self, tau, test_type="proportion", alpha=0.05):
+        if test_type not in ("proportion", "mean"):
+            raise ValueError(
+                f"test_type must be 'proportion' or 'mean', got {test_type!r}"
+            )
+        self.tau = tau
+        self.test_type = test_type
+        self.alpha = alpha
+        self.experiments = []
+        self._index = {}
+        for name in _STATE_ARRAYS:
+            setattr(self, name, np.zeros(0))
+
+    def _rows(self, experiments):
+        new = [
+            experiment
+            for experiment in dict.fromkeys(experiments)
+            if experiment not in self._index
+        ]
+        if new:
+            for experiment in new:
+                self._index[experiment] = len(self.experiments)
+                self.experiments.append(experiment)
+            for name in _STATE_ARRAYS:
+                fill = 1.0 if name == "p_value" else 0.0
+                setattr(
+                    self,
+                    name,
+                    np.concatenate([getattr(self, name), np.full(len(new), fill)]),
+                )
+        rows = np.array(
+            [self._index[experiment] for experiment in experiments], dtype=np.intp
+        )
+        if len(np.unique(rows)) != len(rows):
+            raise ValueError("Each experiment may appear at most once per update.")
+        return rows
+
+    def _combine(self, arm, rows, n, mean, m2):
+        n_old = getattr(self, f"n_{arm}")[rows]
+        mean_old = getattr(self, f"mean_{arm}")[rows]
+        total = n_old + n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - mean_old
+            share = np.where(total > 0, n / total, 0.0)
+            getattr(self, f"mean_{arm}")[rows] = mean_old + delta * share
+            getattr(self, f"m2_{arm}")[rows] += m2 + delta**2 * n_old * share
+        getattr(self, f"n_{arm}")[rows] = total
+
+    def update_proportions(
+        self, experiments, n_test, successes_test, n_control, successes_control
+    ):
+        """Add new units and successes per arm, then take a look at those experiments."""
+        rows = self._rows(list(experiments))
+        for arm, n, successes in (
+            ("test", n_test, successes_test),
+            ("control", n_control, successes_control),
+        ):
+            n = np.asarray(n, dtype=float)
+            successes = np.asarray(successes, dtype=float)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(n > 0, successes / n, 0.0)
+            self._combine(arm, rows, n, mean, successes * (1 - mean))
+        return self._look(rows)
+
+    def update_means(
+        self,
+        experiments,
+        n_test,
+        mean_test,
+        std_test,
+        n_control,
+        mean_control,
+        std_control,
+    ):
+        """Add a new batch summary (count, mean, std) per arm, then take a look."""
+        rows = self._rows(list(experiments))
+        for arm, n, mean, std in (
+            ("test", n_test, mean_test, std_test),
+            ("control", n_control, mean_control, std_control),
+        ):
+            n = np.asarray(n, dtype=float)
+            m2 = np.asarray(std, dtype=float) ** 2 * np.maximum(n - 1, 0)
+            self._combine(arm, rows, n, np.asarray(mean, dtype=float), m2)
+        return self._look(rows)
+
+    def _look(self, rows):
+        n_test = self.n_test[rows]
+        n_control = self.n_control[rows]
+        mean_test = self.mean_test[rows]
+        mean_control = self.mean_control[rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if self.test_type == "proportion":
+                var_test = mean_test * (1 - mean_test)
+                var_control = mean_control * (1 - mean_control)
+                z_scores = calculate_z_scores(
+                    mean_test, mean_control, n_test, n_control, pooled=False
+                )
+            else:
+                var_test = self.m2_test[rows] / (n_test - 1)
+                var_control = self.m2_control[rows] / (n_control - 1)
+                z_scores = calculate_mean_z_scores(
+                    mean_test,
+                    mean_control,
+                    np.sqrt(var_test),
+                    np.sqrt(var_control),
+                    n_test,
+                    n_control,
+                )
+            variance = var_test / n_test + var_control / n_control
+            tau2 = self.tau**2
+            ready = np.isfinite(variance) & (variance > 0) & np.isfinite(z_scores)
+            variance = np.where(ready, variance, 1.0)
+            z_scores = np.where(ready, z_scores, 0.0)
+            # Normal-mixture likelihood ratio written in terms of the z-statistic.
+            log_ratio = 0.5 * np.log(variance / (variance + tau2)) + (
+                z_scores**2 * tau2 / (2 * (variance + tau2))
+            )
+            look_p = np.where(ready, np.minimum(1.0, np.exp(-log_ratio)), 1.0)
+            self.p_value[rows] = np.minimum(self.p_value[rows], look_p)
+            half_width = np.sqrt(
+                variance
+                * (variance + tau2)
+                / tau2
+                * (np.log((variance + tau2) / variance) - 2 * np.log(self.alpha))
+            )
+        difference = mean_test - mean_control
+        half_width = np.where(ready, half_width, np.inf)
+        p_values = self.p_value[rows]
+        return SequentialResult(
+            [self.experiments[row] for row in rows],
+            z_scores,
+            p_values,
+            difference - half_width,
+            difference + half_width,
+            p_values < self.alpha,
+        )
+
+    def to_dict(self):
+        state = {
+            "tau": self.tau,
+            "test_type": self.test_type,
+            "alpha": self.alpha,
+            "experiments": list(self.experiments),
+        }
+        state.update({name: getattr(self, name).tolist() for name in _STATE_ARRAYS})
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        monitor = cls(state["tau"], state["test_type"], state["alpha"])
+        monitor.experiments = list(state["experiments"])
+        monitor._index = {
+            experiment: row for row, experiment in enumerate(monitor.experiments)
+        }
+        for name in _STATE_ARRAYS:
+            setattr(monitor, name, np.asarray(state[name], dtype=float))
+        return monitor
+
+
+PROPORTION_COLUMNS = ("n_test", "successes_test", "n_control", "successes_control")
+MEAN_COLUMNS = (
+    "n_test",
+    "mean_test",
+    "std_test",
+    "n_control",
+    "mean_control",
+    "std_control",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool monitors live experiments with always-valid p-values (mixture sequential probability ratio test). The results can be checked as often as you like without inflating false positives. The state of every experiment is kept in a small JSON file. Each run reads only the new per-arm counts since the last run, updates the state and reports the current results.
+
+        The input CSV has one row per experiment with the new data since the last run:
+        - proportion: experiment, n_test, successes_test, n_control, successes_control
+        - mean: experiment, n_test, mean_test, std_test, n_control, mean_control, std_control
+
+        Examples of usage:
+        1. Hourly conversion check:
+           Command:
+           python sequential.py --state monitor.json --input last_hour.csv --test_type proportion --tau 0.01 --alpha 0.05
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--state",
+        type=str,
+        required=True,
+        help="JSON file holding the monitor state (created if missing).",
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="CSV of new per-arm counts per experiment since the last run.",
+    )
+    parser.add_argument(
+        "--test_type",
+        type=str,
+        choices=["proportion", "mean"],
+        default="proportion",
+        help="Specify the type of data when creating a new state (default is 'proportion').",
+    )
+    parser.add_argument(
+        "--tau",
+        type=float,
+        required=False,
+        help="Mixing standard deviation over the true difference when creating a new state; set it near the expected effect.",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="Significance level when creating a new state (default is 0.05).",
+    )
+
+    args = parser.parse_args()
+
+    if os.path.exists(args.state):
+        with open(args.state) as handle:
+            monitor = SequentialMonitor.from_dict(json.load(handle))
+    else:
+        if args.tau is None:
+            parser.error("--tau must be provided when creating a new state.")
+        monitor = SequentialMonitor(args.tau, args.test_type, args.alpha)
+
+    columns = PROPORTION_COLUMNS if monitor.test_type == "proportion" else MEAN_COLUMNS
+    table = load_table(args.input, numeric_columns=columns)
+    missing = [name for name in ("experiment",) + columns if name not in table]
+    if missing:
+        parser.error(f"Missing columns in {args.input}: {', '.join(missing)}")
+    update = (
+        monitor.update_proportions
+        if monitor.test_type == "proportion"
+        else monitor.update_means
+    )
+    result = update(table["experiment"].tolist(), *(table[name] for name in columns))
+
+    with open(args.state, "w") as handle:
+        json.dump(monitor.to_dict(), handle)
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(
+        ["experiment", "z_score", "p_value", "ci_lower", "ci_upper", "significant"]
+    )
+    writer.writerows(
+        zip(
+            result.experiments,
+            result.z_score.tolist(),
+            result.p_value.tolist(),
+            result.ci_lower.tolist(),
+            result.ci_upper.tolist(),
+            result.significant.tolist(),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
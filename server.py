@@ -0,0 +1,283 @@
+import argparse
+import json
+import math
+import os
+import select
+import socketserver
+import sys
+import numpy as np
+from sig_test import run_significance_tests
+from samplesize import sample_size_grid_for_proportions, sample_size_grid_for_means
+
+SIGNIFICANCE_FIELDS = {
+    "proportion": ("test_value", "control_value", "n_test", "n_control"),
+    "mean": (
+        "test_value",
+        "control_value",
+        "std_test",
+        "std_control",
+        "n_test",
+        "n_control",
+    ),
+}
+SAMPLE_SIZE_FIELDS = {
+    "proportion": ("baseline", "effect_size", "alpha", "power", "split_ratio"),
+    "mean": ("delta", "sigma", "alpha", "power", "split_ratio"),
+}
+
+
+def _group_key(request):
+    """Validate a request and return the key of the vectorized call that serves it."""
+    op = request.get("op")
+    if op == "significance":
+        test_type = request.get("test_type", "proportion")
+        fields = SIGNIFICANCE_FIELDS.get(test_type)
+        if fields is None:
+            raise ValueError(
+                f"test_type must be 'proportion' or 'mean', got {test_type!r}"
+            )
+        pooled = bool(request.get("pooled", True))
+    elif op == "sample_size":
+        test_type = request.get("type", "proportion")
+        fields = SAMPLE_SIZE_FIELDS.get(test_type)
+        if fields is None:
+            raise ValueError(f"type must be 'proportion' or 'mean', got {test_type!r}")
+        pooled = None
+    else:
+        raise ValueError(f"op must be 'significance' or 'sample_size', got {op!r}")
+    tail = request.get("tail", "two")
+    if tail not in ("one", "two"):
+        raise ValueError(f"tail must be 'one' or 'two', got {tail!r}")
+    missing = [field for field in fields if request.get(field) is None]
+    if missing:
+        raise ValueError(f"Missing fields for {op}: {', '.join(missing)}")
+    return op, test_type, tail, pooled
+
+
+def _numbers(key, request):
+    """Convert a request's numeric fields to floats, naming the first invalid one."""
+    op, test_type = key[:2]
+    if op == "significance":
+        fields = SIGNIFICANCE_FIELDS[test_type] + ("confidence",)
+        defaults = {"confidence": 0.95}
+    else:
+        fields = SAMPLE_SIZE_FIELDS[test_type]
+        defaults = {}
+    numbers = {}
+    for field in fields:
+        value = request.get(field, defaults.get(field))
+        try:
+            numbers[field] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} must be a number, got {value!r}") from None
+    return numbers
+
+
+def _column(numbers, field):
+    return np.array([row[field] for row in numbers])
+
+
+def _run_group(key, numbers):
+    op, test_type, tail, pooled = key
+    if op == "significance":
+        z_scores, p_values, significant = run_significance_tests(
+            _column(numbers, "test_value"),
+            _column(numbers, "control_value"),
+            _column(numbers, "n_test"),
+            _column(numbers, "n_control"),
+            tail,
+            confidence=_column(numbers, "confidence"),
+            test_type=test_type,
+            std_test=_column(numbers, "std_test") if test_type == "mean" else None,
+            std_control=(
+                _column(numbers, "std_control") if test_type == "mean" else None
+            ),
+            pooled=pooled,
+        )
+        return [
+            {"z_score": float(z), "p_value": float(p), "significant": bool(s)}
+            for z, p, s in zip(z_scores, p_values, significant)
+        ]
+
+    columns = {
+        field: _column(numbers, field) for field in SAMPLE_SIZE_FIELDS[test_type]
+    }
+    if test_type == "proportion":
+        sizes = sample_size_grid_for_proportions(tail=tail, **columns)
+    else:
+        sizes = sample_size_grid_for_means(tail=tail, **columns)
+    results = []
+    for size, split_ratio in zip(sizes, columns["split_ratio"]):
+        if np.isfinite(size):
+            results.append(
+                {
+                    "sample_size": int(size),
+                    "control_size": int(np.ceil(size * split_ratio)),
+                    "test_size": int(np.ceil(size * (1 - split_ratio))),
+                }
+            )
+        else:
+            results.append({"sample_size": None})
+    return results
+
+
+def handle_batch(requests):
+    """Answer a list of request dicts, grouping compatible requests into vectorized calls.
+
+    Responses come back in request order and echo each request's "id".
+    Invalid requests get an {"error": ...} response without affecting the rest.
+    """
+    responses = [None] * len(requests)
+    groups = {}
+    for index, request in enumerate(requests):
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object.")
+            key = _group_key(request)
+            groups.setdefault(key, []).append((index, _numbers(key, request)))
+        except ValueError as error:
+            responses[index] = {"error": str(error)}
+
+    for key, members in groups.items():
+        indices = [index for index, _ in members]
+        try:
+            results = _run_group(key, [numbers for _, numbers in members])
+        except (TypeError, ValueError) as error:
+            results = [{"error": str(error)} for _ in members]
+        for index, result in zip(indices, results):
+            responses[index] = result
+
+    for request, response in zip(requests, responses):
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+    return responses
+
+
+def handle_lines(lines):
+    """Parse newline-delimited JSON requests and answer them as one batch."""
+    responses = [None] * len(lines)
+    requests = []
+    positions = []
+    for index, line in enumerate(lines):
+        try:
+            requests.append(json.loads(line))
+            positions.append(index)
+        except ValueError as error:
+            responses[index] = {"error": f"Invalid JSON: {error}"}
+    for index, response in zip(positions, handle_batch(requests)):
+        responses[index] = response
+    return responses
+
+
+def iter_batches(fd, max_batch=4096, read_size=1 << 16):
+    """Yield lists of complete lines read from a file descriptor.
+
+    Each batch holds every line already queued on the descriptor (up to
+    max_batch), so a burst of requests is answered by one vectorized call.
+    """
+    pending = b""
+    while True:
+        lines = []
+        while len(lines) < max_batch:
+            chunk = os.read(fd, read_size)
+            if not chunk:
+                if pending.strip():
+                    lines.append(pending)
+                if lines:
+                    yield lines
+                return
+            pending += chunk
+            *complete, pending = pending.split(b"\n")
+            lines.extend(line for line in complete if line.strip())
+            if not select.select([fd], [], [], 0)[0]:
+                break
+        if lines:
+            yield lines
+
+
+def _json_safe(value):
+    """Replace non-finite floats with None, which JSON writes as null."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def dump_response(response):
+    """One NDJSON line; NaN and infinity, which strict JSON rejects, become null."""
+    return json.dumps(_json_safe(response), allow_nan=False) + "\n"
+
+
+def serve(fd, write, max_batch=4096):
+    """Read newline-delimited JSON requests from fd and write one JSON response per line."""
+    for lines in iter_batches(fd, max_batch):
+        responses = handle_lines(lines)
+        write("".join(map(dump_response, responses)).encode())
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve(self.connection.fileno(), self.connection.sendall, self.server.max_batch)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(path, max_batch=4096):
+    """Serve requests on a Unix domain socket, one thread per connection."""
+    if os.path.exists(path):
+        os.unlink(path)
+    with _UnixServer(path, _RequestHandler) as server:
+        server.max_batch = max_batch
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool keeps one warm process answering significance tests and sample size calculations. Requests are newline-delimited JSON objects read from standard input (or a Unix socket), and one JSON response is written per request in the same order. Requests that arrive together are grouped into vectorized calls.
+
+        Request examples:
+        {"id": 1, "op": "significance", "test_type": "proportion", "tail": "two", "test_value": 0.507, "control_value": 0.4728, "n_test": 25000, "n_control": 25000, "confidence": 0.95}
+        {"id": 2, "op": "significance", "test_type": "mean", "tail": "one", "test_value": 50, "control_value": 45, "std_test": 10, "std_control": 10, "n_test": 25000, "n_control": 25000}
+        {"id": 3, "op": "sample_size", "type": "proportion", "tail": "two", "baseline": 0.10, "effect_size": 0.15, "alpha": 0.05, "power": 0.8, "split_ratio": 0.5}
+        {"id": 4, "op": "sample_size", "type": "mean", "tail": "one", "delta": 5, "sigma": 20, "alpha": 0.05, "power": 0.8, "split_ratio": 0.5}
+
+        Command:
+        python server.py < requests.ndjson
+        python server.py --socket /tmp/experiments.sock
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        required=False,
+        help="Path of a Unix domain socket to listen on instead of standard input.",
+    )
+    parser.add_argument(
+        "--max_batch",
+        type=int,
+        default=4096,
+        help="Maximum number of queued requests answered by one vectorized call (default is 4096).",
+    )
+
+    args = parser.parse_args()
+
+    if args.socket:
+        serve_socket(args.socket, args.max_batch)
+    else:
+
+        def write(data):
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+
+        serve(sys.stdin.fileno(), write, args.max_batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 import argparse
-import scipy.stats as stats
 import numpy as np
+import normal
+import profiling
+import exact
+import bayesian
 
+PROPORTION_METHODS = ("z", "fisher", "barnard", "boschloo", "auto")
+# 'auto' switches from the z-test to Fisher's exact test below this expected cell count.
+AUTO_MIN_EXPECTED = 5
 
-def calculate_z_score(test_prop, control_prop, n_test, n_control, pooled=True):
+
+@profiling.instrument("sig_test.calculate_z_scores")
+def calculate_z_scores(test_props, control_props, n_test, n_control, pooled=True):
+    """Vectorized proportion z-scores over arrays of proportions and sample sizes."""
+    test_props = np.asarray(test_props, dtype=float)
+    control_props = np.asarray(control_props, dtype=float)
+    n_test = np.asarray(n_test, dtype=float)
+    n_control = np.asarray(n_control, dtype=float)
     if pooled:
-        pooled_prop = (test_prop * n_test + control_prop * n_control) / (
+        pooled_prop = (test_props * n_test + control_props * n_control) / (
             n_test + n_control
         )
         std_err = np.sqrt(
@@ -13,20 +26,273 @@ def calculate_z_score(test_prop, control_prop, n_test, n_control, pooled=True):
         )
     else:
         std_err = np.sqrt(
-            test_prop * (1 - test_prop) / n_test
-            + control_prop * (1 - control_prop) / n_control
+            test_props * (1 - test_props) / n_test
+            + control_props * (1 - control_props) / n_control
+        )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (test_props - control_props) / std_err
+
+
+@profiling.instrument("sig_test.calculate_mean_z_scores")
+def calculate_mean_z_scores(
+    test_means, control_means, std_test, std_control, n_test, n_control
+):
+    """Vectorized z-scores for a difference in means with unequal variances."""
+    test_means = np.asarray(test_means, dtype=float)
+    control_means = np.asarray(control_means, dtype=float)
+    std_test = np.asarray(std_test, dtype=float)
+    std_control = np.asarray(std_control, dtype=float)
+    std_err = np.sqrt(
+        (std_test**2 / np.asarray(n_test, dtype=float))
+        + (std_control**2 / np.asarray(n_control, dtype=float))
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (test_means - control_means) / std_err
+
+
+@profiling.instrument("sig_test.calculate_p_values")
+def calculate_p_values(z_scores, tail_type):
+    """Vectorized p-values; uses the survival function to keep tiny p-values exact."""
+    tail_p = normal.sf_array(np.abs(np.asarray(z_scores, dtype=float)))
+    if tail_type == "two":
+        return 2 * tail_p
+    elif tail_type == "one":
+        return tail_p
+    raise ValueError(f"tail_type must be 'one' or 'two', got {tail_type!r}")
+
+
+@profiling.instrument("sig_test.calculate_exact_p_values")
+def calculate_exact_p_values(
+    successes_test, n_test, successes_control, n_control, tail_type, method="fisher"
+):
+    """Vectorized exact p-values for 2x2 tables with 'fisher', 'barnard' or 'boschloo'.
+
+    Like calculate_p_values, a one-tailed test looks in the direction of the
+    observed difference.
+    """
+    tests = {
+        "fisher": exact.fisher_exact,
+        "barnard": exact.barnard_exact,
+        "boschloo": exact.boschloo_exact,
+    }
+    if method not in tests:
+        raise ValueError(f"method must be one of {', '.join(tests)}, got {method!r}")
+    counts = np.broadcast_arrays(
+        *(
+            np.asarray(values, dtype=float)
+            for values in (successes_test, n_test, successes_control, n_control)
+        )
+    )
+    if tail_type == "two":
+        return tests[method](*counts, alternative="two-sided")
+    if tail_type != "one":
+        raise ValueError(f"tail_type must be 'one' or 'two', got {tail_type!r}")
+    successes_test, n_test, successes_control, n_control = counts
+    greater = successes_test * n_control >= successes_control * n_test
+    p_values = np.empty(greater.shape)
+    for mask, alternative in ((greater, "greater"), (~greater, "less")):
+        if mask.any():
+            p_values[mask] = tests[method](
+                *(values[mask] for values in counts), alternative=alternative
+            )
+    return p_values
+
+
+@profiling.instrument("sig_test.calculate_proportion_p_values")
+def calculate_proportion_p_values(
+    successes_test,
+    n_test,
+    successes_control,
+    n_control,
+    tail_type,
+    method="z",
+    pooled=True,
+):
+    """Vectorized (z_scores, p_values) from success counts with the z-test or an exact test.
+
+    method is 'z', 'fisher', 'barnard', 'boschloo' or 'auto'. 'auto' uses
+    Fisher's exact test for tables with an expected cell count below
+    AUTO_MIN_EXPECTED and the z-test otherwise.
+    """
+    if method not in PROPORTION_METHODS:
+        raise ValueError(
+            f"method must be one of {', '.join(PROPORTION_METHODS)}, got {method!r}"
+        )
+    successes_test, n_test, successes_control, n_control = np.broadcast_arrays(
+        *(
+            np.asarray(values, dtype=float)
+            for values in (successes_test, n_test, successes_control, n_control)
+        )
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_scores = calculate_z_scores(
+            successes_test / n_test,
+            successes_control / n_control,
+            n_test,
+            n_control,
+            pooled=pooled,
+        )
+    if method == "z":
+        return z_scores, calculate_p_values(z_scores, tail_type)
+    if method != "auto":
+        return z_scores, calculate_exact_p_values(
+            successes_test, n_test, successes_control, n_control, tail_type, method
         )
+    p_values = calculate_p_values(z_scores, tail_type)
+    small = (
+        exact.min_expected_count(successes_test, n_test, successes_control, n_control)
+        < AUTO_MIN_EXPECTED
+    )
+    if small.any():
+        p_values[small] = calculate_exact_p_values(
+            successes_test[small],
+            n_test[small],
+            successes_control[small],
+            n_control[small],
+            tail_type,
+        )
+    return z_scores, p_values
 
-    z_score = (test_prop - control_prop) / std_err
-    return z_score
 
+@profiling.instrument("sig_test.run_significance_tests")
+def run_significance_tests(
+    test_values,
+    control_values,
+    n_test,
+    n_control,
+    tail_type,
+    confidence=0.95,
+    test_type="proportion",
+    std_test=None,
+    std_control=None,
+    pooled=True,
+    method="z",
+):
+    """Score many comparisons at once, returning (z_scores, p_values, significant) arrays.
 
+    For proportions, method picks an exact test instead of the z-test (see
+    calculate_proportion_p_values); success counts are recovered as
+    round(proportion * n).
+    """
+    if test_type == "proportion" and method != "z":
+        n_test = np.asarray(n_test, dtype=float)
+        n_control = np.asarray(n_control, dtype=float)
+        z_scores, p_values = calculate_proportion_p_values(
+            np.rint(np.asarray(test_values, dtype=float) * n_test),
+            n_test,
+            np.rint(np.asarray(control_values, dtype=float) * n_control),
+            n_control,
+            tail_type,
+            method,
+            pooled,
+        )
+        significant = p_values < (1 - np.asarray(confidence, dtype=float))
+        return z_scores, p_values, significant
+    if test_type == "proportion":
+        z_scores = calculate_z_scores(
+            test_values, control_values, n_test, n_control, pooled=pooled
+        )
+    elif test_type == "mean":
+        if std_test is None or std_control is None:
+            raise ValueError(
+                "Standard deviations must be provided for mean type tests."
+            )
+        z_scores = calculate_mean_z_scores(
+            test_values, control_values, std_test, std_control, n_test, n_control
+        )
+    else:
+        raise ValueError(f"test_type must be 'proportion' or 'mean', got {test_type!r}")
+    p_values = calculate_p_values(z_scores, tail_type)
+    significant = p_values < (1 - np.asarray(confidence, dtype=float))
+    return z_scores, p_values, significant
+
+
+@profiling.instrument("sig_test.calculate_z_score")
+def calculate_z_score(test_prop, control_prop, n_test, n_control, pooled=True):
+    return calculate_z_scores(test_prop, control_prop, n_test, n_control, pooled)[()]
+
+
+@profiling.instrument("sig_test.calculate_mean_z_score")
+def calculate_mean_z_score(
+    test_mean, control_mean, std_test, std_control, n_test, n_control
+):
+    return calculate_mean_z_scores(
+        test_mean, control_mean, std_test, std_control, n_test, n_control
+    )[()]
+
+
+@profiling.instrument("sig_test.calculate_p_value")
 def calculate_p_value(z_score, tail_type):
+    if np.ndim(z_score):
+        return calculate_p_values(z_score, tail_type)
+    tail_p = normal.sf(abs(float(z_score)))
     if tail_type == "two":
-        p_value = 2 * (1 - stats.norm.cdf(abs(z_score)))
+        return 2 * tail_p
     elif tail_type == "one":
-        p_value = 1 - stats.norm.cdf(abs(z_score))
-    return p_value
+        return tail_p
+    raise ValueError(f"tail_type must be 'one' or 'two', got {tail_type!r}")
+
+
+@profiling.instrument("sig_test.significance_from_stats")
+def significance_from_stats(
+    test_stats, control_stats, tail_type, test_type="mean", pooled=True
+):
+    """Run the z-test on aggregated arm statistics, returning (z_score, p_value).
+
+    Accepts any objects exposing n, mean and std (mean tests) or n and
+    proportion (proportion tests), such as aggregate.ArmStats.
+    """
+    if test_type == "proportion":
+        z_score = calculate_z_score(
+            test_stats.proportion,
+            control_stats.proportion,
+            test_stats.n,
+            control_stats.n,
+            pooled=pooled,
+        )
+    elif test_type == "mean":
+        z_score = calculate_mean_z_score(
+            test_stats.mean,
+            control_stats.mean,
+            test_stats.std,
+            control_stats.std,
+            test_stats.n,
+            control_stats.n,
+        )
+    else:
+        raise ValueError(f"test_type must be 'proportion' or 'mean', got {test_type!r}")
+    return z_score, calculate_p_value(z_score, tail_type)
+
+
+def print_bayesian_results(args):
+    result = bayesian.run_bayesian_tests(
+        args.test_value,
+        args.control_value,
+        args.n_test,
+        args.n_control,
+        args.test_type,
+        args.std_test,
+        args.std_control,
+        args.prior_alpha,
+        args.prior_beta,
+    )
+    prob_test_better = float(result.prob_test_better)
+    decision = bayesian.better_group(prob_test_better, args.confidence)
+
+    print("\nBayesian Results:")
+    print("----------------------------")
+    print(f"Test Type: {args.test_type.capitalize()} Test")
+    if args.test_type == "proportion":
+        print(f"Prior: Beta({args.prior_alpha}, {args.prior_beta})")
+    print(f"Test Group Value: {args.test_value}")
+    print(f"Control Group Value: {args.control_value}")
+    print(f"Test Group Size: {args.n_test}")
+    print(f"Control Group Size: {args.n_control}")
+    print(f"Probability Test Beats Control: {prob_test_better:.4f}")
+    print(f"Expected Loss Choosing Test: {float(result.expected_loss_test):.6g}")
+    print(f"Expected Loss Choosing Control: {float(result.expected_loss_control):.6g}")
+    print(f"Better Group at {args.confidence} Probability: {decision}")
 
 
 def main():
@@ -46,6 +312,16 @@ def main():
            - Determine if the difference in average spend between two groups is significant, assuming a standard deviation of 10.
            Command:
            python sig_test.py --test_type mean --tail one --test_value 50 --control_value 45 --std_test 10 --std_control 10 --n_test 25000 --n_control 25000 --confidence 0.90
+
+        3. Low-Traffic Segment:
+           - With only 40 users per group the normal approximation is unreliable, so use Boschloo's exact test.
+           Command:
+           python sig_test.py --test_type proportion --tail two --test_value 0.2 --control_value 0.05 --n_test 40 --n_control 40 --method boschloo
+
+        4. Bayesian Summary:
+           - Report the probability that the test group beats the control and the expected loss of shipping each, from Beta-Binomial posteriors.
+           Command:
+           python sig_test.py --test_type proportion --tail two --test_value 0.507 --control_value 0.4728 --n_test 25000 --n_control 25000 --bayesian
         """,
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -99,28 +375,85 @@ def main():
         default=0.95,
         help="Confidence level for the test (default is 0.95).",
     )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=list(PROPORTION_METHODS),
+        default="z",
+        help="Test for proportions: 'z' (default), exact 'fisher', 'barnard' or 'boschloo', or 'auto' to use Fisher's exact test when an expected cell count is below 5.",
+    )
+    parser.add_argument(
+        "--bayesian",
+        action="store_true",
+        help="Report the probability that the test group is better and the expected loss of each choice instead of a p-value.",
+    )
+    parser.add_argument(
+        "--prior_alpha",
+        type=float,
+        default=1.0,
+        help="Alpha of the Beta prior for Bayesian proportion tests (default is 1, a uniform prior).",
+    )
+    parser.add_argument(
+        "--prior_beta",
+        type=float,
+        default=1.0,
+        help="Beta of the Beta prior for Bayesian proportion tests (default is 1, a uniform prior).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=list(profiling.FORMATS),
+        help="Print timings, call counts and rows per stage to standard error as 'text' (default) or 'json'.",
+    )
 
     args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
 
     if args.test_type == "mean" and (args.std_test is None or args.std_control is None):
         parser.error("Standard deviations must be provided for mean type tests.")
 
+    if args.bayesian:
+        print_bayesian_results(args)
+        return
+
     if args.test_type == "proportion":
         z_score = calculate_z_score(
             args.test_value, args.control_value, args.n_test, args.n_control
         )
     elif args.test_type == "mean":
-        std_err = np.sqrt(
-            (args.std_test**2 / args.n_test) + (args.std_control**2 / args.n_control)
+        z_score = calculate_mean_z_score(
+            args.test_value,
+            args.control_value,
+            args.std_test,
+            args.std_control,
+            args.n_test,
+            args.n_control,
         )
-        z_score = (args.test_value - args.control_value) / std_err
 
-    p_value = calculate_p_value(z_score, args.tail)
+    if args.test_type == "proportion" and args.method != "z":
+        try:
+            p_value = run_significance_tests(
+                args.test_value,
+                args.control_value,
+                args.n_test,
+                args.n_control,
+                args.tail,
+                method=args.method,
+            )[1][()]
+        except ValueError as error:
+            parser.error(str(error))
+    else:
+        p_value = calculate_p_value(z_score, args.tail)
     significance = p_value < (1 - args.confidence)
 
     print("\nResults:")
     print("----------------------------")
     print(f"Test Type: {args.test_type.capitalize()} Test")
+    if args.test_type == "proportion" and args.method != "z":
+        print(f"Method: {args.method}")
     print(f"Tail Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
     print(f"Test Group Value: {args.test_value}")
     print(f"Control Group Value: {args.control_value}")
@@ -0,0 +1,322 @@
+import argparse
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sig_test import calculate_z_scores, calculate_mean_z_scores, calculate_p_values
+from samplesize import (
+    calculate_sample_size_for_proportions,
+    calculate_sample_size_for_means,
+)
+
+SimulationResult = namedtuple(
+    "SimulationResult",
+    [
+        "sample_size",
+        "n_control",
+        "n_test",
+        "target_power",
+        "empirical_power",
+        "alpha",
+        "type_i_error",
+        "simulations",
+    ],
+)
+
+# Experiments are simulated in fixed-size blocks, each with its own child seed, so
+# results depend only on the seed and not on how many processes share the work.
+BLOCK_SIMULATIONS = 20_000
+
+
+def _rejections(p_values, z_scores, alpha, tail, direction):
+    significant = p_values < alpha
+    if tail == "one":
+        # A one-tailed test only counts wins in the hypothesized direction.
+        significant &= np.sign(z_scores) == direction
+    return int(np.count_nonzero(significant))
+
+
+def _proportion_block(args):
+    p_control, p_test, n_control, n_test, alpha, tail, size, seed = args
+    rng = np.random.default_rng(seed)
+    control = rng.binomial(n_control, p_control, size) / n_control
+    test = rng.binomial(n_test, p_test, size) / n_test
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_scores = calculate_z_scores(test, control, n_test, n_control)
+    # Identical outcomes in both arms (e.g. zero conversions) give 0/0; never significant.
+    z_scores = np.nan_to_num(z_scores)
+    p_values = calculate_p_values(z_scores, tail)
+    direction = np.sign(p_test - p_control) or 1
+    return _rejections(p_values, z_scores, alpha, tail, direction)
+
+
+def _mean_block(args):
+    mu_control, mu_test, sigma, n_control, n_test, alpha, tail, size, seed = args
+    rng = np.random.default_rng(seed)
+    # Sample means are normal and (n - 1) s^2 / sigma^2 is chi-square for normal data,
+    # so each experiment costs four draws however many units it has.
+    control = rng.normal(mu_control, sigma / math.sqrt(n_control), size)
+    test = rng.normal(mu_test, sigma / math.sqrt(n_test), size)
+    std_control = sigma * np.sqrt(rng.chisquare(n_control - 1, size) / (n_control - 1))
+    std_test = sigma * np.sqrt(rng.chisquare(n_test - 1, size) / (n_test - 1))
+    z_scores = calculate_mean_z_scores(
+        test, control, std_test, std_control, n_test, n_control
+    )
+    p_values = calculate_p_values(z_scores, tail)
+    direction = np.sign(mu_test - mu_control) or 1
+    return _rejections(p_values, z_scores, alpha, tail, direction)
+
+
+def _rejection_rate(block, params, n_simulations, seed, processes):
+    sizes = [BLOCK_SIMULATIONS] * (n_simulations // BLOCK_SIMULATIONS)
+    if n_simulations % BLOCK_SIMULATIONS:
+        sizes.append(n_simulations % BLOCK_SIMULATIONS)
+    seeds = seed.spawn(len(sizes))
+    tasks = [params + (size, block_seed) for size, block_seed in zip(sizes, seeds)]
+    if processes == 1 or len(tasks) <= 1:
+        rejections = sum(map(block, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rejections = sum(pool.map(block, tasks))
+    return rejections / n_simulations
+
+
+def _group_sizes(sample_size, split_ratio):
+    return math.ceil(sample_size * split_ratio), math.ceil(
+        sample_size * (1 - split_ratio)
+    )
+
+
+def simulate_power_for_proportions(
+    baseline,
+    effect_size,
+    alpha,
+    power,
+    split_ratio,
+    tail,
+    n_simulations=100_000,
+    seed=None,
+    processes=None,
+    sample_size=None,
+):
+    """Monte Carlo check of calculate_sample_size_for_proportions.
+
+    Simulates experiments at the computed (or given) sample size by drawing
+    binomial success counts per arm and scoring them with the z-test in
+    sig_test.py. Empirical power uses the expected effect; type-I error uses
+    baseline in both arms.
+    """
+    if sample_size is None:
+        sample_size = calculate_sample_size_for_proportions(
+            baseline, effect_size, alpha, power, split_ratio, tail
+        )
+    n_control, n_test = _group_sizes(sample_size, split_ratio)
+    power_seed, null_seed = np.random.SeedSequence(seed).spawn(2)
+    empirical_power = _rejection_rate(
+        _proportion_block,
+        (baseline, effect_size, n_control, n_test, alpha, tail),
+        n_simulations,
+        power_seed,
+        processes,
+    )
+    type_i_error = _rejection_rate(
+        _proportion_block,
+        (baseline, baseline, n_control, n_test, alpha, tail),
+        n_simulations,
+        null_seed,
+        processes,
+    )
+    return SimulationResult(
+        sample_size,
+        n_control,
+        n_test,
+        power,
+        empirical_power,
+        alpha,
+        type_i_error,
+        n_simulations,
+    )
+
+
+def simulate_power_for_means(
+    delta,
+    sigma,
+    alpha,
+    power,
+    split_ratio,
+    tail,
+    n_simulations=100_000,
+    seed=None,
+    processes=None,
+    sample_size=None,
+):
+    """Monte Carlo check of calculate_sample_size_for_means with normally distributed units."""
+    if sample_size is None:
+        sample_size = calculate_sample_size_for_means(
+            delta, sigma, alpha, power, split_ratio, tail
+        )
+    n_control, n_test = _group_sizes(sample_size, split_ratio)
+    power_seed, null_seed = np.random.SeedSequence(seed).spawn(2)
+    empirical_power = _rejection_rate(
+        _mean_block,
+        (0.0, delta, sigma, n_control, n_test, alpha, tail),
+        n_simulations,
+        power_seed,
+        processes,
+    )
+    type_i_error = _rejection_rate(
+        _mean_block,
+        (0.0, 0.0, sigma, n_control, n_test, alpha, tail),
+        n_simulations,
+        null_seed,
+        processes,
+    )
+    return SimulationResult(
+        sample_size,
+        n_control,
+        n_test,
+        power,
+        empirical_power,
+        alpha,
+        type_i_error,
+        n_simulations,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        This tool checks a sample size by simulation. It computes the sample size the same way as samplesize.py, then simulates many experiments of that size and runs each through the significance test from sig_test.py. It reports the share of experiments that detect the expected effect (empirical power) and the share that wrongly detect an effect when there is none (type-I error).
+
+        Examples of usage:
+        1. Small-baseline conversion rate:
+           Command:
+           python simulate.py --type proportion --tail two --baseline 0.01 --effect_size 0.013 --alpha 0.05 --power 0.8 --split_ratio 0.5 --simulations 100000 --seed 1
+
+        2. Mean difference at a fixed sample size:
+           Command:
+           python simulate.py --type mean --tail one --delta 5 --sigma 20 --alpha 0.05 --power 0.8 --split_ratio 0.5 --sample_size 400
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--type",
+        choices=["proportion", "mean"],
+        help="Specify the type of data: 'proportion' for rates or percentages, 'mean' for continuous outcomes.",
+        required=True,
+    )
+    parser.add_argument(
+        "--tail",
+        choices=["one", "two"],
+        help="Specify the type of test: 'one' for a one-tailed test or 'two' for a two-tailed test.",
+        required=True,
+    )
+    parser.add_argument(
+        "--delta",
+        type=float,
+        help="The desired difference in means for 'mean' type.",
+        required=False,
+    )
+    parser.add_argument(
+        "--sigma",
+        type=float,
+        help="Standard deviation of the measurements for 'mean' type.",
+        required=False,
+    )
+    parser.add_argument(
+        "--baseline",
+        type=float,
+        help="Baseline value (control group rate) for proportion type experiments.",
+        required=False,
+    )
+    parser.add_argument(
+        "--effect_size",
+        type=float,
+        help="Expected outcome rate in the experimental group for proportion type experiments.",
+        required=False,
+    )
+    parser.add_argument(
+        "--alpha", type=float, help="Significance level (alpha).", required=True
+    )
+    parser.add_argument(
+        "--power", type=float, help="Target statistical power.", required=True
+    )
+    parser.add_argument(
+        "--split_ratio",
+        type=float,
+        help="The ratio of the sample size allocated to the control group.",
+        required=True,
+    )
+    parser.add_argument(
+        "--sample_size",
+        type=int,
+        help="Total sample size to simulate (defaults to the calculated requirement).",
+        required=False,
+    )
+    parser.add_argument(
+        "--simulations",
+        type=int,
+        default=100_000,
+        help="Number of simulated experiments (default is 100000).",
+    )
+    parser.add_argument(
+        "--seed", type=int, required=False, help="Random seed for reproducible results."
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        required=False,
+        help="Worker processes used for simulation (default is one per CPU).",
+    )
+
+    args = parser.parse_args()
+
+    if args.type == "proportion":
+        if not all([args.baseline, args.effect_size]):
+            parser.error(
+                "Baseline and effect size must be provided for proportion type."
+            )
+        result = simulate_power_for_proportions(
+            args.baseline,
+            args.effect_size,
+            args.alpha,
+            args.power,
+            args.split_ratio,
+            args.tail,
+            args.simulations,
+            args.seed,
+            args.processes,
+            args.sample_size,
+        )
+    else:
+        if not all([args.delta, args.sigma]):
+            parser.error("Delta and sigma must be provided for mean type.")
+        result = simulate_power_for_means(
+            args.delta,
+            args.sigma,
+            args.alpha,
+            args.power,
+            args.split_ratio,
+            args.tail,
+            args.simulations,
+            args.seed,
+            args.processes,
+            args.sample_size,
+        )
+
+    print("\nPower Simulation Report")
+    print("----------------------------")
+    print(f"Experiment Type: {args.type.capitalize()} Difference")
+    print(f"Test Type: {'Two-tailed' if args.tail == 'two' else 'One-tailed'}")
+    print(f"Total Sample Size: {result.sample_size}")
+    print(f"Control Group Sample Size: {result.n_control}")
+    print(f"Experimental Group Sample Size: {result.n_test}")
+    print(f"Simulated Experiments: {result.simulations}")
+    print(f"Target Power: {result.target_power}")
+    print(f"Empirical Power: {result.empirical_power:.4f}")
+    print(f"Significance Level (Alpha): {result.alpha}")
+    print(f"Empirical Type-I Error: {result.type_i_error:.4f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import json
+import pickle
+import numpy as np
+import pytest
+from aggregate import (
+    ArmStats,
+    aggregate_chunk,
+    aggregate_file,
+    aggregate_files,
+    aggregate_memmap,
+    group_variants,
+    iter_chunks,
+    iter_memmap_chunks,
+    merge_stats,
+    significance_from_stats,
+    stats_from_json,
+    stats_to_json,
+)
+from sig_test import calculate_mean_z_score, calculate_z_score, calculate_p_value
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    variants = np.where(rng.random(5000) < 0.5, "control", "treatment")
+    values = rng.lognormal(3.0, 1.0, size=5000)
+    return variants, values
+
+
+def write_csv(path, variants, values):
+    with open(path, "w") as handle:
+        handle.write("user_id,variant,value\n")
+        for i, (variant, value) in enumerate(zip(variants, values)):
+            handle.write(f"{i},{variant},{float(value)!r}\n")
+
+
+class TestArmStats:
+    def test_update_matches_numpy(self):
+        values = np.random.default_rng(1).normal(1e6, 3.0, size=1000)
+        stats = ArmStats()
+        for chunk in np.array_split(values, 7):
+            stats.update(chunk)
+        assert stats.n == 1000
+        assert abs(stats.mean - values.mean()) < 1e-6
+        assert abs(stats.variance - values.var(ddof=1)) < 1e-6
+        assert abs(stats.total - values.sum()) < 1e-3
+
+    def test_sum_of_squares(self):
+        stats = ArmStats()
+        stats.update([1.0, 2.0, 3.0])
+        assert abs(stats.sum_of_squares - 14.0) < 1e-12
+
+    def test_empty_and_single_value(self):
+        stats = ArmStats()
+        stats.update([])
+        assert stats.n == 0
+        stats.update([5.0])
+        assert stats.variance == 0.0
+
+
+class TestMerge:
+    def test_merge_matches_single_pass(self):
+        values = np.random.default_rng(2).exponential(10.0, size=3000)
+        whole = ArmStats()
+        whole.update(values)
+        shards = []
+        for chunk in np.array_split(values, 5):
+            shard = ArmStats()
+            shard.update(chunk)
+            shards.append(shard)
+        merged = shards[0]
+        for shard in shards[1:]:
+            merged = merged.merge(shard)
+        assert merged.n == whole.n
+        assert abs(merged.mean - whole.mean) < 1e-9
+        assert abs(merged.m2 - whole.m2) < 1e-6
+
+    def test_merge_is_associative(self):
+        a, b, c = ArmStats(), ArmStats(), ArmStats()
+        a.update([1.0, 0.0, 1.0])
+        b.update([0.0, 0.0])
+        c.update([1.0])
+        left = a.merge(b).merge(c)
+        right = a.merge(b.merge(c))
+        assert left.n == right.n == 6
+        assert left.successes == right.successes == 3
+        assert abs(left.mean - right.mean) < 1e-12
+        assert abs(left.m2 - right.m2) < 1e-12
+
+    def test_merge_does_not_mutate(self):
+        a, b = ArmStats(), ArmStats()
+        a.update([1.0, 2.0])
+        b.update([3.0])
+        a.merge(b)
+        assert a.n == 2
+
+    def test_merge_with_empty(self):
+        a = ArmStats()
+        a.update([1.0, 2.0])
+        assert a.merge(ArmStats()) == a
+        assert ArmStats().merge(a) == a
+
+    def test_serialization_round_trip(self):
+        stats = aggregate_chunk(
+            {}, np.array(["A", "B", "A"]), np.array([1.0, 0.0, 0.0])
+        )
+        assert stats_from_json(stats_to_json(stats)) == stats
+        assert pickle.loads(pickle.dumps(stats["A"])) == stats["A"]
+
+    def test_merge_stats_dicts(self):
+        left = aggregate_chunk({}, np.array(["A", "B"]), np.array([1.0, 2.0]))
+        right = aggregate_chunk({}, np.array(["A", "C"]), np.array([3.0, 4.0]))
+        merged = merge_stats(left, right)
+        assert sorted(merged) == ["A", "B", "C"]
+        assert merged["A"].n == 2
+        assert merged["A"].mean == 2.0
+
+
+class TestGroupVariants:
+    @pytest.mark.parametrize(
+        "variants",
+        [np.array(["b", "a", "b", "c"]), np.array([3, 0, 3, 5], dtype=np.uint8)],
+    )
+    def test_bins_hold_each_variants_rows(self, variants):
+        keys, inverse, counts, slots = group_variants(variants)
+        assert len(keys) == len(slots) == 3
+        for key, slot in zip(keys, slots):
+            rows = np.flatnonzero(inverse == slot)
+            np.testing.assert_array_equal(rows, np.flatnonzero(variants == key))
+            assert counts[slot] == len(rows)
+
+    @pytest.mark.parametrize(
+        "variants",
+        [
+            np.array([-1, 0, 1, -1], dtype=np.int8),
+            np.array([7, 2**40, 7], dtype=np.int64),
+        ],
+    )
+    def test_negative_and_sparse_codes_use_unique(self, variants):
+        keys, inverse, counts, slots = group_variants(variants)
+        np.testing.assert_array_equal(keys, np.unique(variants))
+        assert len(counts) == len(keys)
+        stats = aggregate_chunk({}, variants, np.arange(len(variants), dtype=float))
+        assert sorted(stats) == sorted(np.unique(variants).tolist())
+
+
+class TestAggregateFile:
+    def test_csv_matches_in_memory(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.csv"
+        write_csv(path, variants, values)
+        stats = aggregate_file(str(path), chunk_size=333)
+        for variant in ("control", "treatment"):
+            arm = values[variants == variant]
+            assert stats[variant].n == arm.size
+            assert abs(stats[variant].mean - arm.mean()) < 1e-9
+            assert abs(stats[variant].std - arm.std(ddof=1)) < 1e-9
+
+    def test_jsonl_and_missing_values(self, tmp_path):
+        path = tmp_path / "events.jsonl"
+        rows = [
+            {"variant": "A", "converted": 1},
+            {"variant": "A", "converted": 0},
+            {"variant": "B", "converted": 1},
+            {"variant": "B", "converted": None},
+        ]
+        path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+        stats = aggregate_file(str(path), value_column="converted")
+        assert stats["A"].n == 2
+        assert stats["A"].mean == 0.5
+        assert stats["B"].n == 1
+
+    def test_chunks_are_bounded(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.csv"
+        write_csv(path, variants, values)
+        sizes = [len(chunk) for _, chunk in iter_chunks(str(path), chunk_size=1000)]
+        assert max(sizes) == 1000
+        assert sum(sizes) == 5000
+
+    def test_unknown_extension_raises(self, tmp_path):
+        path = tmp_path / "events.txt"
+        path.write_text("")
+        with pytest.raises(ValueError):
+            aggregate_file(str(path))
+
+
+class TestAggregateFiles:
+    def test_parallel_shards_match_single_file(self, tmp_path, events):
+        variants, values = events
+        whole = tmp_path / "events.csv"
+        write_csv(whole, variants, values)
+        shards = []
+        for i, idx in enumerate(np.array_split(np.arange(len(values)), 3)):
+            shard = tmp_path / f"shard_{i}.csv"
+            write_csv(shard, variants[idx], values[idx])
+            shards.append(str(shard))
+        expected = aggregate_file(str(whole))
+        for processes in (1, 2):
+            merged = aggregate_files(shards, processes=processes)
+            for variant in expected:
+                assert merged[variant].n == expected[variant].n
+                assert abs(merged[variant].mean - expected[variant].mean) < 1e-9
+                assert abs(merged[variant].m2 - expected[variant].m2) < 1e-6
+
+
+class TestAggregateMemmap:
+    def test_npy_columns_match_in_memory(self, tmp_path, events):
+        variants, values = events
+        codes = (variants == "treatment").astype(np.uint8)
+        np.save(tmp_path / "values.npy", values)
+        np.save(tmp_path / "variants.npy", codes)
+        stats = aggregate_memmap(
+            str(tmp_path / "values.npy"), str(tmp_path / "variants.npy"), chunk_size=333
+        )
+        assert set(stats) == {0, 1}
+        treatment = values[codes == 1]
+        assert stats[1].n == len(treatment)
+        assert abs(stats[1].mean - treatment.mean()) < 1e-9
+        assert abs(stats[1].std - treatment.std(ddof=1)) < 1e-9
+
+    def test_raw_binary_with_missing_values(self, tmp_path):
+        values = np.array([1.0, np.nan, 3.0, 4.0, 5.0], dtype=np.float32)
+        codes = np.array([0, 1, 1, 0, 2], dtype=np.int16)
+        values.tofile(tmp_path / "values.bin")
+        codes.tofile(tmp_path / "variants.bin")
+        stats = aggregate_memmap(
+            str(tmp_path / "values.bin"),
+            str(tmp_path / "variants.bin"),
+            value_dtype="float32",
+            variant_dtype="int16",
+            chunk_size=2,
+        )
+        assert {key: arm.n for key, arm in stats.items()} == {0: 2, 1: 1, 2: 1}
+        assert stats[0].mean == 2.5
+
+    def test_string_variants_and_parallel_ranges(self, tmp_path, events):
+        variants, values = events
+        np.save(tmp_path / "values.npy", values)
+        np.save(tmp_path / "variants.npy", variants)
+        expected = aggregate_chunk({}, variants, values)
+        merged = aggregate_memmap(
+            str(tmp_path / "values.npy"),
+            str(tmp_path / "variants.npy"),
+            chunk_size=1000,
+            processes=2,
+        )
+        for variant in expected:
+            assert merged[variant].n == expected[variant].n
+            assert abs(merged[variant].mean - expected[variant].mean) < 1e-9
+            assert abs(merged[variant].m2 - expected[variant].m2) < 1e-6
+
+    def test_chunks_are_views(self, tmp_path):
+        np.save(tmp_path / "values.npy", np.arange(10.0))
+        np.save(tmp_path / "variants.npy", np.zeros(10, dtype=np.uint8))
+        chunks = list(
+            iter_memmap_chunks(
+                str(tmp_path / "values.npy"),
+                str(tmp_path / "variants.npy"),
+                chunk_size=4,
+            )
+        )
+        assert [len(values) for _, values in chunks] == [4, 4, 2]
+        assert all(isinstance(values, np.memmap) for _, values in chunks)
+
+    def test_length_mismatch_raises(self, tmp_path):
+        np.save(tmp_path / "values.npy", np.arange(10.0))
+        np.save(tmp_path / "variants.npy", np.zeros(9, dtype=np.uint8))
+        with pytest.raises(ValueError):
+            aggregate_memmap(
+                str(tmp_path / "values.npy"), str(tmp_path / "variants.npy")
+            )
+
+
+class TestSignificanceFromStats:
+    def test_mean_test_matches_sig_test(self, events):
+        variants, values = events
+        stats = aggregate_chunk({}, variants, values)
+        test, control = stats["treatment"], stats["control"]
+        z, p = significance_from_stats(test, control, "two", "mean")
+        expected = calculate_mean_z_score(
+            test.mean, control.mean, test.std, control.std, test.n, control.n
+        )
+        assert abs(z - expected) < 1e-12
+        assert p == calculate_p_value(expected, "two")
+
+    def test_proportion_test_uses_rates(self):
+        stats = aggregate_chunk(
+            {}, np.array(["A"] * 4 + ["B"] * 4), np.array([1, 0, 0, 0, 1, 1, 0, 0.0])
+        )
+        assert stats["B"].successes == 2
+        z, _ = significance_from_stats(stats["B"], stats["A"], "two", "proportion")
+        assert z == calculate_z_score(0.5, 0.25, 4, 4)
+
+    def test_unknown_test_type_raises(self):
+        with pytest.raises(ValueError):
+            significance_from_stats(ArmStats(), ArmStats(), "two", "ratio")
@@ -0,0 +1,225 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import bayesian
+from bayesian import (
+    beta_expected_loss,
+    beta_posterior,
+    beta_prob_greater,
+    best_arm,
+    better_group,
+    normal_expected_loss,
+    normal_prob_greater,
+    run_bayesian_tests,
+    simulate_best_arm,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def integrate_beta(alpha_x, beta_x, alpha_y, beta_y):
+    """P(X > Y) and E[max(Y - X, 0)] by quadrature over a fine grid."""
+    from scipy.integrate import trapezoid
+    from scipy.stats import beta
+
+    grid = np.linspace(0, 1, 200_001)
+    density_x = beta.pdf(grid, alpha_x, beta_x)
+    cdf_y = beta.cdf(grid, alpha_y, beta_y)
+    # E[max(Y - x, 0)] = integral over y > x of (1 - F_Y(y)).
+    tail = np.cumsum((1 - cdf_y)[::-1])[::-1] * (grid[1] - grid[0])
+    return (
+        trapezoid(density_x * cdf_y, grid),
+        trapezoid(density_x * tail, grid),
+    )
+
+
+class TestClosedForm:
+    @pytest.mark.parametrize(
+        "params",
+        [(13, 90, 8, 95), (3, 40, 5, 38), (120, 30, 110, 40), (600, 400, 590, 410)],
+    )
+    def test_beta_matches_quadrature(self, params):
+        prob, loss = integrate_beta(*params)
+        assert beta_prob_greater(*params) == pytest.approx(prob, abs=1e-6)
+        assert beta_expected_loss(*params) == pytest.approx(loss, rel=1e-3)
+
+    def test_non_integer_prior_uses_other_parameters(self):
+        params = (12.5, 90, 8.5, 95)
+        prob, _ = integrate_beta(*params)
+        assert beta_prob_greater(*params) == pytest.approx(prob, abs=1e-6)
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            (0.5, 3.5, 1.5, 2.5),
+            (0.5, 0.5, 0.5, 0.5),
+            (0.3, 7.2, 50.5, 900.5),
+            (120.5, 880.5, 100.5, 900.5),
+            (5.5, 0.7, 1000.2, 3.1),
+        ],
+    )
+    def test_non_integer_parameters_match_integration(self, params):
+        from scipy.integrate import quad
+        from scipy.stats import beta
+
+        alpha_x, beta_x, alpha_y, beta_y = params
+        expected, _ = quad(
+            lambda x: beta.pdf(x, alpha_x, beta_x) * beta.cdf(x, alpha_y, beta_y),
+            0,
+            1,
+            points=[alpha_x / (alpha_x + beta_x), alpha_y / (alpha_y + beta_y)],
+            epsabs=1e-12,
+            limit=500,
+        )
+        assert beta_prob_greater(*params) == pytest.approx(expected, abs=2e-6)
+
+    def test_vectorized_over_many_experiments(self):
+        rng = np.random.default_rng(0)
+        alpha = rng.integers(1, 400, (50, 4)).astype(float)
+        beta = rng.integers(1, 400, (50, 4)).astype(float)
+        probs = beta_prob_greater(alpha, beta, alpha[::-1], beta[::-1])
+        assert probs.shape == (50, 4)
+        for index in [(0, 0), (17, 2), (49, 3)]:
+            expected = beta_prob_greater(
+                alpha[index], beta[index], alpha[::-1][index], beta[::-1][index]
+            )
+            assert probs[index] == pytest.approx(expected, abs=1e-9)
+        np.testing.assert_allclose(
+            probs + beta_prob_greater(alpha[::-1], beta[::-1], alpha, beta), 1
+        )
+
+    def test_chunked_sums_match(self, monkeypatch):
+        alpha = np.arange(1, 400, dtype=float)
+        expected = beta_prob_greater(alpha, 1000 - alpha, alpha + 3, 997 - alpha)
+        monkeypatch.setattr(bayesian, "SUM_CHUNK", 500)
+        np.testing.assert_allclose(
+            beta_prob_greater(alpha, 1000 - alpha, alpha + 3, 997 - alpha), expected
+        )
+
+    def test_large_counts_use_normal_approximation(self):
+        params = (5000, 45000, 5100, 44900)
+        prob, loss = integrate_beta(*params)
+        assert beta_prob_greater(*params) == pytest.approx(prob, abs=1e-4)
+        assert beta_expected_loss(*params) == pytest.approx(loss, rel=1e-2)
+
+    def test_normal_posteriors(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(1.0, 0.5, 1_000_000)
+        y = rng.normal(0.8, 0.3, 1_000_000)
+        assert normal_prob_greater(1.0, 0.5, 0.8, 0.3) == pytest.approx(
+            (x > y).mean(), abs=2e-3
+        )
+        assert normal_expected_loss(1.0, 0.5, 0.8, 0.3) == pytest.approx(
+            np.maximum(y - x, 0).mean(), rel=1e-2
+        )
+
+
+class TestRunBayesianTests:
+    def test_proportions_recover_counts(self):
+        result = run_bayesian_tests([0.2, 0.05], [0.05, 0.2], [40, 40], [40, 40])
+        expected = beta_prob_greater(*beta_posterior(8, 40), *beta_posterior(2, 40))
+        assert result.prob_test_better[0] == pytest.approx(expected)
+        assert result.prob_test_better[1] == pytest.approx(1 - expected)
+        assert result.expected_loss_test[0] < result.expected_loss_control[0]
+
+    def test_means(self):
+        result = run_bayesian_tests(50, 49, 1000, 1000, "mean", 10, 10)
+        assert result.prob_test_better == pytest.approx(
+            normal_prob_greater(50, 10 / np.sqrt(1000), 49, 10 / np.sqrt(1000))
+        )
+
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            run_bayesian_tests(50, 49, 1000, 1000, "mean")
+        with pytest.raises(ValueError):
+            run_bayesian_tests(0.5, 0.4, 100, 100, "median")
+
+    def test_better_group(self):
+        assert better_group(0.97) == "Test"
+        assert better_group(0.02) == "Control"
+        assert better_group([0.5, 0.99], 0.9).tolist() == ["Inconclusive", "Test"]
+
+
+class TestMonteCarlo:
+    def test_two_arms_match_closed_form(self):
+        alpha, beta = beta_posterior([[40, 55]], [[400, 420]])
+        prob_best, expected_loss = simulate_best_arm(alpha, beta, draws=200_000, seed=0)
+        closed_prob, closed_loss = best_arm([[0.1, 55 / 420]], [[400, 420]])
+        np.testing.assert_allclose(prob_best, closed_prob, atol=5e-3)
+        np.testing.assert_allclose(expected_loss, closed_loss, atol=3e-4)
+
+    def test_chunking_keeps_results(self, monkeypatch):
+        loc = np.array([[1.0, 1.1, 0.9]] * 7)
+        scale = np.full((7, 3), 0.1)
+        expected = simulate_best_arm(loc, scale, "mean", draws=20_000, seed=3)
+        monkeypatch.setattr(bayesian, "MC_CHUNK", 1000)
+        chunked = simulate_best_arm(loc, scale, "mean", draws=20_000, seed=3)
+        for full, small in zip(expected, chunked):
+            np.testing.assert_allclose(full, small, atol=0.03)
+        np.testing.assert_allclose(chunked[0].sum(axis=1), 1)
+
+    def test_missing_arms_are_never_best(self):
+        prob_best, expected_loss = simulate_best_arm(
+            [[5.0, np.nan, 8.0]], [[50.0, 1.0, 50.0]], draws=1000, seed=0
+        )
+        assert np.isnan(prob_best[0, 1]) and np.isnan(expected_loss[0, 1])
+        assert np.nansum(prob_best) == pytest.approx(1)
+
+
+class TestCommandLine:
+    def test_sig_test_bayesian(self):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "sig_test.py",
+                "--test_type",
+                "proportion",
+                "--tail",
+                "two",
+                "--test_value",
+                "0.2",
+                "--control_value",
+                "0.05",
+                "--n_test",
+                "40",
+                "--n_control",
+                "40",
+                "--bayesian",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert "Probability Test Beats Control: 0.97" in output
+        assert "Better Group at 0.95 Probability: Test" in output
+        assert "P-Value" not in output
+
+    def test_multiarm_cli(self, tmp_path):
+        path = tmp_path / "arms.csv"
+        path.write_text(
+            "metric,arm,n,successes\n"
+            "ctr,control,5000,500\nctr,v1,5000,600\nctr,v2,5000,520\n"
+        )
+        output = subprocess.run(
+            [
+                sys.executable,
+                "bayesian.py",
+                "--input",
+                str(path),
+                "--test_type",
+                "proportion",
+                "--seed",
+                "0",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        assert output[0] == "metric,arm,value,prob_best,expected_loss"
+        prob_best = [float(line.split(",")[3]) for line in output[1:]]
+        assert len(prob_best) == 3
+        assert prob_best[1] > 0.99
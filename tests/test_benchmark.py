@@ -0,0 +1,69 @@
+import json
+from benchmark import (
+    bench_aggregation,
+    bench_batch,
+    bench_cli,
+    bench_scalar,
+    compare_reports,
+    run_benchmarks,
+)
+
+
+def report(*results):
+    return {"results": list(results)}
+
+
+class TestBenchmarks:
+    def test_scalar_covers_four_functions(self):
+        results = bench_scalar(number=10, repeat=1)
+        assert [result["name"] for result in results] == [
+            "calculate_z_score",
+            "calculate_p_value",
+            "calculate_sample_size_for_proportions",
+            "calculate_sample_size_for_means",
+        ]
+        assert all(result["value"] > 0 and result["unit"] == "us" for result in results)
+
+    def test_batch_sizes_grow_by_powers_of_ten(self):
+        results = bench_batch(max_rows=10_000, repeat=1)
+        assert sorted({result["rows"] for result in results}) == [1_000, 10_000]
+        assert all(result["unit"] == "rows/s" for result in results)
+
+    def test_cli_and_aggregation(self):
+        cli = bench_cli(runs=1)
+        assert {result["name"] for result in cli} == {"sig_test", "samplesize"}
+        (aggregation,) = bench_aggregation(rows=1_000, chunk_size=300, repeat=1)
+        assert aggregation["unit"] == "MB/s" and aggregation["megabytes"] > 0
+
+    def test_report_is_json_serializable(self):
+        data = run_benchmarks(groups=("scalar",), quick=True)
+        assert json.loads(json.dumps(data))["results"][0]["group"] == "scalar"
+
+
+class TestCompareReports:
+    def test_latency_and_throughput_directions(self):
+        baseline = report(
+            {"group": "scalar", "name": "f", "value": 1.0, "unit": "us"},
+            {
+                "group": "batch",
+                "name": "g",
+                "value": 100.0,
+                "unit": "rows/s",
+                "rows": 10,
+            },
+        )
+        current = report(
+            {"group": "scalar", "name": "f", "value": 1.5, "unit": "us"},
+            {
+                "group": "batch",
+                "name": "g",
+                "value": 200.0,
+                "unit": "rows/s",
+                "rows": 10,
+            },
+            {"group": "batch", "name": "g", "value": 1.0, "unit": "rows/s", "rows": 99},
+        )
+        rows = compare_reports(current, baseline, threshold=0.1)
+        assert len(rows) == 2
+        assert rows[0][3] == 0.5 and rows[0][4]
+        assert rows[1][3] == -0.5 and not rows[1][4]
@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+from bootstrap import (
+    BinnedValues,
+    PoissonBootstrap,
+    _compress,
+    bin_arm_values,
+    bootstrap_binned_difference,
+    bootstrap_difference,
+    bootstrap_means,
+    bootstrap_proportion_difference,
+)
+
+
+@pytest.fixture
+def arms():
+    rng = np.random.default_rng(0)
+    return np.round(rng.exponential(10.0, 4000), 1), np.round(
+        rng.exponential(9.0, 4000), 1
+    )
+
+
+class TestBootstrapMeans:
+    def test_reproducible_regardless_of_process_count(self, arms):
+        test, _ = arms
+        serial = bootstrap_means(test, 1200, seed=7, processes=1)
+        parallel = bootstrap_means(test, 1200, seed=7, processes=2)
+        np.testing.assert_array_equal(serial, parallel)
+
+    def test_different_seeds_differ(self, arms):
+        test, _ = arms
+        a = bootstrap_means(test, 200, seed=1, processes=1)
+        b = bootstrap_means(test, 200, seed=2, processes=1)
+        assert not np.array_equal(a, b)
+
+    @pytest.mark.parametrize("method", ["poisson", "multinomial"])
+    def test_spread_matches_standard_error(self, arms, method):
+        test, _ = arms
+        means = bootstrap_means(test, 2000, seed=3, method=method, processes=1)
+        standard_error = test.std() / np.sqrt(test.size)
+        assert abs(means.mean() - test.mean()) < 0.2 * standard_error
+        assert abs(means.std() / standard_error - 1) < 0.1
+
+    def test_invalid_method_raises(self, arms):
+        with pytest.raises(ValueError):
+            bootstrap_means(arms[0], 10, method="jackknife")
+
+
+class TestCompress:
+    def test_counts_and_mean_preserved(self, arms):
+        test, _ = arms
+        values, counts = _compress(test)
+        assert counts.sum() == test.size
+        assert abs(values @ counts / counts.sum() - test.mean()) < 1e-9
+
+    def test_binning_preserves_mean(self):
+        values = np.random.default_rng(4).lognormal(0, 1, 10000)
+        binned, counts = _compress(values, bins=64)
+        assert len(binned) <= 64
+        assert counts.sum() == values.size
+        assert abs(binned @ counts / counts.sum() - values.mean()) < 1e-9
+
+
+class TestPoissonBootstrap:
+    def test_chunked_updates_merge(self):
+        values = np.arange(100, dtype=float)
+        left = PoissonBootstrap(50, seed=1)
+        right = PoissonBootstrap(50, seed=2)
+        left.update(values[:60])
+        right.update(values[60:])
+        merged = left.merge(right)
+        np.testing.assert_allclose(merged.sums, left.sums + right.sums)
+        assert merged.means().shape == (50,)
+
+    def test_merged_accumulator_stays_reproducible(self):
+        values = np.arange(100, dtype=float)
+        results = []
+        for _ in range(2):
+            left = PoissonBootstrap(50, seed=1)
+            left.update(values[:60])
+            merged = left.merge(PoissonBootstrap(50, seed=2))
+            merged.update(values[60:])
+            results.append(merged.sums)
+        np.testing.assert_array_equal(*results)
+
+
+class TestBinnedValues:
+    def test_buckets_keep_exact_means(self):
+        rng = np.random.default_rng(3)
+        values = np.concatenate([rng.normal(0, 50, 5000), np.zeros(100)])
+        binned = BinnedValues(0.01)
+        for start in range(0, values.size, 700):
+            binned.update(values[start : start + 700])
+        assert binned.n == values.size
+        assert binned.mean() == pytest.approx(values.mean(), abs=1e-12)
+        means, counts = binned.values()
+        assert counts.sum() == values.size
+        # One bucket per factor of gamma in magnitude for each sign, plus zero.
+        magnitudes = np.abs(values[values != 0])
+        gamma = 1.01 / 0.99
+        per_sign = np.log(magnitudes.max() / magnitudes.min()) / np.log(gamma) + 2
+        assert len(means) <= 2 * per_sign + 1
+        assert (means == 0).sum() == 1
+
+    def test_non_finite_values_raise(self):
+        binned = BinnedValues()
+        for value in (np.inf, -np.inf, np.nan):
+            with pytest.raises(ValueError, match="finite"):
+                binned.update([1.0, value])
+        assert binned.n == 0
+
+    def test_merge_matches_single_pass(self, arms):
+        test, control = arms
+        left, right, whole = BinnedValues(), BinnedValues(), BinnedValues()
+        left.update(test)
+        right.update(control)
+        whole.update(np.concatenate([test, control]))
+        merged = left.merge(right)
+        np.testing.assert_array_equal(merged.keys, whole.keys)
+        np.testing.assert_array_equal(merged.counts, whole.counts)
+        np.testing.assert_allclose(merged.sums, whole.sums)
+
+    def test_bootstrap_matches_exact(self):
+        rng = np.random.default_rng(4)
+        test, control = rng.lognormal(3, 1, 5000), rng.lognormal(3.02, 1, 5000)
+        binned = [BinnedValues(), BinnedValues()]
+        for arm, values in zip(binned, (test, control)):
+            arm.update(values)
+        approximate = bootstrap_binned_difference(*binned, 4000, seed=1, processes=1)
+        exact = bootstrap_difference(test, control, 4000, seed=1, processes=1)
+        assert approximate.difference == pytest.approx(exact.difference, rel=1e-12)
+        width = exact.ci_upper - exact.ci_lower
+        assert approximate.ci_upper - approximate.ci_lower == pytest.approx(
+            width, rel=0.05
+        )
+
+    def test_bin_arm_values_streams_file(self, tmp_path):
+        path = tmp_path / "events.csv"
+        path.write_text("variant,value\na,1.5\nb,2\na,-3\nc,9\nb,0\n")
+        arms = bin_arm_values(str(path), "variant", "value", ["a", "b"])
+        assert (arms["a"].n, arms["a"].mean()) == (2, -0.75)
+        assert (arms["b"].n, arms["b"].mean()) == (2, 1.0)
+
+
+class TestBootstrapDifference:
+    def test_interval_contains_observed_difference(self, arms):
+        test, control = arms
+        result = bootstrap_difference(test, control, 2000, seed=5, processes=1)
+        assert result.ci_lower < result.difference < result.ci_upper
+        assert abs(result.difference - (test.mean() - control.mean())) < 1e-12
+        assert len(result.replicates) == 2000
+
+    def test_clear_effect_is_significant(self, arms):
+        test, control = arms
+        result = bootstrap_difference(test + 5, control, 1000, seed=5, processes=1)
+        assert result.p_value < 0.01
+        assert result.ci_lower > 0
+
+    def test_one_tailed_is_half_two_tailed(self, arms):
+        test, control = arms
+        two = bootstrap_difference(test, control, 1000, tail_type="two", seed=6)
+        one = bootstrap_difference(test, control, 1000, tail_type="one", seed=6)
+        assert abs(two.p_value - min(1.0, 2 * one.p_value)) < 1e-12
+
+
+class TestBootstrapProportionDifference:
+    def test_matches_normal_approximation(self):
+        result = bootstrap_proportion_difference(
+            1300, 25000, 1200, 25000, 20000, seed=8
+        )
+        p1, p0 = 1300 / 25000, 1200 / 25000
+        se = np.sqrt(p1 * (1 - p1) / 25000 + p0 * (1 - p0) / 25000)
+        assert abs(result.difference - (p1 - p0)) < 1e-15
+        assert abs((result.ci_upper - result.ci_lower) / (2 * 1.96 * se) - 1) < 0.05
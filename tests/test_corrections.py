@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from corrections import adjust_p_values, benjamini_hochberg, bonferroni, holm
+
+
+def holm_reference(p_values):
+    p_values = np.asarray(p_values)
+    m = len(p_values)
+    order = np.argsort(p_values)
+    adjusted = np.empty(m)
+    running = 0.0
+    for rank, index in enumerate(order):
+        running = max(running, min(1.0, (m - rank) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+
+def bh_reference(p_values):
+    p_values = np.asarray(p_values)
+    m = len(p_values)
+    order = np.argsort(p_values)[::-1]
+    adjusted = np.empty(m)
+    running = 1.0
+    for position, index in enumerate(order):
+        rank = m - position
+        running = min(running, m / rank * p_values[index])
+        adjusted[index] = running
+    return adjusted
+
+
+P_VALUES = [0.01, 0.04, 0.03, 0.005, 0.2, 0.04]
+
+
+class TestSingleGroup:
+    def test_bonferroni(self):
+        np.testing.assert_allclose(
+            bonferroni(P_VALUES), np.minimum(1, np.array(P_VALUES) * 6)
+        )
+
+    def test_holm_matches_reference(self):
+        np.testing.assert_allclose(holm(P_VALUES), holm_reference(P_VALUES))
+
+    def test_bh_matches_reference(self):
+        np.testing.assert_allclose(benjamini_hochberg(P_VALUES), bh_reference(P_VALUES))
+
+    def test_ordering_between_methods(self):
+        p = np.random.default_rng(0).random(200) ** 3
+        assert np.all(benjamini_hochberg(p) <= holm(p) + 1e-15)
+        assert np.all(holm(p) <= bonferroni(p) + 1e-15)
+
+
+class TestGroups:
+    def test_groups_are_corrected_independently(self):
+        rng = np.random.default_rng(1)
+        groups = rng.integers(0, 30, size=600)
+        p = rng.random(600) ** 2
+        for method, reference in (("holm", holm_reference), ("bh", bh_reference)):
+            adjusted = adjust_p_values(p, method, groups)
+            for group in np.unique(groups):
+                mask = groups == group
+                np.testing.assert_allclose(adjusted[mask], reference(p[mask]))
+
+    def test_string_groups(self):
+        adjusted = bonferroni([0.01, 0.02, 0.03], ["a", "b", "b"])
+        np.testing.assert_allclose(adjusted, [0.01, 0.04, 0.06])
+
+    def test_missing_p_values_are_ignored(self):
+        p = np.array([0.01, np.nan, 0.04, 0.02])
+        for method in ("bonferroni", "holm", "bh"):
+            adjusted = adjust_p_values(p, method)
+            assert np.isnan(adjusted[1])
+            expected = adjust_p_values(p[[0, 2, 3]], method)
+            np.testing.assert_allclose(adjusted[[0, 2, 3]], expected)
+
+    def test_tiny_p_values_keep_precision(self):
+        p = np.array([1e-30, 0.5, 1e-20, 0.2])
+        groups = np.array([5, 5, 9, 9])
+        np.testing.assert_allclose(holm(p, groups), [2e-30, 0.5, 2e-20, 0.2])
+        np.testing.assert_allclose(
+            benjamini_hochberg(p, groups), [2e-30, 0.5, 2e-20, 0.2]
+        )
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError):
+            adjust_p_values([0.1], "sidak")
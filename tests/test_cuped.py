@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from cuped import (
+    CovarianceStats,
+    aggregate_cuped_chunk,
+    aggregate_cuped_file,
+    cuped_test,
+    cuped_theta,
+)
+
+
+@pytest.fixture
+def experiment():
+    rng = np.random.default_rng(0)
+    n = 20000
+    covariate = rng.gamma(2.0, 10.0, n)
+    variants = np.where(rng.random(n) < 0.5, "control", "treatment")
+    lift = np.where(variants == "treatment", 0.5, 0.0)
+    metric = 0.8 * covariate + rng.normal(0, 5.0, n) + lift
+    return variants, metric, covariate
+
+
+class TestCovarianceStats:
+    def test_chunked_update_matches_numpy(self, experiment):
+        _, y, x = experiment
+        stats = CovarianceStats()
+        for y_chunk, x_chunk in zip(np.array_split(y, 9), np.array_split(x, 9)):
+            stats.update(y_chunk, x_chunk)
+        assert stats.n == y.size
+        assert abs(stats.covariance - np.cov(x, y)[0, 1]) < 1e-8
+        assert abs(stats.correlation - np.corrcoef(x, y)[0, 1]) < 1e-12
+
+    def test_merge_matches_single_pass(self, experiment):
+        _, y, x = experiment
+        left, right, whole = CovarianceStats(), CovarianceStats(), CovarianceStats()
+        left.update(y[:7000], x[:7000])
+        right.update(y[7000:], x[7000:])
+        whole.update(y, x)
+        merged = left.merge(right)
+        for name in CovarianceStats.__slots__:
+            assert abs(getattr(merged, name) - getattr(whole, name)) < 1e-6
+
+    def test_dict_round_trip(self):
+        stats = CovarianceStats()
+        stats.update([1.0, 2.0, 4.0], [0.0, 1.0, 1.0])
+        assert CovarianceStats.from_dict(stats.to_dict()).to_dict() == stats.to_dict()
+
+
+class TestCupedTest:
+    def test_theta_is_pooled_regression_slope(self, experiment):
+        variants, y, x = experiment
+        stats = aggregate_cuped_chunk({}, variants, y, x)
+        slope = np.cov(x, y)[0, 1] / np.var(x, ddof=1)
+        assert abs(cuped_theta(*stats.values()) - slope) < 1e-9
+
+    def test_adjustment_reduces_variance_and_keeps_effect(self, experiment):
+        variants, y, x = experiment
+        stats = aggregate_cuped_chunk({}, variants, y, x)
+        result = cuped_test(stats["treatment"], stats["control"], "two")
+        assert result.variance_reduction > 0.8
+        assert abs(result.test_mean - result.control_mean - 0.5) < 0.2
+        assert result.test_std < np.std(y[variants == "treatment"])
+        assert result.p_value < 0.001
+
+    def test_zero_theta_is_plain_mean_test(self, experiment):
+        variants, y, x = experiment
+        stats = aggregate_cuped_chunk({}, variants, y, x)
+        result = cuped_test(stats["treatment"], stats["control"], "two", theta=0.0)
+        test = y[variants == "treatment"]
+        assert abs(result.test_mean - test.mean()) < 1e-9
+        assert abs(result.test_std - test.std(ddof=1)) < 1e-9
+        assert abs(result.variance_reduction) < 1e-12
+
+    def test_streamed_file(self, tmp_path, experiment):
+        variants, y, x = experiment
+        path = tmp_path / "events.csv"
+        with open(path, "w") as handle:
+            handle.write("variant,revenue,pre_revenue\n")
+            for row in zip(variants, y.tolist(), x.tolist()):
+                handle.write("%s,%r,%r\n" % row)
+        stats = aggregate_cuped_file(
+            str(path),
+            value_column="revenue",
+            covariate_column="pre_revenue",
+            chunk_size=999,
+        )
+        expected = aggregate_cuped_chunk({}, variants, y, x)
+        for variant in expected:
+            assert stats[variant].n == expected[variant].n
+            assert abs(stats[variant].c_xy - expected[variant].c_xy) < 1e-4
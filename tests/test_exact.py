@@ -0,0 +1,119 @@
+import math
+import time
+import numpy as np
+import pytest
+from scipy import stats
+from exact import (
+    LogFactorials,
+    barnard_exact,
+    boschloo_exact,
+    fisher_exact,
+    min_expected_count,
+)
+
+
+@pytest.fixture
+def tables():
+    rng = np.random.default_rng(1)
+    n_test = rng.integers(1, 40, 200)
+    n_control = rng.integers(1, 40, 200)
+    return (
+        rng.binomial(n_test, 0.3),
+        n_test,
+        rng.binomial(n_control, 0.2),
+        n_control,
+    )
+
+
+class TestLogFactorials:
+    def test_matches_lgamma_after_growing(self):
+        log_factorial = LogFactorials(size=4)
+        n = np.array([0, 1, 5, 10_000, 123_457])
+        expected = [math.lgamma(k + 1) for k in n.tolist()]
+        np.testing.assert_allclose(log_factorial(n), expected, rtol=1e-13)
+        assert len(log_factorial.table) > 123_457
+
+
+class TestFisherExact:
+    @pytest.mark.parametrize("alternative", ["two-sided", "greater", "less"])
+    def test_matches_scipy(self, tables, alternative):
+        a, n1, c, n2 = tables
+        expected = [
+            stats.fisher_exact(
+                [[a[i], n1[i] - a[i]], [c[i], n2[i] - c[i]]], alternative=alternative
+            )[1]
+            for i in range(len(a))
+        ]
+        np.testing.assert_allclose(
+            fisher_exact(a, n1, c, n2, alternative), expected, rtol=1e-9
+        )
+
+    def test_thousands_of_tables_in_milliseconds(self):
+        rng = np.random.default_rng(2)
+        n = rng.integers(5, 60, 5000)
+        a, c = rng.binomial(n, 0.1), rng.binomial(n, 0.1)
+        fisher_exact(a, n, c, n)
+        start = time.perf_counter()
+        fisher_exact(a, n, c, n)
+        assert time.perf_counter() - start < 0.1
+
+    def test_keeps_shape_and_validates(self):
+        assert fisher_exact(3, 10, 1, 10).shape == ()
+        with pytest.raises(ValueError):
+            fisher_exact(11, 10, 1, 10)
+        with pytest.raises(ValueError):
+            fisher_exact(1, 10, 1, 10, alternative="bigger")
+
+
+class TestUnconditionalTests:
+    @pytest.mark.parametrize(
+        "test, reference",
+        [(barnard_exact, stats.barnard_exact), (boschloo_exact, stats.boschloo_exact)],
+    )
+    @pytest.mark.parametrize("alternative", ["two-sided", "greater", "less"])
+    @pytest.mark.parametrize("a, c", [(7, 3), (3, 7), (10, 2), (0, 0)])
+    def test_matches_scipy(self, test, reference, alternative, a, c):
+        expected = reference(
+            np.array([[a, c], [20 - a, 25 - c]]), alternative=alternative
+        ).pvalue
+        assert test(a, 20, c, 25, alternative) == pytest.approx(expected, abs=1e-5)
+
+    def test_finds_supremum_at_high_nuisance_rate(self):
+        # The tail probability peaks near a success rate of 0.93, which an
+        # optimizer started elsewhere can miss; brute force over rates confirms it.
+        def pooled_z(x1, x2):
+            pooled = (x1 + x2) / 45
+            variance = pooled * (1 - pooled) * (1 / 20 + 1 / 25)
+            return np.where(variance > 0, x1 / 20 - x2 / 25, 0) / np.sqrt(
+                np.where(variance > 0, variance, 1)
+            )
+
+        x1, x2 = np.meshgrid(np.arange(21), np.arange(26), indexing="ij")
+        region = pooled_z(x1, x2) >= pooled_z(5, 5) - 1e-9
+        brute = max(
+            (stats.binom.pmf(x1, 20, rate) * stats.binom.pmf(x2, 25, rate))[
+                region
+            ].sum()
+            for rate in np.linspace(0.9, 0.96, 601)
+        )
+        assert barnard_exact(5, 20, 5, 25, "greater") == pytest.approx(brute, abs=1e-5)
+
+    @pytest.mark.parametrize("test", [barnard_exact, boschloo_exact])
+    def test_rejects_large_tables(self, test):
+        start = time.perf_counter()
+        with pytest.raises(ValueError, match="at most"):
+            test([5, 12000], [40, 25000], [3, 11800], [40, 25000])
+        assert time.perf_counter() - start < 0.5
+
+    def test_boschloo_is_at_least_as_powerful_as_fisher(self, tables):
+        a, n1, c, n2 = tables
+        assert np.all(
+            boschloo_exact(a, n1, c, n2, "greater")
+            <= fisher_exact(a, n1, c, n2, "greater") + 1e-9
+        )
+
+
+class TestMinExpectedCount:
+    def test_smallest_cell(self):
+        assert min_expected_count(8, 40, 2, 40) == pytest.approx(5.0)
+        assert min_expected_count(39, 40, 38, 40) == pytest.approx(1.5)
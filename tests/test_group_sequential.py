@@ -0,0 +1,75 @@
+import time
+import pytest
+from group_sequential import (
+    alpha_spent,
+    group_sequential_design,
+    plan_for_means,
+    plan_for_proportions,
+)
+from samplesize import calculate_sample_size_for_proportions
+
+
+class TestAlphaSpent:
+    @pytest.mark.parametrize("spending", ["obrien_fleming", "pocock"])
+    @pytest.mark.parametrize("tail", ["one", "two"])
+    def test_spends_all_alpha_at_the_end(self, spending, tail):
+        assert alpha_spent(1.0, 0.05, spending, tail) == pytest.approx(0.05)
+
+    def test_unknown_spending_raises(self):
+        with pytest.raises(ValueError):
+            alpha_spent(0.5, 0.05, "haybittle")
+
+
+class TestGroupSequentialDesign:
+    def test_obrien_fleming_matches_published_boundaries(self):
+        design = group_sequential_design(5, 0.05, 0.9, "two", "obrien_fleming")
+        assert design.boundaries == pytest.approx(
+            [4.877, 3.357, 2.680, 2.290, 2.031], abs=1e-3
+        )
+        assert design.cumulative_alpha[-1] == pytest.approx(0.05, abs=1e-6)
+        assert design.inflation_factor == pytest.approx(1.023, abs=1e-3)
+
+    def test_pocock_boundaries_are_nearly_flat(self):
+        design = group_sequential_design(5, 0.05, 0.9, "two", "pocock")
+        assert design.boundaries == pytest.approx(
+            [2.438, 2.427, 2.410, 2.397, 2.386], abs=1e-3
+        )
+        assert design.expected_fraction_h1 < 0.6
+
+    def test_single_look_is_the_fixed_design(self):
+        design = group_sequential_design(1, 0.05, 0.8, "one")
+        assert design.boundaries[0] == pytest.approx(1.645, abs=1e-3)
+        assert design.inflation_factor == pytest.approx(1.0, abs=1e-4)
+
+    def test_bad_information_fractions_raise(self):
+        with pytest.raises(ValueError):
+            group_sequential_design(3, 0.05, 0.8, information_fractions=[0.5, 0.4, 1])
+        with pytest.raises(ValueError):
+            group_sequential_design(3, 0.05, 0.8, information_fractions=[0.5, 1])
+
+    def test_sweep_reuses_cached_design(self):
+        group_sequential_design(10, 0.05, 0.8, "two")
+        start = time.perf_counter()
+        for step in range(200):
+            plan_for_proportions(
+                0.05 + step * 1e-4, 0.06 + step * 1e-4, 0.05, 0.8, 0.5, "two", 10
+            )
+        assert (time.perf_counter() - start) / 200 < 0.005
+
+
+class TestPlans:
+    def test_proportion_plan_scales_fixed_sample_size(self):
+        plan = plan_for_proportions(0.1, 0.12, 0.05, 0.8, 0.5, "two", 4)
+        fixed = calculate_sample_size_for_proportions(0.1, 0.12, 0.05, 0.8, 0.5, "two")
+        assert plan.fixed_sample_size == fixed
+        assert fixed < plan.max_sample_size < 1.05 * fixed
+        assert plan.look_sample_sizes[-1] == plan.max_sample_size
+        assert plan.expected_sample_size_h1 < fixed < plan.expected_sample_size_h0
+
+    def test_mean_plan_with_correlation_needs_fewer_units(self):
+        plain = plan_for_means(5, 20, 0.05, 0.8, 0.5, "one", 3, "pocock")
+        adjusted = plan_for_means(
+            5, 20, 0.05, 0.8, 0.5, "one", 3, "pocock", correlation=0.6
+        )
+        assert adjusted.design is plain.design
+        assert adjusted.max_sample_size < plain.max_sample_size
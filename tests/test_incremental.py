@@ -0,0 +1,167 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from aggregate import aggregate_file
+from incremental import (
+    checkpoint_key,
+    load_store,
+    refresh_file,
+    refresh_files,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    variants = np.where(rng.random(3000) < 0.5, "control", "treatment")
+    values = rng.normal(10, 2, 3000)
+    return variants.tolist(), values.tolist()
+
+
+def append_jsonl(path, variants, values):
+    with open(path, "a") as handle:
+        for variant, value in zip(variants, values):
+            handle.write(json.dumps({"variant": variant, "value": value}) + "\n")
+
+
+def assert_same_stats(stats, expected):
+    assert set(stats) == set(expected)
+    for variant in expected:
+        assert stats[variant].n == expected[variant].n
+        assert stats[variant].mean == pytest.approx(expected[variant].mean)
+        assert stats[variant].m2 == pytest.approx(expected[variant].m2)
+
+
+class TestRefreshFile:
+    def test_appends_match_full_pass(self, tmp_path, events):
+        variants, values = events
+        path = str(tmp_path / "events.jsonl")
+        checkpoint = None
+        for start, stop in [(0, 1000), (1000, 1001), (1001, 1001), (1001, 3000)]:
+            append_jsonl(path, variants[start:stop], values[start:stop])
+            stats, checkpoint, rows = refresh_file(path, checkpoint, chunk_size=97)
+            assert rows == stop - start
+            assert checkpoint["offset"] == os.path.getsize(path)
+        assert_same_stats(stats, aggregate_file(path))
+
+    def test_partial_last_line_waits(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.jsonl"
+        append_jsonl(path, variants[:10], values[:10])
+        line = json.dumps({"variant": variants[10], "value": values[10]}) + "\n"
+        with open(path, "a") as handle:
+            handle.write(line[:7])
+        stats, checkpoint, rows = refresh_file(str(path))
+        assert rows == 10
+        with open(path, "a") as handle:
+            handle.write(line[7:])
+        stats, checkpoint, rows = refresh_file(str(path), checkpoint)
+        assert rows == 1
+        assert_same_stats(stats, aggregate_file(str(path)))
+
+    def test_csv_header_is_kept(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.csv"
+        path.write_text("value,variant\n")
+        stats, checkpoint, rows = refresh_file(str(path))
+        assert rows == 0 and stats == {}
+        for start in (0, 1500):
+            with open(path, "a") as handle:
+                for variant, value in zip(
+                    variants[start : start + 1500], values[start : start + 1500]
+                ):
+                    handle.write(f"{value!r},{variant}\n")
+            stats, checkpoint, rows = refresh_file(str(path), checkpoint)
+            assert rows == 1500
+        assert checkpoint["header"] == "value,variant\n"
+        assert_same_stats(stats, aggregate_file(str(path)))
+
+    def test_rewritten_file_is_read_again(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.jsonl"
+        append_jsonl(path, variants[:500], values[:500])
+        _, checkpoint, _ = refresh_file(str(path))
+        # Same length, different contents: a rotated log.
+        path.unlink()
+        append_jsonl(path, variants[500:1000], values[500:1000])
+        stats, _, rows = refresh_file(str(path), checkpoint)
+        assert rows == 500
+        assert_same_stats(stats, aggregate_file(str(path)))
+        # Truncated below the stored offset.
+        path.unlink()
+        append_jsonl(path, variants[:5], values[:5])
+        stats, _, rows = refresh_file(str(path), checkpoint)
+        assert rows == 5
+
+
+class TestRefreshFiles:
+    def test_store_round_trip(self, tmp_path, events):
+        variants, values = events
+        paths = [str(tmp_path / "a.jsonl"), str(tmp_path / "b.jsonl")]
+        store = str(tmp_path / "store.json")
+        append_jsonl(paths[0], variants[:1000], values[:1000])
+        append_jsonl(paths[1], variants[1000:2000], values[1000:2000])
+        _, new_rows = refresh_files(paths, store)
+        assert new_rows == 2000
+        append_jsonl(paths[1], variants[2000:], values[2000:])
+        stats, new_rows = refresh_files(paths, store)
+        assert new_rows == 1000
+        assert set(load_store(store)) == {checkpoint_key(path) for path in paths}
+
+        whole = str(tmp_path / "whole.jsonl")
+        append_jsonl(whole, variants, values)
+        assert_same_stats(stats, aggregate_file(whole))
+
+    def test_columns_have_separate_checkpoints(self, tmp_path):
+        path = tmp_path / "events.jsonl"
+        path.write_text('{"variant": "a", "x": 1, "y": 5}\n')
+        store = str(tmp_path / "store.json")
+        x, _ = refresh_files([str(path)], store, value_column="x")
+        y, new_rows = refresh_files([str(path)], store, value_column="y")
+        assert new_rows == 1
+        assert (x["a"].mean, y["a"].mean) == (1, 5)
+
+
+def run_cli(tmp_path, path, *extra):
+    return subprocess.run(
+        [
+            sys.executable,
+            "incremental.py",
+            "--input",
+            str(path),
+            "--checkpoint",
+            str(tmp_path / "store.json"),
+            "--test_type",
+            "mean",
+            "--tail",
+            "two",
+            "--test_variant",
+            "treatment",
+            "--control_variant",
+            "control",
+            *extra,
+        ],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+class TestCommandLine:
+    def test_reads_only_new_lines(self, tmp_path, events):
+        variants, values = events
+        path = tmp_path / "events.jsonl"
+        append_jsonl(path, variants[:2000], values[:2000])
+        assert "New Rows: 2000" in run_cli(tmp_path, path)
+        append_jsonl(path, variants[2000:], values[2000:])
+        output = run_cli(tmp_path, path)
+        assert "New Rows: 1000" in output
+        sizes = [line for line in output.splitlines() if "Group Size" in line]
+        assert sum(int(line.split(": ")[1]) for line in sizes) == 3000
+        assert "New Rows: 3000" in run_cli(tmp_path, path, "--reset")
@@ -0,0 +1,178 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from scipy import stats
+from mannwhitney import (
+    RankHistogram,
+    iter_arm_chunks,
+    mann_whitney_external,
+    mann_whitney_u,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(0)
+    return rng.poisson(4.2, 3000).astype(float), rng.poisson(4.0, 2500).astype(float)
+
+
+def chunked(test, control, size):
+    for start in range(0, max(len(test), len(control)), size):
+        yield test[start : start + size], control[start : start + size]
+
+
+def assert_matches_scipy(result, test, control, alternative="two-sided"):
+    expected = stats.mannwhitneyu(test, control, alternative=alternative)
+    assert result.u_statistic == pytest.approx(expected.statistic)
+    assert result.p_value == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+class TestMannWhitneyU:
+    def test_matches_scipy_with_ties(self, samples):
+        test, control = samples
+        assert_matches_scipy(mann_whitney_u(test, control), test, control)
+        assert_matches_scipy(
+            mann_whitney_u(test, control, "one"), test, control, "greater"
+        )
+
+    def test_matches_scipy_without_ties(self):
+        rng = np.random.default_rng(1)
+        test, control = rng.normal(0.1, 1, 400), rng.normal(0, 1, 700)
+        assert_matches_scipy(mann_whitney_u(test, control), test, control)
+
+    def test_prob_superiority(self):
+        result = mann_whitney_u([1, 2, 3], [0, 2])
+        # Pairs won: 1>0, 2>0, 3>0, 3>2, and 2=2 counts as half.
+        assert result.prob_superiority == pytest.approx(4.5 / 6)
+
+    def test_all_equal_values(self):
+        result = mann_whitney_u([1.0, 1.0], [1.0, 1.0, 1.0])
+        assert result.prob_superiority == 0.5
+        assert np.isnan(result.p_value)
+
+    def test_empty_sample(self):
+        with pytest.raises(ValueError):
+            mann_whitney_u([], [1.0, 2.0])
+
+
+class TestExternal:
+    def test_matches_in_memory(self, samples, tmp_path):
+        test, control = samples
+        result = mann_whitney_external(
+            chunked(test, control, 333),
+            run_size=500,
+            block_size=64,
+            directory=str(tmp_path),
+        )
+        assert result == pytest.approx(mann_whitney_u(test, control))
+        # The spilled runs are removed afterwards.
+        assert os.listdir(tmp_path) == []
+
+    def test_continuous_values(self):
+        rng = np.random.default_rng(2)
+        test, control = rng.exponential(1.1, 2000), rng.exponential(1.0, 1000)
+        result = mann_whitney_external(
+            chunked(test, control, 250), "one", run_size=300, block_size=50
+        )
+        assert result == pytest.approx(mann_whitney_u(test, control, "one"))
+
+
+class TestRankHistogram:
+    def test_exact_for_integers(self, samples):
+        test, control = samples
+        histogram = RankHistogram()
+        for test_chunk, control_chunk in chunked(test, control, 700):
+            histogram.update(
+                np.concatenate([test_chunk, control_chunk]),
+                np.arange(len(test_chunk) + len(control_chunk)) < len(test_chunk),
+            )
+        assert histogram.test() == pytest.approx(mann_whitney_u(test, control))
+
+    def test_merge_matches_single_pass(self, samples):
+        test, control = samples
+        shards = [RankHistogram(0.5), RankHistogram(0.5)]
+        shards[0].update(test - 3, np.ones(len(test), dtype=bool))
+        shards[1].update(control + 2, np.zeros(len(control), dtype=bool))
+        merged = shards[0].merge(shards[1])
+        whole = RankHistogram(0.5)
+        whole.update(
+            np.concatenate([test - 3, control + 2]),
+            np.arange(len(test) + len(control)) < len(test),
+        )
+        np.testing.assert_array_equal(merged.counts, whole.counts)
+        assert merged.offset == whole.offset
+
+    def test_wide_bins_approximate(self):
+        rng = np.random.default_rng(3)
+        test, control = rng.lognormal(0.05, 1, 5000), rng.lognormal(0, 1, 5000)
+        histogram = RankHistogram(0.01)
+        histogram.update(np.concatenate([test, control]), np.arange(10000) < len(test))
+        exact = mann_whitney_u(test, control)
+        assert histogram.test().prob_superiority == pytest.approx(
+            exact.prob_superiority, abs=1e-3
+        )
+
+    def test_too_many_bins(self):
+        with pytest.raises(ValueError):
+            RankHistogram(1e-9).update([0.0, 1.0], [True, False])
+
+
+def write_events(path, test, control):
+    with open(path, "w") as handle:
+        for variant, values in (("treatment", test), ("control", control)):
+            for value in values:
+                handle.write(json.dumps({"variant": variant, "items": value}) + "\n")
+
+
+def run_cli(path, *extra):
+    return subprocess.run(
+        [
+            sys.executable,
+            "mannwhitney.py",
+            "--input",
+            str(path),
+            "--tail",
+            "two",
+            "--test_variant",
+            "treatment",
+            "--control_variant",
+            "control",
+            "--value_column",
+            "items",
+            *extra,
+        ],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+
+
+class TestCommandLine:
+    def test_methods_agree(self, samples, tmp_path):
+        test, control = samples
+        path = tmp_path / "events.jsonl"
+        write_events(path, test, control)
+        assert [
+            (chunk[0].tolist(), chunk[1].tolist())
+            for chunk in iter_arm_chunks(
+                [str(path)], "treatment", "control", "variant", "items"
+            )
+        ] == [(test.tolist(), control.tolist())]
+        expected = stats.mannwhitneyu(test, control)
+        for method in ("sort", "external", "histogram"):
+            output = run_cli(path, "--method", method, "--run_size", "1000").stdout
+            assert f"U Statistic: {expected.statistic}" in output
+            assert f"P-Value: {expected.pvalue:.4f}" in output
+
+    def test_missing_variant(self, samples, tmp_path):
+        test, _ = samples
+        path = tmp_path / "events.jsonl"
+        write_events(path, test, [])
+        completed = run_cli(path)
+        assert completed.returncode == 2
+        assert "at least one value" in completed.stderr
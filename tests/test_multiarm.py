@@ -0,0 +1,219 @@
+import io
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from scipy.stats import multivariate_normal
+from corrections import holm
+from sig_test import calculate_z_scores, calculate_mean_z_scores, calculate_p_values
+from multiarm import (
+    compare_to_control,
+    compare_all_pairs,
+    dunnett_adjust,
+    dunnett_critical_value,
+    pair_matrix,
+    pivot_arms,
+    write_comparisons,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROPORTIONS = np.array([[0.10, 0.12, 0.105, 0.095], [0.30, 0.31, 0.29, 0.33]])
+N = np.array([[5000, 5000, 5000, 5000], [2000, 2100, 1900, 2000]])
+
+
+def dunnett_reference(z_scores, loadings, tail_type):
+    correlation = np.outer(loadings, loadings)
+    np.fill_diagonal(correlation, 1)
+    distribution = multivariate_normal(np.zeros(len(loadings)), correlation)
+    adjusted = []
+    for z in np.abs(z_scores):
+        upper = np.full(len(loadings), z)
+        lower = -upper if tail_type == "two" else np.full(len(loadings), -np.inf)
+        adjusted.append(1 - distribution.cdf(upper, lower_limit=lower))
+    return np.array(adjusted)
+
+
+class TestDunnett:
+    @pytest.mark.parametrize("tail_type", ["one", "two"])
+    def test_matches_multivariate_normal(self, tail_type):
+        loadings = np.array([0.5, 0.7, 0.6, 0.8])
+        z_scores = np.array([2.3, 1.5, 2.9, -2.0])
+        adjusted = dunnett_adjust(z_scores, loadings, tail_type)[0]
+        np.testing.assert_allclose(
+            adjusted, dunnett_reference(z_scores, loadings, tail_type), atol=2e-5
+        )
+
+    def test_critical_value_matches_table(self):
+        # Dunnett's two-sided table, infinite degrees of freedom.
+        assert dunnett_critical_value(2, 0.05) == pytest.approx(2.212, abs=1e-3)
+        assert dunnett_critical_value(4, 0.05) == pytest.approx(2.442, abs=1e-3)
+
+    def test_between_raw_and_bonferroni(self):
+        rng = np.random.default_rng(0)
+        z_scores = rng.normal(0, 3, (20, 9))
+        adjusted = dunnett_adjust(z_scores, np.full((20, 9), 0.7))
+        raw = calculate_p_values(z_scores, "two")
+        assert np.all(adjusted >= raw)
+        assert np.all(adjusted <= np.minimum(1, 9 * raw) + 1e-12)
+
+    def test_tiny_p_values_stay_positive(self):
+        adjusted = dunnett_adjust([[12.0, 0.5]], [[0.7, 0.7]])[0]
+        assert 0 < adjusted[0] <= 2 * calculate_p_values(12.0, "two")
+
+    def test_missing_comparisons_are_left_out(self):
+        adjusted = dunnett_adjust([[2.5, np.nan]], [[0.7, 0.7]])[0]
+        assert np.isnan(adjusted[1])
+        assert adjusted[0] == pytest.approx(calculate_p_values(2.5, "two"))
+
+
+class TestCompareToControl:
+    def test_z_scores_match_two_arm_test(self):
+        result = compare_to_control(PROPORTIONS, N, control=1)
+        np.testing.assert_array_equal(result.first, [0, 2, 3])
+        np.testing.assert_array_equal(result.second, [1, 1, 1])
+        expected = calculate_z_scores(
+            PROPORTIONS[:, [0, 2, 3]],
+            PROPORTIONS[:, [1]],
+            N[:, [0, 2, 3]],
+            N[:, [1]],
+        )
+        np.testing.assert_allclose(result.z_score, expected)
+        np.testing.assert_allclose(
+            result.difference, PROPORTIONS[:, [0, 2, 3]] - PROPORTIONS[:, [1]]
+        )
+
+    def test_holm_is_applied_within_each_metric(self):
+        result = compare_to_control(PROPORTIONS, N, adjustment="holm")
+        for metric in range(2):
+            np.testing.assert_allclose(
+                result.p_adjusted[metric], holm(result.p_value[metric])
+            )
+
+    def test_single_metric_is_one_dimensional(self):
+        result = compare_to_control(PROPORTIONS[0], N[0])
+        assert result.z_score.shape == (3,)
+        both = compare_to_control(PROPORTIONS, N)
+        np.testing.assert_allclose(result.p_adjusted, both.p_adjusted[0])
+
+    def test_mean_comparisons(self):
+        means = np.array([50.0, 52.0, 49.0])
+        std = np.array([10.0, 11.0, 9.0])
+        n = np.array([1000, 800, 900])
+        result = compare_to_control(means, n, test_type="mean", std=std)
+        expected = calculate_mean_z_scores(
+            means[1:], means[0], std[1:], std[0], n[1:], n[0]
+        )
+        np.testing.assert_allclose(result.z_score, expected)
+        loadings = np.sqrt((100 / 1000) / (100 / 1000 + std[1:] ** 2 / n[1:]))
+        np.testing.assert_allclose(
+            result.p_adjusted,
+            dunnett_reference(expected, loadings, "two"),
+            atol=2e-5,
+        )
+
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            compare_to_control(PROPORTIONS, N, adjustment="tukey")
+        with pytest.raises(ValueError):
+            compare_to_control(PROPORTIONS, N, test_type="mean")
+
+
+class TestCompareAllPairs:
+    def test_every_pair_once(self):
+        result = compare_all_pairs(PROPORTIONS, N)
+        assert result.z_score.shape == (2, 6)
+        assert set(zip(result.first.tolist(), result.second.tolist())) == {
+            (i, j) for i in range(4) for j in range(i + 1, 4)
+        }
+        for metric in range(2):
+            np.testing.assert_allclose(
+                result.p_adjusted[metric], holm(result.p_value[metric])
+            )
+
+    def test_dunnett_is_rejected(self):
+        with pytest.raises(ValueError):
+            compare_all_pairs(PROPORTIONS, N, adjustment="dunnett")
+
+    def test_pair_matrix_is_antisymmetric_for_differences(self):
+        result = compare_all_pairs(PROPORTIONS, N)
+        difference = pair_matrix(result, 4, "difference")
+        np.testing.assert_allclose(
+            difference[:, 2, 0], PROPORTIONS[:, 2] - PROPORTIONS[:, 0]
+        )
+        np.testing.assert_allclose(difference, -np.swapaxes(difference, 1, 2))
+        p_adjusted = pair_matrix(result, 4)
+        np.testing.assert_allclose(p_adjusted, np.swapaxes(p_adjusted, 1, 2))
+        assert np.isnan(p_adjusted[:, 1, 1]).all()
+
+    def test_twenty_arms_many_metrics(self):
+        rng = np.random.default_rng(1)
+        values = rng.uniform(0.05, 0.1, (300, 20))
+        n = rng.integers(1_000, 10_000, (300, 20))
+        result = compare_all_pairs(values, n)
+        assert result.p_adjusted.shape == (300, 190)
+        assert np.all(result.p_adjusted >= result.p_value)
+
+
+class TestCommandLine:
+    def test_pivot_arms_from_successes(self):
+        table = {
+            "metric": np.array(["ctr", "ctr", "cvr", "cvr"]),
+            "arm": np.array(["a", "b", "b", "a"]),
+            "n": np.array([100.0, 200.0, 50.0, 40.0]),
+            "successes": np.array([10.0, 30.0, 5.0, 8.0]),
+        }
+        metrics, arms, values, n, std = pivot_arms(table, "proportion")
+        assert metrics == ["ctr", "cvr"]
+        assert arms == ["a", "b"]
+        np.testing.assert_allclose(values, [[0.1, 0.15], [0.2, 0.1]])
+        assert std is None
+
+    def test_pivot_arms_rejects_duplicates(self):
+        table = {
+            "metric": np.array(["ctr", "ctr"]),
+            "arm": np.array(["a", "a"]),
+            "n": np.array([1.0, 2.0]),
+            "value": np.array([0.1, 0.2]),
+        }
+        with pytest.raises(ValueError):
+            pivot_arms(table, "proportion")
+
+    def test_write_comparisons(self):
+        result = compare_to_control(PROPORTIONS, N)
+        out = io.StringIO()
+        write_comparisons(["ctr", "cvr"], ["a", "b", "c", "d"], result, out)
+        lines = out.getvalue().splitlines()
+        assert lines[0].startswith("metric,arm,versus,difference")
+        assert len(lines) == 7
+        assert lines[1].startswith("ctr,b,a,")
+
+    def test_cli(self, tmp_path):
+        path = tmp_path / "arms.csv"
+        path.write_text(
+            "metric,arm,n,successes\n"
+            "ctr,control,5000,500\nctr,v1,5000,600\nctr,v2,5000,520\n"
+        )
+        output = subprocess.run(
+            [
+                sys.executable,
+                "multiarm.py",
+                "--input",
+                str(path),
+                "--test_type",
+                "proportion",
+                "--tail",
+                "two",
+                "--control",
+                "control",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        assert len(output) == 3
+        assert output[1].startswith("ctr,v1,control,")
+        assert output[1].endswith(",True")
+        assert output[2].endswith(",False")
@@ -0,0 +1,64 @@
+import math
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+from scipy.stats import norm
+import normal
+
+# Wall-clock budget for importing the CLI modules in a fresh interpreter. NumPy
+# alone takes ~0.15s on a typical laptop; scipy.stats would add over a second.
+IMPORT_BUDGET_SECONDS = 0.75
+
+
+class TestScalarFunctions:
+    def test_cdf_matches_scipy(self):
+        for x in [-8.0, -1.96, 0.0, 0.5, 3.0]:
+            assert abs(normal.cdf(x) - norm.cdf(x)) < 1e-15
+
+    def test_sf_keeps_tail_precision(self):
+        for x in [0.0, 1.0, 10.0, 30.0]:
+            assert math.isclose(normal.sf(x), norm.sf(x), rel_tol=1e-12)
+
+    def test_ppf_matches_scipy(self):
+        for q in [1e-10, 0.025, 0.5, 0.8, 0.975, 1 - 1e-10]:
+            assert math.isclose(normal.ppf(q), norm.ppf(q), rel_tol=1e-12)
+
+    def test_ppf_edges(self):
+        assert normal.ppf(0.0) == -math.inf
+        assert normal.ppf(1.0) == math.inf
+        assert math.isnan(normal.ppf(1.5))
+
+
+class TestArrayFunctions:
+    @pytest.mark.parametrize("size", [10, normal.SCIPY_THRESHOLD + 1])
+    def test_arrays_match_scipy_on_both_paths(self, size):
+        x = np.linspace(-5, 5, size)
+        np.testing.assert_allclose(normal.sf_array(x), norm.sf(x), rtol=1e-12)
+        q = np.linspace(0.001, 0.999, size)
+        np.testing.assert_allclose(normal.ppf_array(q), norm.ppf(q), rtol=1e-12)
+
+    def test_shape_is_preserved(self):
+        assert normal.ppf_array(np.full((2, 3), 0.5)).shape == (2, 3)
+
+
+class TestImportTime:
+    def test_cli_modules_do_not_import_scipy(self):
+        code = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            "import sig_test, samplesize\n"
+            "print(time.perf_counter() - start)\n"
+            "print('scipy' in sys.modules)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=str(Path(__file__).resolve().parents[1]),
+        )
+        elapsed, scipy_loaded = result.stdout.split()
+        assert scipy_loaded == "False"
+        assert float(elapsed) < IMPORT_BUDGET_SECONDS
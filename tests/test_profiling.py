@@ -0,0 +1,104 @@
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+import profiling
+from sig_test import run_significance_tests
+from scorecard import score_table
+
+
+@pytest.fixture(autouse=True)
+def clean_profile():
+    profiling.reset()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+
+def entries():
+    return {entry["name"]: entry for entry in profiling.summary()}
+
+
+class TestProfiling:
+    def test_disabled_records_nothing(self):
+        run_significance_tests([0.5, 0.6], [0.5, 0.5], 100, 100, "two")
+        with profiling.stage("parse"):
+            pass
+        assert profiling.summary() == []
+
+    def test_counts_calls_and_rows(self):
+        profiling.enable()
+        for _ in range(3):
+            run_significance_tests([0.5, 0.6, 0.7], [0.5, 0.5, 0.5], 100, 100, "two")
+        recorded = entries()
+        assert recorded["sig_test.run_significance_tests"]["calls"] == 3
+        assert recorded["sig_test.run_significance_tests"]["rows"] == 9
+        assert recorded["normal.sf_array"]["calls"] == 3
+        assert recorded["sig_test.run_significance_tests"]["seconds"] > 0
+
+    def test_table_results_count_rows(self):
+        profiling.enable()
+        score_table(
+            {
+                "test_value": np.array([0.1, 0.2]),
+                "control_value": np.array([0.1, 0.1]),
+                "n_test": np.array([100, 100]),
+                "n_control": np.array([100, 100]),
+            }
+        )
+        assert entries()["scorecard.score_table"]["rows"] == 2
+
+    def test_stage_rows_can_be_set_inside_block(self):
+        profiling.enable()
+        with profiling.stage("parse") as stage:
+            stage.rows = 42
+        assert entries()["parse"]["rows"] == 42
+
+    def test_reports(self):
+        profiling.enable()
+        with profiling.stage("write", rows=5):
+            pass
+        out = io.StringIO()
+        profiling.report("json", out)
+        assert json.loads(out.getvalue())["profile"][0]["name"] == "write"
+        out = io.StringIO()
+        profiling.report("text", out)
+        assert "write" in out.getvalue() and "Calls" in out.getvalue()
+
+    def test_bad_format_raises(self):
+        with pytest.raises(ValueError):
+            profiling.enable("yaml")
+
+    def test_cli_flag_prints_summary_to_stderr(self):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "samplesize.py",
+                "--type",
+                "mean",
+                "--tail",
+                "two",
+                "--delta",
+                "5",
+                "--sigma",
+                "20",
+                "--alpha",
+                "0.05",
+                "--power",
+                "0.8",
+                "--split_ratio",
+                "0.5",
+                "--profile",
+                "json",
+            ],
+            cwd=str(Path(__file__).resolve().parents[1]),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        names = [entry["name"] for entry in json.loads(completed.stderr)["profile"]]
+        assert "samplesize.calculate_sample_size_for_means" in names
+        assert "Total Sample Size Required" in completed.stdout
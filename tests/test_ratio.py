@@ -0,0 +1,176 @@
+import math
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from cuped import CovarianceStats, aggregate_cuped_chunk
+from sig_test import calculate_p_value
+from ratio import (
+    aggregate_ratio_file,
+    aggregate_ratio_memmap,
+    delta_method_variance,
+    ratio_estimate,
+    ratio_test,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def users():
+    rng = np.random.default_rng(0)
+    n = 20000
+    variants = np.where(rng.random(n) < 0.5, "control", "treatment")
+    sessions = rng.poisson(3, n) + 1.0
+    # Revenue per session varies by user, so sessions of one user are correlated.
+    revenue = sessions * rng.gamma(2.0, 5.0, n) * rng.uniform(0.5, 1.5, n)
+    revenue[variants == "treatment"] *= 1.05
+    return variants, revenue, sessions
+
+
+def linearized_variance(y, x):
+    """Variance of the ratio of means via the linearized per-user values."""
+    ratio = y.mean() / x.mean()
+    linear = (y - ratio * x) / x.mean()
+    return linear.var(ddof=1) / len(y)
+
+
+class TestDeltaMethod:
+    def test_matches_linearization(self, users):
+        _, y, x = users
+        stats = CovarianceStats()
+        stats.update(y, x)
+        ratio, std_error = ratio_estimate(stats)
+        assert ratio == pytest.approx(y.sum() / x.sum())
+        assert std_error**2 == pytest.approx(linearized_variance(y, x), rel=1e-9)
+
+    def test_vectorized_variance(self):
+        variance = delta_method_variance(
+            [100, 400], [2.0, 2.0], [1.0, 1.0], [1.0, 1.0], [0.25, 0.25], [0.1, 0.1]
+        )
+        expected = (1.0 - 2 * 2 * 0.1 + 4 * 0.25) / np.array([100, 400])
+        np.testing.assert_allclose(variance, expected)
+
+    def test_wider_than_session_level_mean_test(self, users):
+        variants, y, x = users
+        arm = variants == "control"
+        stats = CovarianceStats()
+        stats.update(y[arm], x[arm])
+        _, std_error = ratio_estimate(stats)
+        per_session = np.repeat(y[arm] / x[arm], x[arm].astype(int))
+        naive = per_session.std(ddof=1) / math.sqrt(len(per_session))
+        assert std_error > naive
+
+    def test_single_user_has_no_standard_error(self):
+        stats = CovarianceStats()
+        stats.update([3.0], [2.0])
+        ratio, std_error = ratio_estimate(stats)
+        assert ratio == 1.5
+        assert math.isnan(std_error)
+
+
+class TestRatioTest:
+    def test_z_score_feeds_p_value(self, users):
+        variants, y, x = users
+        stats = aggregate_cuped_chunk({}, variants, y, x)
+        result = ratio_test(stats["treatment"], stats["control"], "two")
+        expected_se = math.sqrt(
+            linearized_variance(y[variants == "treatment"], x[variants == "treatment"])
+            + linearized_variance(y[variants == "control"], x[variants == "control"])
+        )
+        assert result.z_score == pytest.approx(
+            (result.test_ratio - result.control_ratio) / expected_se
+        )
+        assert result.p_value == calculate_p_value(result.z_score, "two")
+        assert result.test_ratio > result.control_ratio
+
+    def test_constant_ratios_give_nan(self):
+        test, control = CovarianceStats(), CovarianceStats()
+        test.update([2.0, 4.0, 6.0], [1.0, 2.0, 3.0])
+        control.update([3.0, 6.0], [1.0, 2.0])
+        result = ratio_test(test, control, "two")
+        assert (result.test_std_error, result.control_std_error) == (0.0, 0.0)
+        assert math.isnan(result.z_score) and math.isnan(result.p_value)
+
+    def test_streamed_file_matches_in_memory(self, tmp_path, users):
+        variants, y, x = users
+        path = tmp_path / "users.csv"
+        with open(path, "w") as handle:
+            handle.write("variant,revenue,sessions\n")
+            for row in zip(variants, y.tolist(), x.tolist()):
+                handle.write("%s,%r,%r\n" % row)
+        stats = aggregate_ratio_file(
+            str(path),
+            numerator_column="revenue",
+            denominator_column="sessions",
+            chunk_size=777,
+        )
+        expected = aggregate_cuped_chunk({}, variants, y, x)
+        for variant in expected:
+            assert stats[variant].n == expected[variant].n
+            assert stats[variant].mean_y == pytest.approx(expected[variant].mean_y)
+            assert stats[variant].c_xy == pytest.approx(expected[variant].c_xy)
+
+    def test_memmap_columns_and_processes(self, tmp_path, users):
+        variants, y, x = users
+        codes = (variants == "treatment").astype(np.uint8)
+        y = y.copy()
+        y[5] = np.nan
+        np.save(tmp_path / "revenue.npy", y)
+        np.save(tmp_path / "sessions.npy", x)
+        np.save(tmp_path / "variants.npy", codes)
+        paths = [str(tmp_path / name) for name in ("revenue.npy", "sessions.npy")]
+        keep = ~np.isnan(y)
+        expected = aggregate_cuped_chunk({}, codes[keep], y[keep], x[keep])
+        for processes in (1, 3):
+            stats = aggregate_ratio_memmap(
+                *paths,
+                str(tmp_path / "variants.npy"),
+                chunk_size=1000,
+                processes=processes,
+            )
+            for code in (0, 1):
+                assert stats[code].n == expected[code].n
+                assert stats[code].m2_y == pytest.approx(expected[code].m2_y)
+                assert stats[code].c_xy == pytest.approx(expected[code].c_xy)
+
+    def test_memmap_length_mismatch(self, tmp_path):
+        np.save(tmp_path / "a.npy", np.ones(3))
+        np.save(tmp_path / "b.npy", np.ones(4))
+        np.save(tmp_path / "v.npy", np.zeros(3, dtype=np.uint8))
+        with pytest.raises(ValueError):
+            aggregate_ratio_memmap(
+                str(tmp_path / "a.npy"),
+                str(tmp_path / "b.npy"),
+                str(tmp_path / "v.npy"),
+            )
+
+    def test_cli(self, tmp_path, users):
+        variants, y, x = users
+        path = tmp_path / "users.jsonl"
+        with open(path, "w") as handle:
+            for row in zip(variants, y.tolist(), x.tolist()):
+                handle.write(
+                    '{"variant": "%s", "numerator": %r, "denominator": %r}\n' % row
+                )
+        output = subprocess.run(
+            [
+                sys.executable,
+                "ratio.py",
+                "--input",
+                str(path),
+                "--tail",
+                "two",
+                "--test_variant",
+                "treatment",
+                "--control_variant",
+                "control",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert "Test Group Std Error (Delta Method)" in output
+        assert "Significant:" in output
@@ -0,0 +1,204 @@
+import math
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from sig_test import calculate_mean_z_score, calculate_p_value
+from robust import (
+    QuantileSketch,
+    aggregate_capped_file,
+    capped_arm,
+    robust_test_files,
+    sketch_file,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def revenue():
+    rng = np.random.default_rng(0)
+    n = 20000
+    variants = np.where(rng.random(n) < 0.5, "control", "treatment")
+    values = rng.lognormal(2.0, 1.5, n)
+    values[variants == "treatment"] *= 1.05
+    values[rng.random(n) < 0.3] = 0.0
+    return variants, values
+
+
+def write_csv(path, variants, values):
+    with open(path, "w") as handle:
+        handle.write("variant,revenue\n")
+        for variant, value in zip(variants.tolist(), values.tolist()):
+            handle.write(f"{variant},{value!r}\n")
+
+
+class TestQuantileSketch:
+    def test_relative_accuracy(self):
+        rng = np.random.default_rng(1)
+        values = np.concatenate(
+            [rng.lognormal(3, 2, 100_000), -rng.exponential(5, 5000), np.zeros(100)]
+        )
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for chunk in np.array_split(values, 7):
+            sketch.update(chunk)
+        ordered = np.sort(values)
+        for q in (0.001, 0.03, 0.05, 0.5, 0.9, 0.99, 0.9999):
+            rank = q * (len(values) - 1)
+            exact = ordered[[math.floor(rank), math.ceil(rank)]]
+            estimate = sketch.quantile(q)
+            assert np.min(np.abs(estimate - exact) / np.abs(exact)) <= 0.01
+        assert sketch.quantile(0) == ordered[0]
+        assert sketch.quantile(1) == ordered[-1]
+
+    def test_merge_equals_single_pass(self):
+        rng = np.random.default_rng(2)
+        values = rng.standard_t(2, 50_000) * 100
+        whole = QuantileSketch()
+        whole.update(values)
+        shards = [QuantileSketch() for _ in range(3)]
+        for shard, chunk in zip(shards, np.array_split(values, 3)):
+            shard.update(chunk)
+        merged = shards[2].merge(shards[0]).merge(shards[1])
+        assert merged.to_dict() == whole.to_dict()
+
+    def test_bounded_bins(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_bins=64)
+        sketch.update(np.logspace(-5, 5, 10_000))
+        assert len(sketch.to_dict()["positive"][1]) == 64
+        assert sketch.count == 10_000
+        # The top of the distribution keeps its accuracy.
+        assert sketch.quantile(0.99) == pytest.approx(
+            np.quantile(np.logspace(-5, 5, 10_000), 0.99), rel=0.02
+        )
+
+    def test_round_trip_and_empty(self):
+        sketch = QuantileSketch()
+        assert math.isnan(sketch.quantile(0.5))
+        sketch.update([1.0, 2.0, 3.0])
+        restored = QuantileSketch.from_dict(sketch.to_dict())
+        assert restored.quantile(0.5) == sketch.quantile(0.5)
+        with pytest.raises(ValueError):
+            sketch.merge(QuantileSketch(relative_accuracy=0.01))
+
+
+class TestCappedTests:
+    def test_winsorized_matches_numpy(self, tmp_path, revenue):
+        variants, values = revenue
+        path = str(tmp_path / "events.csv")
+        write_csv(path, variants, values)
+        result = robust_test_files(
+            [path], "treatment", "control", "two", value_column="revenue"
+        )
+        assert result.upper_cap == pytest.approx(np.quantile(values, 0.99), rel=0.01)
+        assert result.lower_cap == -math.inf
+        capped = np.minimum(values, result.upper_cap)
+        test = capped[variants == "treatment"]
+        control = capped[variants == "control"]
+        assert result.test.mean == pytest.approx(test.mean())
+        assert result.control.std == pytest.approx(control.std(ddof=1))
+        expected = calculate_mean_z_score(
+            test.mean(),
+            control.mean(),
+            test.std(ddof=1),
+            control.std(ddof=1),
+            len(test),
+            len(control),
+        )
+        assert result.z_score == pytest.approx(expected)
+        assert result.p_value == pytest.approx(calculate_p_value(expected, "two"))
+        assert result.test.std < values[variants == "treatment"].std()
+
+    def test_trimmed_uses_yuen_standard_error(self, tmp_path, revenue):
+        variants, values = revenue
+        path = str(tmp_path / "events.csv")
+        write_csv(path, variants, values)
+        winsorized, trimmed = aggregate_capped_file(
+            path, 1.0, 50.0, "variant", "revenue"
+        )
+        arm = capped_arm(winsorized["control"], trimmed["control"], "trim")
+        control = values[variants == "control"]
+        kept = control[(control >= 1.0) & (control <= 50.0)]
+        winsorized_var = np.clip(control, 1.0, 50.0).var(ddof=1)
+        assert arm.n == len(kept)
+        assert arm.mean == pytest.approx(kept.mean())
+        assert arm.std**2 / arm.n == pytest.approx(
+            (len(control) - 1) * winsorized_var / (len(kept) * (len(kept) - 1))
+        )
+
+    def test_shards_match_single_file(self, tmp_path, revenue):
+        variants, values = revenue
+        single = str(tmp_path / "all.csv")
+        write_csv(single, variants, values)
+        shards = []
+        for index, part in enumerate(np.array_split(np.arange(len(values)), 3)):
+            shards.append(str(tmp_path / f"part-{index}.csv"))
+            write_csv(shards[-1], variants[part], values[part])
+        kwargs = dict(method="trim", lower_quantile=0.05, value_column="revenue")
+        expected = robust_test_files([single], "treatment", "control", "two", **kwargs)
+        for processes in (1, 2):
+            result = robust_test_files(
+                shards, "treatment", "control", "two", processes=processes, **kwargs
+            )
+            assert result.upper_cap == expected.upper_cap
+            assert result.lower_cap == expected.lower_cap
+            assert result.z_score == pytest.approx(expected.z_score)
+
+    def test_sketch_file_by_variant(self, tmp_path, revenue):
+        variants, values = revenue
+        path = str(tmp_path / "events.csv")
+        write_csv(path, variants, values)
+        sketches = sketch_file(path, value_column="revenue", chunk_size=999)
+        assert sketches["control"].count == np.sum(variants == "control")
+        assert sketches["treatment"].max == values[variants == "treatment"].max()
+
+    def test_validation(self, tmp_path, revenue):
+        variants, values = revenue
+        path = str(tmp_path / "events.csv")
+        write_csv(path, variants, values)
+        with pytest.raises(ValueError):
+            robust_test_files([path], "treatment", "control", "two", method="median")
+        with pytest.raises(ValueError):
+            robust_test_files(
+                [path],
+                "treatment",
+                "control",
+                "two",
+                lower_quantile=0.9,
+                upper_quantile=0.5,
+            )
+        with pytest.raises(KeyError):
+            robust_test_files(
+                [path], "holdout", "control", "two", value_column="revenue"
+            )
+
+    def test_cli(self, tmp_path, revenue):
+        variants, values = revenue
+        path = tmp_path / "events.csv"
+        write_csv(path, variants, values)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "robust.py",
+                "--input",
+                str(path),
+                "--tail",
+                "two",
+                "--test_variant",
+                "treatment",
+                "--control_variant",
+                "control",
+                "--value_column",
+                "revenue",
+                "--method",
+                "trim",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert "Test Type: Trimmed Mean Test" in output
+        assert "Upper Cap:" in output
+        assert "Pooled Std Dev (for samplesize.py --sigma):" in output
@@ -1,9 +1,22 @@
+import io
 import math
+import numpy as np
 import pytest
 from scipy.stats import norm
 from samplesize import (
     calculate_sample_size_for_proportions,
     calculate_sample_size_for_means,
+    sample_size_grid_for_proportions,
+    sample_size_grid_for_means,
+    build_design_grid,
+    write_grid_table,
+    minimum_detectable_effect_for_proportions,
+    minimum_detectable_effect_for_means,
+    achieved_power_for_proportions,
+    achieved_power_for_means,
+    write_solution_table,
+    calculate_multiarm_sample_size_for_proportions,
+    calculate_multiarm_sample_size_for_means,
 )
 
 
@@ -96,3 +109,202 @@ class TestCalculateSampleSizeForMeans:
         raw = (2 * (20 ** 2) * (z_alpha + z_beta) ** 2) / (5 ** 2)
         expected = math.ceil(raw / (0.5 * 0.5))
         assert n == expected
+
+    def test_correlation_shrinks_sigma(self):
+        """CUPED planning uses sigma * sqrt(1 - rho^2)."""
+        n_cuped = calculate_sample_size_for_means(5, 20, 0.05, 0.8, 0.5, "two", 0.6)
+        n_plain = calculate_sample_size_for_means(5, 16, 0.05, 0.8, 0.5, "two")
+        assert n_cuped == n_plain
+
+
+class TestSampleSizeGrid:
+    def test_proportion_grid_matches_scalar(self):
+        design = build_design_grid(
+            baseline=[0.05, 0.10],
+            effect_size=[0.12, 0.15],
+            alpha=[0.01, 0.05],
+            power=[0.8, 0.9],
+            split_ratio=[0.3, 0.5],
+        )
+        for tail in ("one", "two"):
+            sizes = sample_size_grid_for_proportions(tail=tail, **design)
+            expected = [
+                calculate_sample_size_for_proportions(b, e, a, p, s, tail)
+                for b, e, a, p, s in zip(*design.values())
+            ]
+            np.testing.assert_array_equal(sizes, expected)
+
+    def test_mean_grid_matches_scalar(self):
+        design = build_design_grid(
+            delta=[2, 5],
+            sigma=[10, 20],
+            alpha=[0.05],
+            power=[0.8, 0.9],
+            split_ratio=[0.5],
+        )
+        sizes = sample_size_grid_for_means(tail="two", **design)
+        expected = [
+            calculate_sample_size_for_means(d, s, a, p, r, "two")
+            for d, s, a, p, r in zip(*design.values())
+        ]
+        np.testing.assert_array_equal(sizes, expected)
+        sizes = sample_size_grid_for_means(tail="two", correlation=0.5, **design)
+        expected = [
+            calculate_sample_size_for_means(d, s, a, p, r, "two", 0.5)
+            for d, s, a, p, r in zip(*design.values())
+        ]
+        np.testing.assert_array_equal(sizes, expected)
+
+    def test_broadcasting_and_tail_arrays(self):
+        sizes = sample_size_grid_for_means(
+            5, 20, 0.05, np.array([[0.8], [0.9]]), 0.5, np.array(["one", "two"])
+        )
+        assert sizes.shape == (2, 2)
+        assert sizes[0, 0] == calculate_sample_size_for_means(
+            5, 20, 0.05, 0.8, 0.5, "one"
+        )
+        assert sizes[1, 1] == calculate_sample_size_for_means(
+            5, 20, 0.05, 0.9, 0.5, "two"
+        )
+
+    def test_zero_effect_is_infinite(self):
+        sizes = sample_size_grid_for_proportions(
+            0.1, [0.1, 0.15], 0.05, 0.8, 0.5, "two"
+        )
+        assert np.isinf(sizes[0])
+        assert np.isfinite(sizes[1])
+
+    def test_design_grid_is_cartesian_product(self):
+        design = build_design_grid(a=[1, 2, 3], b=[10, 20])
+        assert len(design["a"]) == 6
+        assert set(zip(design["a"], design["b"])) == {
+            (a, b) for a in (1, 2, 3) for b in (10, 20)
+        }
+
+    def test_write_grid_table(self):
+        design = build_design_grid(
+            baseline=[0.10],
+            effect_size=[0.15],
+            alpha=[0.05],
+            power=[0.8],
+            split_ratio=[0.5],
+        )
+        sizes = sample_size_grid_for_proportions(tail="two", **design)
+        out = io.StringIO()
+        write_grid_table(design, sizes, out)
+        lines = out.getvalue().splitlines()
+        assert (
+            lines[0]
+            == "baseline,effect_size,alpha,power,split_ratio,total,control,test"
+        )
+        assert lines[1].endswith(",2732,1366,1366")
+
+
+class TestInverseSolvers:
+    def test_proportion_mde_inverts_sample_size(self):
+        for direction, target in (("increase", 0.12), ("decrease", 0.08)):
+            n = calculate_sample_size_for_proportions(
+                0.1, target, 0.05, 0.8, 0.4, "two"
+            )
+            mde = minimum_detectable_effect_for_proportions(
+                0.1, n, 0.05, 0.8, 0.4, "two", direction
+            )
+            assert mde == pytest.approx(target, abs=1e-5)
+            # n was rounded up, so solving back lands within one unit of it.
+            n_back = calculate_sample_size_for_proportions(
+                0.1, float(mde), 0.05, 0.8, 0.4, "two"
+            )
+            assert abs(n_back - n) <= 1
+
+    def test_proportion_mde_over_traffic_levels(self):
+        mde = minimum_detectable_effect_for_proportions(
+            0.1, [1e3, 1e4, 1e5, 1e6], 0.05, 0.8, 0.5, "one"
+        )
+        assert mde.shape == (4,)
+        assert np.all(np.diff(mde) < 0)
+        assert np.all(mde > 0.1)
+
+    def test_proportion_mde_out_of_range_is_nan(self):
+        mde = minimum_detectable_effect_for_proportions(
+            0.5, [5, 1e5], 0.05, 0.8, 0.5, "two"
+        )
+        assert np.isnan(mde[0])
+        assert np.isfinite(mde[1])
+
+    def test_invalid_direction(self):
+        with pytest.raises(ValueError):
+            minimum_detectable_effect_for_proportions(
+                0.1, 1e4, 0.05, 0.8, 0.5, "two", "up"
+            )
+
+    def test_mean_mde_closed_form(self):
+        n = calculate_sample_size_for_means(5, 20, 0.05, 0.9, 0.5, "one", 0.3)
+        mde = minimum_detectable_effect_for_means(n, 20, 0.05, 0.9, 0.5, "one", 0.3)
+        assert mde == pytest.approx(5, rel=1e-3)
+        assert mde <= 5
+
+    def test_power_at_required_sample_size(self):
+        n = calculate_sample_size_for_proportions(0.1, 0.15, 0.05, 0.8, 0.5, "two")
+        power = achieved_power_for_proportions(0.1, 0.15, n, 0.05, 0.5, "two")
+        assert power == pytest.approx(0.8, abs=2e-3)
+        assert power >= 0.8
+        n = calculate_sample_size_for_means(5, 20, 0.05, 0.8, 0.5, "two")
+        power = achieved_power_for_means(5, 20, n, 0.05, 0.5, "two")
+        assert power == pytest.approx(0.8, abs=2e-3)
+
+    def test_power_matches_normal_formula(self):
+        sizes = np.array([100.0, 1000.0, 10000.0])
+        power = achieved_power_for_means(2, 10, sizes, 0.05, 0.5, "two")
+        expected = norm.cdf(2 * np.sqrt(sizes * 0.25 / 2) / 10 - norm.ppf(0.975))
+        np.testing.assert_allclose(power, expected)
+
+    def test_power_without_effect_is_alpha_tail(self):
+        power = achieved_power_for_proportions(0.1, 0.1, 1000, 0.05, 0.5, "one")
+        assert power == pytest.approx(0.05)
+
+    def test_write_solution_table(self):
+        design = build_design_grid(baseline=[0.1], sample_size=[1000.0, 2000.0])
+        out = io.StringIO()
+        write_solution_table(design, "mde", np.array([0.2, 0.15]), out)
+        assert out.getvalue().splitlines() == [
+            "baseline,sample_size,mde",
+            "0.1,1000.0,0.2",
+            "0.1,2000.0,0.15",
+        ]
+
+
+class TestMultiArmSampleSize:
+    def test_one_treatment_matches_two_arm_calculator(self):
+        plan = calculate_multiarm_sample_size_for_proportions(
+            0.1, 0.12, 0.05, 0.8, 1, "two"
+        )
+        n = calculate_sample_size_for_proportions(0.1, 0.12, 0.05, 0.8, 0.5, "two")
+        assert plan.comparison_alpha == 0.05
+        assert plan.control == plan.treatment == math.ceil(n / 2)
+
+    def test_bonferroni_divides_alpha(self):
+        plan = calculate_multiarm_sample_size_for_means(
+            5, 20, 0.05, 0.8, 4, "two", "bonferroni"
+        )
+        n = calculate_sample_size_for_means(5, 20, 0.0125, 0.8, 0.5, "two")
+        assert plan.comparison_alpha == 0.0125
+        assert plan.treatment == math.ceil(n / 2)
+        assert plan.total == plan.control + 4 * plan.treatment
+
+    def test_dunnett_needs_less_than_bonferroni(self):
+        dunnett = calculate_multiarm_sample_size_for_means(5, 20, 0.05, 0.8, 4, "two")
+        bonferroni = calculate_multiarm_sample_size_for_means(
+            5, 20, 0.05, 0.8, 4, "two", "bonferroni"
+        )
+        assert 0.0125 < dunnett.comparison_alpha < 0.05
+        assert dunnett.total < bonferroni.total
+
+    def test_control_ratio(self):
+        plan = calculate_multiarm_sample_size_for_proportions(
+            0.1, 0.12, 0.05, 0.8, 4, "two", control_ratio=2.0
+        )
+        assert plan.control == pytest.approx(2 * plan.treatment, abs=2)
+
+    def test_unknown_adjustment(self):
+        with pytest.raises(ValueError):
+            calculate_multiarm_sample_size_for_means(5, 20, 0.05, 0.8, 4, "two", "bh")
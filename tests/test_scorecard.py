@@ -0,0 +1,69 @@
+import io
+import numpy as np
+import pytest
+from corrections import holm
+from scorecard import load_table, score_table, write_table
+from sig_test import calculate_mean_z_score, calculate_p_value, calculate_z_score
+
+CSV = """experiment,metric,test_type,test_value,control_value,n_test,n_control,std_test,std_control
+exp1,conversion,proportion,0.507,0.4728,25000,25000,,
+exp1,spend,mean,50,45,25000,25000,10,10
+exp1,clicks,proportion,0.30,0.30,1000,1000,,
+exp2,conversion,proportion,0.12,0.10,2000,2000,,
+"""
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = tmp_path / "metrics.csv"
+    path.write_text(CSV)
+    return load_table(str(path))
+
+
+class TestScoreTable:
+    def test_load_table_types(self, table):
+        assert table["experiment"].tolist() == ["exp1", "exp1", "exp1", "exp2"]
+        assert np.isnan(table["std_test"][0])
+        assert table["n_test"][1] == 25000
+
+    def test_z_and_p_match_scalar_functions(self, table):
+        scored = score_table(table)
+        assert (
+            abs(scored["z_score"][0] - calculate_z_score(0.507, 0.4728, 25000, 25000))
+            < 1e-12
+        )
+        z_mean = calculate_mean_z_score(50, 45, 10, 10, 25000, 25000)
+        assert abs(scored["z_score"][1] - z_mean) < 1e-12
+        assert scored["p_value"][2] == calculate_p_value(0.0, "two")
+
+    def test_corrections_are_per_experiment(self, table):
+        scored = score_table(table, methods=("holm",))
+        np.testing.assert_allclose(scored["p_holm"][:3], holm(scored["p_value"][:3]))
+        assert scored["p_holm"][3] == scored["p_value"][3]
+        assert scored["significant_holm"].tolist() == [True, True, False, True]
+
+    def test_unknown_test_type_raises(self, table):
+        table["test_type"] = table["test_type"].astype(object)
+        table["test_type"][0] = "ratio"
+        with pytest.raises(ValueError):
+            score_table(table)
+
+    def test_large_table(self):
+        rng = np.random.default_rng(0)
+        rows = 2000 * 200
+        table = {
+            "experiment": np.repeat(np.arange(2000), 200),
+            "test_value": rng.uniform(0.09, 0.11, rows),
+            "control_value": np.full(rows, 0.1),
+            "n_test": np.full(rows, 10000.0),
+            "n_control": np.full(rows, 10000.0),
+        }
+        scored = score_table(table)
+        assert scored["p_bh"].shape == (rows,)
+        assert np.all(scored["p_bh"] >= scored["p_value"])
+
+    def test_write_table(self, table):
+        out = io.StringIO()
+        write_table(score_table(table, methods=("bh",)), out)
+        header = out.getvalue().splitlines()[0].split(",")
+        assert header[-4:] == ["z_score", "p_value", "p_bh", "significant_bh"]
@@ -0,0 +1,185 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from scorecard import score_table
+from segments import (
+    ALL,
+    SegmentStats,
+    aggregate_segments_file,
+    aggregate_segments_files,
+    analyze_segments,
+    segment_table,
+    slice_sets,
+)
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    n = 30000
+    country = rng.choice(["us", "de", "br"], n, p=[0.5, 0.3, 0.2])
+    platform = rng.choice(["ios", "android", "web"], n)
+    variant = np.where(rng.random(n) < 0.5, "control", "treatment")
+    value = rng.gamma(2.0, 10.0, n)
+    value[(variant == "treatment") & (country == "br")] *= 1.2
+    return np.stack([country, platform, variant], axis=1), value
+
+
+def write_csv(path, keys, values):
+    with open(path, "w") as handle:
+        handle.write("country,platform,variant,revenue\n")
+        for row, value in zip(keys.tolist(), values.tolist()):
+            handle.write("%s,%s,%s,%r\n" % (*row, value))
+
+
+class TestSegmentStats:
+    def test_rollup_matches_direct_statistics(self, events):
+        keys, values = events
+        stats = SegmentStats(("country", "platform"))
+        for start in range(0, len(values), 7001):
+            stats.update(keys[start : start + 7001], values[start : start + 7001])
+        slices, arm = stats.rollup(("country",), "treatment")
+        assert sorted(slices) == [("br", ALL), ("de", ALL), ("us", ALL)]
+        for index, (country, _) in enumerate(slices):
+            rows = values[(keys[:, 0] == country) & (keys[:, 2] == "treatment")]
+            assert arm["n"][index] == len(rows)
+            assert arm["mean"][index] == pytest.approx(rows.mean())
+            assert arm["std"][index] == pytest.approx(rows.std(ddof=1))
+
+    def test_overall_slice(self, events):
+        keys, values = events
+        stats = SegmentStats(("country", "platform"))
+        stats.update(keys, values)
+        slices, arm = stats.rollup((), "control")
+        rows = values[keys[:, 2] == "control"]
+        assert slices == [(ALL, ALL)]
+        assert arm["std"][0] == pytest.approx(rows.std(ddof=1))
+        assert arm["successes"][0] == len(rows)
+
+    def test_missing_variant_has_no_rows(self, events):
+        keys, values = events
+        stats = SegmentStats(("country", "platform"))
+        stats.update(keys[:100], values[:100])
+        slices, arm = stats.rollup(("platform",), "holdout")
+        assert len(slices) == 3
+        assert np.all(arm["n"] == 0)
+
+    def test_merge_equals_single_pass(self, events):
+        keys, values = events
+        whole = SegmentStats(("country", "platform"))
+        whole.update(keys, values)
+        # The shards see labels in different orders, so their codes differ.
+        first = SegmentStats(("country", "platform"))
+        first.update(keys[:50], values[:50])
+        second = SegmentStats(("country", "platform"))
+        second.update(keys[::-1][:-50], values[::-1][:-50])
+        merged = first.merge(second)
+        for dimensions in slice_sets(("country", "platform"), 2):
+            expected_slices, expected = whole.rollup(dimensions, "treatment")
+            slices, arm = merged.rollup(dimensions, "treatment")
+            order = [slices.index(labels) for labels in expected_slices]
+            for name in ("n", "mean", "std", "successes"):
+                np.testing.assert_allclose(arm[name][order], expected[name])
+
+    def test_merge_rejects_other_dimensions(self):
+        with pytest.raises(ValueError):
+            SegmentStats(("country",)).merge(SegmentStats(("platform",)))
+
+
+class TestSegmentTests:
+    def test_slice_sets(self):
+        assert slice_sets(("a", "b"), 1) == [(), ("a",), ("b",)]
+        assert slice_sets(("a", "b"), 5)[-1] == ("a", "b")
+
+    def test_one_correction_over_all_slices(self, events):
+        keys, values = events
+        stats = SegmentStats(("country", "platform"))
+        stats.update(keys, values)
+        scored = analyze_segments(
+            stats, "treatment", "control", "mean", depth=2, methods=("bonferroni",)
+        )
+        # Overall, 3 countries, 3 platforms and 9 crossed cells.
+        assert len(scored["p_value"]) == 16
+        np.testing.assert_allclose(
+            scored["p_bonferroni"], np.minimum(1, 16 * scored["p_value"])
+        )
+        brazil = (scored["country"] == "br") & (scored["platform"] == ALL)
+        assert scored["significant_bonferroni"][brazil].all()
+
+    def test_proportions_use_successes(self, events):
+        keys, values = events
+        stats = SegmentStats(("country", "platform"))
+        stats.update(keys, (values > 20).astype(float))
+        table = segment_table(stats, "treatment", "control", "proportion")
+        overall = table["country"] == ALL
+        treated = keys[:, 2] == "treatment"
+        assert table["test_value"][overall][0] == pytest.approx(
+            (values[treated] > 20).mean()
+        )
+        scored = score_table(table)
+        assert np.isfinite(scored["z_score"]).all()
+
+
+class TestFiles:
+    def test_file_and_shards_match_in_memory(self, tmp_path, events):
+        keys, values = events
+        write_csv(tmp_path / "a.csv", keys[:10000], values[:10000])
+        write_csv(tmp_path / "b.csv", keys[10000:], values[10000:])
+        expected = SegmentStats(("country",))
+        expected.update(keys[:, [0, 2]], values)
+        for processes in (1, 2):
+            stats = aggregate_segments_files(
+                [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")],
+                ("country",),
+                value_column="revenue",
+                chunk_size=999,
+                processes=processes,
+            )
+            for variant in ("control", "treatment"):
+                assert stats.rollup((), variant)[1]["mean"] == pytest.approx(
+                    expected.rollup((), variant)[1]["mean"]
+                )
+        single = aggregate_segments_file(
+            str(tmp_path / "a.csv"), ("platform",), value_column="revenue"
+        )
+        assert single.rollup((), "control")[1]["n"][0] == np.sum(
+            keys[:10000, 2] == "control"
+        )
+
+    def test_cli(self, tmp_path, events):
+        keys, values = events
+        path = tmp_path / "events.csv"
+        write_csv(path, keys, values)
+        output = subprocess.run(
+            [
+                sys.executable,
+                "segments.py",
+                "--input",
+                str(path),
+                "--segments",
+                "country",
+                "platform",
+                "--test_type",
+                "mean",
+                "--tail",
+                "two",
+                "--test_variant",
+                "treatment",
+                "--control_variant",
+                "control",
+                "--value_column",
+                "revenue",
+            ],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        assert output[0].startswith("country,platform,test_value")
+        assert output[0].endswith(",p_bh,significant_bh")
+        assert len(output) == 1 + 1 + 3 + 3
+        assert output[1].startswith("*,*,")
@@ -0,0 +1,118 @@
+import json
+import numpy as np
+import pytest
+from sequential import SequentialMonitor
+from sig_test import calculate_p_values, calculate_z_score
+
+
+def run_aa_looks(monitor, rng, experiments, looks, batch):
+    ids = list(range(experiments))
+    naive_rejected = np.zeros(experiments, dtype=bool)
+    for _ in range(looks):
+        result = monitor.update_proportions(
+            ids,
+            np.full(experiments, batch),
+            rng.binomial(batch, 0.1, experiments),
+            np.full(experiments, batch),
+            rng.binomial(batch, 0.1, experiments),
+        )
+        naive_rejected |= calculate_p_values(result.z_score, "two") < 0.05
+    return result, naive_rejected
+
+
+class TestSequentialMonitor:
+    def test_peeking_keeps_type_i_error(self):
+        rng = np.random.default_rng(0)
+        monitor = SequentialMonitor(tau=0.02, alpha=0.05)
+        result, naive_rejected = run_aa_looks(monitor, rng, 2000, 50, 200)
+        assert result.significant.mean() <= 0.05
+        # Repeatedly applying the fixed-horizon test would reject far more often.
+        assert naive_rejected.mean() > 0.15
+
+    def test_detects_real_effect(self):
+        rng = np.random.default_rng(1)
+        monitor = SequentialMonitor(tau=0.02)
+        for _ in range(20):
+            result = monitor.update_proportions(
+                ["a"],
+                [1000],
+                [rng.binomial(1000, 0.12)],
+                [1000],
+                [rng.binomial(1000, 0.10)],
+            )
+        assert result.significant[0]
+        assert result.ci_lower[0] > 0
+
+    def test_incremental_state_matches_totals(self):
+        monitor = SequentialMonitor(tau=0.01)
+        monitor.update_proportions(["x", "y"], [100, 50], [10, 5], [100, 50], [12, 4])
+        result = monitor.update_proportions(["x"], [300], [40], [300], [30])
+        assert monitor.n_test[0] == 400
+        assert abs(monitor.mean_test[0] - 50 / 400) < 1e-15
+        expected = calculate_z_score(50 / 400, 42 / 400, 400, 400, pooled=False)
+        assert abs(result.z_score[0] - expected) < 1e-12
+
+    def test_p_value_never_increases(self):
+        monitor = SequentialMonitor(tau=0.05)
+        first = monitor.update_proportions(["a"], [2000], [300], [2000], [200]).p_value[
+            0
+        ]
+        second = monitor.update_proportions(
+            ["a"], [2000], [200], [2000], [300]
+        ).p_value[0]
+        assert second <= first
+
+    def test_mean_updates(self):
+        rng = np.random.default_rng(2)
+        monitor = SequentialMonitor(tau=1.0, test_type="mean")
+        test_all, control_all = [], []
+        for _ in range(5):
+            test = rng.normal(10.5, 3.0, 500)
+            control = rng.normal(10.0, 3.0, 500)
+            test_all.append(test)
+            control_all.append(control)
+            result = monitor.update_means(
+                ["m"],
+                [500],
+                [test.mean()],
+                [test.std(ddof=1)],
+                [500],
+                [control.mean()],
+                [control.std(ddof=1)],
+            )
+        test_all = np.concatenate(test_all)
+        assert abs(monitor.mean_test[0] - test_all.mean()) < 1e-12
+        assert (
+            abs(monitor.m2_test[0] / (test_all.size - 1) - test_all.var(ddof=1)) < 1e-9
+        )
+        assert result.ci_lower[0] < 0.5 < result.ci_upper[0]
+
+    def test_empty_arm_is_not_significant(self):
+        result = SequentialMonitor(tau=0.01).update_proportions(
+            ["a"], [0], [0], [10], [1]
+        )
+        assert result.p_value[0] == 1.0
+        assert np.isinf(result.ci_upper[0])
+
+    def test_state_round_trip(self):
+        monitor = SequentialMonitor(tau=0.01)
+        monitor.update_proportions(
+            ["a", "b"], [100, 100], [10, 20], [100, 100], [12, 9]
+        )
+        restored = SequentialMonitor.from_dict(
+            json.loads(json.dumps(monitor.to_dict()))
+        )
+        assert restored.experiments == ["a", "b"]
+        np.testing.assert_array_equal(restored.p_value, monitor.p_value)
+        restored.update_proportions(["b"], [10], [1], [10], [1])
+        assert restored.n_test.tolist() == [100, 110]
+
+    def test_duplicate_experiments_rejected(self):
+        with pytest.raises(ValueError):
+            SequentialMonitor(tau=0.01).update_proportions(
+                ["a", "a"], [1, 1], [0, 0], [1, 1], [0, 0]
+            )
+
+    def test_invalid_test_type(self):
+        with pytest.raises(ValueError):
+            SequentialMonitor(tau=0.01, test_type="ratio")
@@ -0,0 +1,141 @@
+import json
+import os
+from sig_test import calculate_z_score, calculate_p_value
+from samplesize import calculate_sample_size_for_means
+from server import dump_response, handle_batch, handle_lines, iter_batches, serve
+
+PROPORTION = {
+    "op": "significance",
+    "test_type": "proportion",
+    "tail": "two",
+    "test_value": 0.507,
+    "control_value": 0.4728,
+    "n_test": 25000,
+    "n_control": 25000,
+}
+MEAN_SAMPLE_SIZE = {
+    "op": "sample_size",
+    "type": "mean",
+    "tail": "one",
+    "delta": 5,
+    "sigma": 20,
+    "alpha": 0.05,
+    "power": 0.8,
+    "split_ratio": 0.5,
+}
+
+
+class TestHandleBatch:
+    def test_significance_matches_scalar_functions(self):
+        (response,) = handle_batch([dict(PROPORTION, id="a")])
+        z = calculate_z_score(0.507, 0.4728, 25000, 25000)
+        assert response["id"] == "a"
+        assert abs(response["z_score"] - z) < 1e-12
+        assert abs(response["p_value"] - calculate_p_value(z, "two")) < 1e-15
+        assert response["significant"] is True
+
+    def test_sample_size_matches_scalar_function(self):
+        (response,) = handle_batch([MEAN_SAMPLE_SIZE])
+        expected = calculate_sample_size_for_means(5, 20, 0.05, 0.8, 0.5, "one")
+        assert response["sample_size"] == expected
+        assert response["control_size"] == response["test_size"] == expected // 2
+
+    def test_mixed_batch_keeps_request_order(self):
+        requests = [
+            dict(PROPORTION, id=0),
+            dict(MEAN_SAMPLE_SIZE, id=1),
+            dict(PROPORTION, id=2, tail="one", pooled=False),
+            dict(PROPORTION, id=3, test_value=0.6),
+        ]
+        responses = handle_batch(requests)
+        assert [response["id"] for response in responses] == [0, 1, 2, 3]
+        assert "sample_size" in responses[1]
+        expected = calculate_z_score(0.507, 0.4728, 25000, 25000, pooled=False)
+        assert abs(responses[2]["z_score"] - expected) < 1e-12
+
+    def test_invalid_requests_do_not_affect_others(self):
+        responses = handle_batch(
+            [
+                {"id": 1, "op": "significance", "test_type": "mean"},
+                {"id": 2, "op": "unknown"},
+                dict(PROPORTION, id=3, tail="three"),
+                dict(PROPORTION, id=4),
+            ]
+        )
+        assert "std_test" in responses[0]["error"]
+        assert "op" in responses[1]["error"]
+        assert "tail" in responses[2]["error"]
+        assert "z_score" in responses[3]
+
+    def test_malformed_numbers_do_not_affect_their_group(self):
+        responses = handle_batch(
+            [
+                dict(PROPORTION, id=1),
+                dict(PROPORTION, id=2, test_value="abc"),
+                dict(PROPORTION, id=3, confidence=None),
+            ]
+        )
+        expected = calculate_z_score(0.507, 0.4728, 25000, 25000)
+        assert abs(responses[0]["z_score"] - expected) < 1e-12
+        assert responses[1] == {
+            "error": "test_value must be a number, got 'abc'",
+            "id": 2,
+        }
+        assert "confidence" in responses[2]["error"]
+
+    def test_zero_effect_sample_size_is_null(self):
+        request = dict(MEAN_SAMPLE_SIZE, delta=0)
+        assert handle_batch([request])[0]["sample_size"] is None
+
+    def test_invalid_json_line(self):
+        responses = handle_lines([b"{not json", json.dumps(PROPORTION).encode()])
+        assert responses[0]["error"].startswith("Invalid JSON")
+        assert "z_score" in responses[1]
+
+
+class TestServe:
+    def test_pipe_round_trip(self):
+        read_fd, write_fd = os.pipe()
+        payload = "".join(
+            json.dumps(dict(PROPORTION, id=i)) + "\n" for i in range(50)
+        ) + json.dumps(MEAN_SAMPLE_SIZE)
+        os.write(write_fd, payload.encode())
+        os.close(write_fd)
+        output = []
+        serve(read_fd, output.append)
+        os.close(read_fd)
+        responses = [json.loads(line) for line in b"".join(output).splitlines()]
+        assert len(responses) == 51
+        assert [response.get("id") for response in responses[:50]] == list(range(50))
+        assert "sample_size" in responses[-1]
+
+    def test_zero_std_gives_strict_json_null(self):
+        request = {
+            "op": "significance",
+            "test_type": "mean",
+            "test_value": 5,
+            "control_value": 5,
+            "std_test": 0,
+            "std_control": 0,
+            "n_test": 100,
+            "n_control": 100,
+        }
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, json.dumps(request).encode())
+        os.close(write_fd)
+        output = []
+        serve(read_fd, output.append)
+        os.close(read_fd)
+        line = b"".join(output).decode()
+        assert "NaN" not in line
+        response = json.loads(line)
+        assert response["z_score"] is None and response["p_value"] is None
+        assert dump_response({"x": [float("inf"), 1.5]}) == '{"x": [null, 1.5]}\n'
+
+    def test_queued_lines_form_one_batch(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"1\n2\n3\n")
+        os.close(write_fd)
+        batches = list(iter_batches(read_fd, max_batch=10))
+        os.close(read_fd)
+        assert batches == [[b"1", b"2", b"3"]]
@@ -1,7 +1,17 @@
 import pytest
 import numpy as np
-from scipy.stats import norm
-from sig_test import calculate_z_score, calculate_p_value
+from scipy.stats import boschloo_exact, fisher_exact, norm
+from sig_test import (
+    calculate_z_score,
+    calculate_p_value,
+    calculate_z_scores,
+    calculate_mean_z_score,
+    calculate_mean_z_scores,
+    calculate_p_values,
+    calculate_exact_p_values,
+    calculate_proportion_p_values,
+    run_significance_tests,
+)
 
 
 class TestCalculateZScore:
@@ -95,3 +105,93 @@ class TestCalculatePValue:
     def test_zero_z_gives_pvalue_one(self):
         p = calculate_p_value(0.0, "two")
         assert abs(p - 1.0) < 1e-10
+
+
+class TestBatchAPI:
+    def test_z_scores_match_scalar_pooled_and_unpooled(self):
+        test = np.array([0.507, 0.3, 0.4])
+        control = np.array([0.4728, 0.25, 0.3])
+        n_t = np.array([25000, 1000, 500])
+        n_c = np.array([25000, 1000, 1500])
+        for pooled in (True, False):
+            z = calculate_z_scores(test, control, n_t, n_c, pooled=pooled)
+            expected = [
+                calculate_z_score(t, c, a, b, pooled=pooled)
+                for t, c, a, b in zip(test, control, n_t, n_c)
+            ]
+            np.testing.assert_allclose(z, expected, rtol=1e-12)
+
+    def test_mean_z_scores_match_formula(self):
+        z = calculate_mean_z_scores(
+            [50, 10], [45, 10], [10, 3], [10, 4], [25000, 100], [25000, 200]
+        )
+        se = np.sqrt(100 / 25000 + 100 / 25000)
+        assert abs(z[0] - 5 / se) < 1e-10
+        assert z[1] == 0.0
+        assert calculate_mean_z_score(50, 45, 10, 10, 25000, 25000) == z[0]
+
+    def test_zero_standard_error_is_silent(self, recwarn):
+        z = calculate_mean_z_scores([5, 6], [5, 5], [0, 0], [0, 0], [10, 10], [10, 10])
+        assert np.isnan(z[0]) and np.isinf(z[1])
+        assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+    def test_p_values_match_scalar(self):
+        z = np.array([-3.0, -1.0, 0.0, 1.0, 3.0])
+        for tail in ("one", "two"):
+            p = calculate_p_values(z, tail)
+            expected = [calculate_p_value(v, tail) for v in z]
+            np.testing.assert_allclose(p, expected, rtol=1e-12)
+
+    def test_tiny_p_values_keep_precision(self):
+        """The survival function avoids 1 - cdf underflowing to zero."""
+        p = calculate_p_values(np.array([10.0, 20.0]), "one")
+        np.testing.assert_allclose(p, norm.sf([10.0, 20.0]), rtol=1e-12)
+        assert np.all(p > 0)
+
+    def test_invalid_tail_raises(self):
+        with pytest.raises(ValueError):
+            calculate_p_values([1.0], "three")
+
+    def test_run_significance_tests_proportion(self):
+        z, p, sig = run_significance_tests(
+            [0.507, 0.5], [0.4728, 0.5], [25000, 1000], [25000, 1000], "two", 0.95
+        )
+        assert sig.tolist() == [True, False]
+        assert p[1] == 1.0
+
+    def test_run_significance_tests_mean_requires_std(self):
+        with pytest.raises(ValueError):
+            run_significance_tests([50], [45], [100], [100], "two", test_type="mean")
+
+
+class TestExactProportionTests:
+    def test_one_tailed_follows_observed_direction(self):
+        p = calculate_exact_p_values([8, 2], [40, 40], [2, 8], [40, 40], "one")
+        expected = fisher_exact([[8, 32], [2, 38]], alternative="greater")[1]
+        np.testing.assert_allclose(p, [expected, expected], rtol=1e-9)
+
+    def test_boschloo_two_tailed(self):
+        p = calculate_exact_p_values(8, 40, 2, 40, "two", method="boschloo")
+        expected = boschloo_exact([[8, 2], [32, 38]]).pvalue
+        assert p == pytest.approx(expected, abs=1e-5)
+
+    def test_auto_uses_exact_only_for_small_expected_counts(self):
+        z, p = calculate_proportion_p_values(
+            [3, 5000], [30, 25000], [1, 4700], [30, 25000], "two", method="auto"
+        )
+        assert p[0] == pytest.approx(fisher_exact([[3, 27], [1, 29]])[1])
+        assert p[1] == pytest.approx(calculate_p_value(z[1], "two"))
+
+    def test_run_significance_tests_with_method(self):
+        z, p, significant = run_significance_tests(
+            [0.2, 0.5], [0.05, 0.5], [40, 1000], [40, 1000], "two", method="fisher"
+        )
+        assert p[0] == pytest.approx(fisher_exact([[8, 32], [2, 38]])[1])
+        assert p[1] == pytest.approx(1.0)
+        assert significant.tolist() == [False, False]
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError):
+            calculate_proportion_p_values(1, 10, 1, 10, "two", method="exactish")
+        with pytest.raises(ValueError):
+            calculate_exact_p_values(1, 10, 1, 10, "two", method="z")
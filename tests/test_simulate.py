@@ -0,0 +1,59 @@
+import math
+import pytest
+from scipy.stats import norm
+from simulate import simulate_power_for_means, simulate_power_for_proportions
+
+
+def per_group_n_for_means(delta, sigma, alpha, power, tail):
+    z_alpha = norm.ppf(1 - alpha / 2) if tail == "two" else norm.ppf(1 - alpha)
+    return math.ceil(2 * sigma**2 * (z_alpha + norm.ppf(power)) ** 2 / delta**2)
+
+
+class TestSimulatePowerForMeans:
+    @pytest.mark.parametrize("tail", ["one", "two"])
+    def test_textbook_sample_size_hits_target_power(self, tail):
+        n = per_group_n_for_means(5, 20, 0.05, 0.8, tail)
+        result = simulate_power_for_means(
+            5, 20, 0.05, 0.8, 0.5, tail, 40_000, seed=1, sample_size=2 * n
+        )
+        assert result.n_control == result.n_test == n
+        assert abs(result.empirical_power - 0.8) < 0.015
+        assert abs(result.type_i_error - 0.05) < 0.006
+
+    def test_defaults_to_calculated_sample_size(self):
+        result = simulate_power_for_means(5, 20, 0.05, 0.8, 0.5, "two", 1000, seed=2)
+        assert result.sample_size > 0
+        assert result.simulations == 1000
+        assert result.target_power == 0.8
+
+
+class TestSimulatePowerForProportions:
+    def test_power_and_type_i_error(self):
+        result = simulate_power_for_proportions(
+            0.10, 0.15, 0.05, 0.8, 0.5, "two", 40_000, seed=3, sample_size=1400
+        )
+        assert 0.75 < result.empirical_power < 0.85
+        assert abs(result.type_i_error - 0.05) < 0.006
+
+    def test_zero_conversion_arms_are_not_significant(self):
+        result = simulate_power_for_proportions(
+            1e-6, 1e-6, 0.05, 0.8, 0.5, "two", 1000, seed=4, sample_size=100
+        )
+        assert result.type_i_error == 0.0
+
+    def test_one_tailed_counts_only_expected_direction(self):
+        result = simulate_power_for_proportions(
+            0.15, 0.10, 0.05, 0.8, 0.5, "one", 20_000, seed=5, sample_size=2000
+        )
+        assert result.empirical_power > 0.5
+        assert abs(result.type_i_error - 0.05) < 0.008
+
+    def test_reproducible_regardless_of_process_count(self):
+        kwargs = dict(seed=6, sample_size=500)
+        serial = simulate_power_for_proportions(
+            0.1, 0.12, 0.05, 0.8, 0.5, "two", 50_000, processes=1, **kwargs
+        )
+        parallel = simulate_power_for_proportions(
+            0.1, 0.12, 0.05, 0.8, 0.5, "two", 50_000, processes=2, **kwargs
+        )
+        assert serial == parallel